@@ -0,0 +1,236 @@
+"""
+Punto de entrada ASGI (modo async):
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+Las rutas dominadas por E/S remota se atienden de forma nativa con async/await,
+así que un proceso mantiene cientos de requests en vuelo sin ocupar un hilo
+por cada una:
+
+- POST /api/auth/login: Identity Toolkit vía httpx.AsyncClient y documento del
+  usuario vía firestore.AsyncClient.
+- GET/PUT /api/user/preferences: Firestore AsyncClient (?expand=tasks se
+  resuelve desde las vistas del catálogo en el pool de hilos).
+
+El resto de la API (catálogo servido desde caché/vistas en memoria, admin,
+archivos del build) se delega a la app Flask de server.py mediante
+ThreadPoolWsgiToAsgi: un pool propio de ASGI_WSGI_THREADS hilos por proceso,
+así que esos requests se atienden en paralelo como en el modo gthread
+(WsgiToAsgi de asgiref los ejecutaría todos en un único hilo compartido). Los
+preflight CORS también los responde Flask.
+
+Las rutas nativas registran latencia, tamaño y estado en /metrics con el mismo
+nombre de endpoint que su versión Flask (`auth.login`, ...). Los contadores de
+almacenamiento (`db_*`) no las cubren: usan el cliente async de Firestore,
+que no está instrumentado.
+"""
+
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+import httpx
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+from middleware.auth import verify_token_cached
+from middleware.metrics import SERVER_TIMING_ENABLED, request_metrics, server_timing
+from routes.auth import login_async
+from routes.user_preferences import (
+    expand_preferences,
+    load_user_preferences_async,
+    parse_expand,
+    save_user_preferences_async,
+)
+from server import allowed_origins, app as flask_app
+
+ASGI_WSGI_THREADS = int(os.getenv("ASGI_WSGI_THREADS", "32"))
+
+_wsgi_executor = None
+_http_client = None
+
+
+def get_wsgi_executor():
+    """Pool de hilos de la app Flask (se crea tras el fork, con el primer request)."""
+    global _wsgi_executor
+    if _wsgi_executor is None:
+        _wsgi_executor = ThreadPoolExecutor(max_workers=ASGI_WSGI_THREADS, thread_name_prefix="wsgi")
+    return _wsgi_executor
+
+
+# Versión síncrona de WsgiToAsgiInstance.run_wsgi_app, que asgiref decora con
+# sync_to_async(thread_sensitive=True): un solo hilo compartido por proceso
+_run_wsgi_app_sync = WsgiToAsgiInstance.__dict__["run_wsgi_app"].func
+
+
+class ThreadPoolWsgiToAsgiInstance(WsgiToAsgiInstance):
+    async def run_wsgi_app(self, body):
+        run = sync_to_async(_run_wsgi_app_sync, thread_sensitive=False, executor=get_wsgi_executor())
+        await run(self, body)
+
+
+class ThreadPoolWsgiToAsgi(WsgiToAsgi):
+    """WsgiToAsgi que ejecuta cada request en el pool de hilos de la app Flask."""
+
+    async def __call__(self, scope, receive, send):
+        await ThreadPoolWsgiToAsgiInstance(self.wsgi_application, self.duplicate_header_limit)(scope, receive, send)
+
+
+wsgi_app = ThreadPoolWsgiToAsgi(flask_app)
+
+
+def get_http_client():
+    """Cliente HTTP async compartido (conexiones keep-alive reutilizadas)."""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(timeout=10)
+    return _http_client
+
+
+class AsyncRequest:
+    def __init__(self, scope, receive):
+        self.scope = scope
+        self._receive = receive
+        self.headers = {
+            name.decode("latin-1").lower(): value.decode("latin-1")
+            for name, value in scope.get("headers", [])
+        }
+
+    def query_param(self, name):
+        values = parse_qs(self.scope.get("query_string", b"").decode("latin-1")).get(name)
+        return values[0] if values else None
+
+    async def body(self):
+        chunks = []
+        while True:
+            message = await self._receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    async def json(self):
+        """Cuerpo JSON, o None si no es válido (como get_json(silent=True))."""
+        try:
+            return json.loads(await self.body() or b"null")
+        except ValueError:
+            return None
+
+    def auth_payload(self):
+        """(payload, None) con un Bearer válido o (None, (cuerpo, 401))."""
+        auth_header = self.headers.get("authorization")
+        if not auth_header or not auth_header.startswith("Bearer "):
+            return None, ({"error": "No autorizado"}, 401)
+        payload = verify_token_cached(auth_header.split("Bearer ")[1])
+        if not payload:
+            return None, ({"error": "Token inválido o expirado"}, 401)
+        return payload, None
+
+
+def _cors_headers(request):
+    """Mismos encabezados que flask-cors para respuestas simples."""
+    origin = request.headers.get("origin")
+    if not origin:
+        return []
+    if not allowed_origins or "*" in allowed_origins:
+        return [(b"access-control-allow-origin", b"*")]
+    if origin in allowed_origins:
+        return [(b"access-control-allow-origin", origin.encode("latin-1")), (b"vary", b"Origin")]
+    return []
+
+
+async def send_json(send, request, body, status, started_at=None):
+    """Envía la respuesta JSON y devuelve su tamaño en bytes."""
+    payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(payload)).encode()),
+        *_cors_headers(request),
+    ]
+    if started_at is not None and SERVER_TIMING_ENABLED:
+        headers.append((b"server-timing", server_timing(time.perf_counter() - started_at, None).encode("latin-1")))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": payload})
+    return len(payload)
+
+
+async def login(request):
+    data = await request.json()
+    return await login_async(data if isinstance(data, dict) else {}, get_http_client())
+
+
+async def get_user_preferences(request):
+    payload, error = request.auth_payload()
+    if error:
+        return error
+    try:
+        expand = parse_expand(request.query_param("expand"))
+        preferences = await load_user_preferences_async(payload["uid"])
+        if expand:
+            preferences = await asyncio.to_thread(expand_preferences, preferences, expand)
+        return preferences, 200
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+
+async def update_user_preferences(request):
+    payload, error = request.auth_payload()
+    if error:
+        return error
+    try:
+        data = await request.json()
+        return await save_user_preferences_async(payload["uid"], data if isinstance(data, dict) else {}), 200
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+
+# (método, path) → (handler, endpoint de Flask equivalente para /metrics)
+ASYNC_ROUTES = {
+    ("POST", "/api/auth/login"): (login, "auth.login"),
+    ("GET", "/api/user/preferences"): (get_user_preferences, "user_preferences.get_user_preferences"),
+    ("PUT", "/api/user/preferences"): (update_user_preferences, "user_preferences.update_user_preferences"),
+}
+
+
+async def lifespan(receive, send):
+    global _http_client, _wsgi_executor
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            get_http_client()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            if _http_client is not None:
+                await _http_client.aclose()
+                _http_client = None
+            if _wsgi_executor is not None:
+                _wsgi_executor.shutdown(wait=False)
+                _wsgi_executor = None
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+
+    route = None
+    if scope["type"] == "http":
+        route = ASYNC_ROUTES.get((scope["method"], scope["path"].rstrip("/") or "/"))
+    if route is None:
+        await wsgi_app(scope, receive, send)
+        return
+
+    handler, endpoint = route
+    started_at = time.perf_counter()
+    request = AsyncRequest(scope, receive)
+    body, status = await handler(request)
+    size = await send_json(send, request, body, status, started_at)
+    request_metrics.observe(endpoint, scope["method"], status, time.perf_counter() - started_at, size)
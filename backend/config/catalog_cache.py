@@ -0,0 +1,227 @@
+"""
+Caché en memoria (por proceso) para los listados públicos del catálogo.
+
+Cada colección tiene su propia caché indexada por clave (p. ej. el framework
+solicitado). Las rutas de escritura invalidan la caché completa de la
+colección tras un cambio exitoso.
+
+Con varios workers cada proceso tiene su caché. Si CATALOG_VERSION_DIR está
+definido (gunicorn.conf.py usa un directorio temporal por ejecución), una
+escritura reemplaza además el archivo `{colección}.version` de ese directorio
+y cada proceso lo compara antes de servir un listado: la invalidación llega a
+todos los workers aunque no haya listeners de Firestore (sqlite o
+CATALOG_LISTENERS_ENABLED=false).
+
+Los listados se sirven con un ETag fuerte calculado sobre el cuerpo JSON de
+la versión cacheada, de modo que un `If-None-Match` coincidente responde 304
+sin volver a serializar y el ETag es el mismo en todos los procesos. Las
+variantes comprimidas (br/gzip) también se calculan una vez por versión.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import uuid
+from pathlib import Path
+
+from dotenv import load_dotenv
+from flask import Response, current_app, request
+
+from middleware.compression import (
+    COMPRESSION_MIN_SIZE,
+    compress,
+    encoded_etag,
+    etag_variants,
+    negotiate_encoding,
+)
+
+load_dotenv()
+
+CATALOG_VERSION_DIR = os.getenv("CATALOG_VERSION_DIR", "").strip()
+
+
+class CatalogEntry:
+    """Listado cacheado junto con su cuerpo JSON y ETag (calculados una vez)."""
+
+    __slots__ = ("data", "_body", "_etag", "_encoded")
+
+    def __init__(self, data):
+        self.data = data
+        self._body = None
+        self._etag = None
+        self._encoded = {}
+
+    def _serialize(self):
+        # Requiere contexto de aplicación para usar el mismo proveedor JSON que jsonify
+        body = current_app.json.dumps(self.data).encode("utf-8")
+        self._etag = hashlib.sha256(body).hexdigest()[:32]
+        self._body = body
+
+    @property
+    def body(self):
+        if self._body is None:
+            self._serialize()
+        return self._body
+
+    @property
+    def etag(self):
+        if self._etag is None:
+            self._serialize()
+        return self._etag
+
+    def encoded_body(self, encoding):
+        body = self._encoded.get(encoding)
+        if body is None:
+            body = compress(self.body, encoding)
+            self._encoded[encoding] = body
+        return body
+
+
+class SharedVersion:
+    """Marca de versión de una colección compartida entre procesos (un archivo)."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._seen = self._read()
+
+    def _read(self):
+        try:
+            return self.path.read_text(encoding="utf-8")
+        except OSError:
+            return None
+
+    def changed(self):
+        """True si otro proceso publicó una versión desde la última consulta."""
+        current = self._read()
+        if current == self._seen:
+            return False
+        self._seen = current
+        return True
+
+    def bump(self):
+        """Publica una versión nueva (reemplazo atómico del archivo)."""
+        token = uuid.uuid4().hex
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=self.path.parent, prefix=".version-", delete=False) as temp:
+            temp.write(token)
+        os.replace(temp.name, self.path)
+        self._seen = token
+
+
+class CatalogCache:
+    """Caché de listados de una colección con contadores de aciertos/fallos."""
+
+    def __init__(self, name, version_dir=CATALOG_VERSION_DIR):
+        self.name = name
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+        self._remote_invalidations = 0
+        self._shared = SharedVersion(Path(version_dir) / f"{name}.version") if version_dir else None
+
+    @property
+    def version(self):
+        """Versión local de la colección; aumenta con cada invalidación."""
+        with self._lock:
+            return self._generation
+
+    def get_entry(self, key, loader):
+        """Devuelve la entrada cacheada para `key` o la carga con `loader()`."""
+        with self._lock:
+            if self._shared is not None and self._shared.changed():
+                # Otro worker escribió en la colección
+                self._clear()
+                self._remote_invalidations += 1
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._hits += 1
+                return entry
+            self._misses += 1
+            generation = self._generation
+
+        entry = CatalogEntry(loader())
+
+        with self._lock:
+            # Si hubo una invalidación durante la carga, no guardar datos viejos
+            if generation == self._generation:
+                self._entries[key] = entry
+        return entry
+
+    def get_or_load(self, key, loader):
+        """Devuelve el listado cacheado para `key` o lo carga con `loader()`."""
+        return self.get_entry(key, loader).data
+
+    def _clear(self):
+        self._entries.clear()
+        self._generation += 1
+
+    def invalidate(self, shared=False):
+        """
+        Descarta todas las entradas de la colección. Con `shared` (escrituras
+        de esta instancia) también avisa a los demás procesos.
+        """
+        with self._lock:
+            self._clear()
+            self._invalidations += 1
+            if shared and self._shared is not None:
+                try:
+                    self._shared.bump()
+                except OSError as e:
+                    print(f"Error publicando la versión de '{self.name}': {e}")
+
+    def stats(self):
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hitRatio": round(self._hits / total, 4) if total else 0.0,
+                "version": self._generation,
+                "invalidations": self._invalidations,
+                "remoteInvalidations": self._remote_invalidations,
+                "entries": len(self._entries),
+            }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_catalog_cache(name):
+    """Obtiene (o crea) la caché asociada a una colección."""
+    with _caches_lock:
+        cache = _caches.get(name)
+        if cache is None:
+            cache = CatalogCache(name)
+            _caches[name] = cache
+        return cache
+
+
+def catalog_cache_stats():
+    with _caches_lock:
+        caches = list(_caches.values())
+    return {cache.name: cache.stats() for cache in caches}
+
+
+def catalog_response(cache, key, loader):
+    """Respuesta JSON condicional (ETag / If-None-Match) para un listado cacheado."""
+    entry = cache.get_entry(key, loader)
+    encoding = negotiate_encoding() if len(entry.body) >= COMPRESSION_MIN_SIZE else None
+    etag = encoded_etag(entry.etag, encoding) if encoding else entry.etag
+
+    if any(tag in request.if_none_match for tag in etag_variants(entry.etag)):
+        response = Response(status=304)
+    elif encoding:
+        response = Response(entry.encoded_body(encoding), status=200, mimetype="application/json")
+        response.headers["Content-Encoding"] = encoding
+    else:
+        response = Response(entry.body, status=200, mimetype="application/json")
+    response.set_etag(etag)
+    response.vary.add("Accept-Encoding")
+    # El cliente puede guardar la respuesta pero debe revalidarla siempre
+    response.cache_control.no_cache = True
+    return response
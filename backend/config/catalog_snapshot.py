@@ -0,0 +1,91 @@
+"""
+Snapshots binarios (msgpack) de las colecciones del catálogo.
+
+Formato (versión SNAPSHOT_VERSION):
+
+    {
+        "format": "catalog-snapshot",
+        "version": 1,
+        "createdAt": "2026-01-01T00:00:00+00:00",
+        "collections": {"tasks": {"<id>": {...}}, "categories": {...}, ...}
+    }
+
+Lo usan las vistas del catálogo (config/catalog_views.py) para arrancar
+sirviendo desde disco mientras llega el primer snapshot de Firestore, y
+scripts/catalog_snapshot.py para exportar/importar el catálogo.
+"""
+
+import os
+import tempfile
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+import msgpack
+
+SNAPSHOT_FORMAT = "catalog-snapshot"
+SNAPSHOT_VERSION = 1
+
+
+def _encode_value(value):
+    # Firestore devuelve timestamps como datetime; el catálogo usa ISO 8601
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Tipo no serializable en snapshot: {type(value).__name__}")
+
+
+def dump_snapshot(collections):
+    """Bytes msgpack de `{colección: {id: datos}}`."""
+    return msgpack.packb(
+        {
+            "format": SNAPSHOT_FORMAT,
+            "version": SNAPSHOT_VERSION,
+            "createdAt": datetime.now(timezone.utc).isoformat(),
+            "collections": collections,
+        },
+        default=_encode_value,
+        use_bin_type=True,
+    )
+
+
+def load_snapshot(data):
+    """Contenido del snapshot; ValueError si el formato o la versión no coinciden."""
+    snapshot = msgpack.unpackb(data, raw=False)
+    if not isinstance(snapshot, dict) or snapshot.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError("El archivo no es un snapshot del catálogo")
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Versión de snapshot no soportada: {snapshot.get('version')}")
+    if not isinstance(snapshot.get("collections"), dict):
+        raise ValueError("Snapshot sin colecciones")
+    return snapshot
+
+
+def write_snapshot(path, collections):
+    """Escribe el snapshot de forma atómica (archivo temporal + rename)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = dump_snapshot(collections)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(payload)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return len(payload)
+
+
+def read_snapshot(path):
+    """Snapshot guardado en `path`, o None si no existe o no es válido."""
+    try:
+        data = Path(path).read_bytes()
+    except FileNotFoundError:
+        return None
+    try:
+        return load_snapshot(data)
+    except Exception as e:
+        print(f"Snapshot del catálogo ignorado ({path}): {e}")
+        return None
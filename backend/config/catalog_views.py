@@ -0,0 +1,445 @@
+"""
+Vistas materializadas en memoria de las colecciones del catálogo.
+
+Cada vista se mantiene al día con un listener `on_snapshot` de Firestore, de
+modo que los cambios hechos por otras instancias o por los scripts de seed se
+reflejan en segundos sin hacer polling. Cada cambio recibido invalida la caché
+de listados de la colección (config/catalog_cache.py).
+
+Mientras una vista no está lista (primer snapshot pendiente), el listener se
+ha desconectado o hay una escritura local aún no confirmada por el listener,
+las lecturas vuelven a consultar Firestore directamente.
+
+Arranque en caliente: si existe un snapshot en disco (CATALOG_SNAPSHOT_PATH,
+ver config/catalog_snapshot.py) las vistas se precargan con él y sirven desde
+el primer request; el primer snapshot del listener reemplaza su contenido. Las
+vistas vuelven a guardar el snapshot cada CATALOG_SNAPSHOT_INTERVAL segundos
+si hubo cambios.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime, timezone
+from pathlib import Path
+
+from google.cloud.firestore_v1.field_path import FieldPath
+
+from config.catalog_cache import get_catalog_cache
+from config.catalog_snapshot import read_snapshot, write_snapshot
+from config.firebase import BASE_DIR, db
+
+CATALOG_COLLECTIONS = ("tasks", "categories", "styles", "templates")
+# Segundos entre intentos de reconexión de un listener caído
+RESTART_BACKOFF_SECONDS = 30
+# Máximo tiempo que una escritura local fuerza lecturas directas
+LOCAL_WRITE_STALE_SECONDS = 10
+# Snapshot en disco para arranque en caliente (vacío lo desactiva)
+CATALOG_SNAPSHOT_PATH = os.getenv("CATALOG_SNAPSHOT_PATH", "./catalog.snapshot.msgpack").strip()
+CATALOG_SNAPSHOT_INTERVAL = float(os.getenv("CATALOG_SNAPSHOT_INTERVAL", "60"))
+
+
+class CollectionView:
+    """Copia en memoria de una colección mantenida por un listener de Firestore."""
+
+    def __init__(self, collection_name):
+        self.collection_name = collection_name
+        self._lock = threading.Lock()
+        self._docs = {}
+        self._sorted_ids = None
+        self._ready = False
+        self._seeded = False
+        self._watch = None
+        self._client = None
+        self._last_start = 0.0
+        self._stale_since = None
+        self._snapshots = 0
+
+    def start(self, client):
+        """Registra el listener; el primer snapshot marca la vista como lista."""
+        with self._lock:
+            self._client = client
+            self._ready = False
+            self._last_start = time.monotonic()
+            watch = self._watch
+            self._watch = None
+        if watch is not None:
+            try:
+                watch.unsubscribe()
+            except Exception:
+                pass
+        self._watch = client.collection(self.collection_name).on_snapshot(self._on_snapshot)
+
+    def stop(self):
+        with self._lock:
+            watch = self._watch
+            self._watch = None
+            self._ready = False
+        if watch is not None:
+            watch.unsubscribe()
+
+    def seed(self, docs):
+        """Precarga documentos de un snapshot en disco hasta que llegue el del listener."""
+        with self._lock:
+            if self._ready:
+                return
+            self._docs = dict(docs)
+            self._sorted_ids = None
+            self._seeded = True
+
+    def _on_snapshot(self, docs, changes, read_time):
+        with self._lock:
+            if not self._ready:
+                # El primer snapshot (también tras reconectar) trae la colección completa
+                self._docs = {doc.id: doc.to_dict() or {} for doc in docs}
+                self._sorted_ids = None
+                self._ready = True
+                self._seeded = False
+            elif changes:
+                self._sorted_ids = None
+                for change in changes:
+                    doc = change.document
+                    if change.type.name == "REMOVED":
+                        self._docs.pop(doc.id, None)
+                    else:
+                        self._docs[doc.id] = doc.to_dict() or {}
+            if self._stale_since is not None and read_time is not None and read_time >= self._stale_since:
+                self._stale_since = None
+            self._snapshots += 1
+        get_catalog_cache(self.collection_name).invalidate()
+        _snapshot_dirty.set()
+
+    def mark_stale(self):
+        """Fuerza lecturas directas hasta que el listener confirme una escritura local."""
+        with self._lock:
+            self._stale_since = datetime.now(timezone.utc)
+
+    def is_live(self):
+        with self._lock:
+            if not (self._ready or self._seeded) or self._watch is None:
+                return False
+            if self._stale_since is not None:
+                age = (datetime.now(timezone.utc) - self._stale_since).total_seconds()
+                if age < LOCAL_WRITE_STALE_SECONDS:
+                    return False
+                self._stale_since = None
+            active = self._watch.is_active
+        if not active:
+            self._maybe_restart()
+        return active
+
+    def _maybe_restart(self):
+        with self._lock:
+            if self._client is None or time.monotonic() - self._last_start < RESTART_BACKOFF_SECONDS:
+                return
+            self._last_start = time.monotonic()
+            client = self._client
+        try:
+            self.start(client)
+        except Exception as e:
+            print(f"Error reiniciando listener de '{self.collection_name}': {e}")
+
+    def documents(self, after=None, limit=None):
+        """
+        Copia de los documentos ordenados por ID (opcionalmente solo los
+        posteriores al ID `after` y como máximo `limit`), o None si la vista
+        no es fiable. Solo se copian los documentos devueltos.
+        """
+        if not self.is_live():
+            return None
+        with self._lock:
+            if self._sorted_ids is None:
+                self._sorted_ids = sorted(self._docs)
+            ids = self._sorted_ids
+            start = bisect_right(ids, after) if after is not None else 0
+            end = start + limit if limit is not None else len(ids)
+            return [{**self._docs[doc_id], "id": doc_id} for doc_id in ids[start:end]]
+
+    def lookup(self, doc_id):
+        """(encontrado, documento) desde la vista, o None si la vista no es fiable."""
+        if not self.is_live():
+            return None
+        with self._lock:
+            data = self._docs.get(doc_id)
+        if data is None:
+            return (False, None)
+        return (True, {**data, "id": doc_id})
+
+    def snapshot_documents(self):
+        """Copia de los documentos si la vista refleja Firestore, o None."""
+        with self._lock:
+            return dict(self._docs) if self._ready else None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "ready": self._ready,
+                "seededFromSnapshot": self._seeded,
+                "active": bool(self._watch is not None and self._watch.is_active),
+                "stale": self._stale_since is not None,
+                "documents": len(self._docs),
+                "snapshots": self._snapshots,
+            }
+
+
+_views = {}
+_snapshot_dirty = threading.Event()
+_snapshot_writer = None
+
+
+def resolve_snapshot_path(raw_path=CATALOG_SNAPSHOT_PATH):
+    if not raw_path:
+        return None
+    path = Path(raw_path)
+    return path if path.is_absolute() else BASE_DIR / path
+
+
+def start_views(client, collections=CATALOG_COLLECTIONS, snapshot_path=None):
+    """
+    Arranca (o reinicia) los listeners de las colecciones del catálogo,
+    precargando las vistas desde el snapshot en disco si existe.
+    """
+    snapshot_path = snapshot_path or resolve_snapshot_path()
+    snapshot = read_snapshot(snapshot_path) if snapshot_path else None
+
+    for name in collections:
+        view = _views.get(name)
+        if view is None:
+            view = CollectionView(name)
+            _views[name] = view
+        if snapshot is not None and isinstance(snapshot["collections"].get(name), dict):
+            view.seed(snapshot["collections"][name])
+        try:
+            view.start(client)
+        except Exception as e:
+            print(f"Error iniciando listener de '{name}': {e}")
+
+    if snapshot_path:
+        start_snapshot_writer(snapshot_path)
+
+
+def save_views_snapshot(path):
+    """Guarda las vistas en disco si todas reflejan Firestore; True si se escribió."""
+    collections = {}
+    for name, view in _views.items():
+        docs = view.snapshot_documents()
+        if docs is None:
+            return False
+        collections[name] = docs
+    if not collections:
+        return False
+    write_snapshot(path, collections)
+    return True
+
+
+def start_snapshot_writer(path, interval=CATALOG_SNAPSHOT_INTERVAL):
+    """Hilo que persiste el snapshot como máximo cada `interval` segundos si hubo cambios."""
+    global _snapshot_writer
+    if _snapshot_writer is not None and _snapshot_writer.is_alive():
+        return
+
+    def run():
+        while True:
+            _snapshot_dirty.wait()
+            time.sleep(interval)
+            _snapshot_dirty.clear()
+            try:
+                if not save_views_snapshot(path):
+                    # Alguna vista aún no está lista: reintentar en el próximo ciclo
+                    _snapshot_dirty.set()
+            except Exception as e:
+                print(f"Error guardando snapshot del catálogo: {e}")
+
+    _snapshot_writer = threading.Thread(target=run, name="catalog-snapshot-writer", daemon=True)
+    _snapshot_writer.start()
+
+
+def stop_views():
+    for view in _views.values():
+        try:
+            view.stop()
+        except Exception:
+            pass
+
+
+def catalog_views_stats():
+    return {name: view.stats() for name, view in _views.items()}
+
+
+def _matches(data, filters):
+    for field, expected in filters:
+        value = data.get(field)
+        if isinstance(expected, bool):
+            if value is not expected:
+                return False
+        elif value != expected:
+            return False
+    return True
+
+
+def query_documents(collection_name, filters=(), fields=None):
+    """
+    Documentos de la colección que cumplen los filtros de igualdad
+    `[(campo, valor), ...]`, desde la vista si está viva o desde Firestore.
+    Con `fields` se devuelven solo esos campos (más `id`).
+    """
+    view = _views.get(collection_name)
+    docs = view.documents() if view is not None else None
+    if docs is not None:
+        docs = [doc for doc in docs if _matches(doc, filters)]
+        return docs if fields is None else [_project(doc, fields) for doc in docs]
+
+    query = db.collection(collection_name)
+    for field, value in filters:
+        query = query.where(field, "==", value)
+    if fields is not None:
+        query = query.select(list(fields) or [FieldPath.document_id()])
+    results = []
+    for doc in query.stream():
+        data = doc.to_dict()
+        data["id"] = doc.id
+        results.append(data)
+    return results
+
+
+def _project(doc, fields):
+    """Copia del documento con solo `id` y los campos (rutas con puntos) pedidos."""
+    projected = {"id": doc["id"]}
+    for path in fields:
+        value = doc
+        parts = path.split(".")
+        for part in parts:
+            if not isinstance(value, dict) or part not in value:
+                break
+            value = value[part]
+        else:
+            target = projected
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = value
+    return projected
+
+
+def page_documents(collection_name, filters=(), limit=None, after=None, fields=None, predicate=None, predicate_fields=()):
+    """
+    Página de documentos ordenada por ID para listados de administración.
+
+    - `limit`/`after`: paginación por cursor (ID del último documento recibido).
+      Sin `limit` se devuelven todos los documentos.
+    - `fields`: proyección (Firestore `select()`); `id` siempre se incluye.
+    - `predicate`: filtro adicional en Python que no se puede expresar como
+      igualdad; `predicate_fields` son los campos que necesita leer.
+
+    Devuelve (documentos, cursor siguiente o None).
+    """
+    paginated = limit is not None or after is not None
+    batch_size = limit + 1 if limit is not None else None
+    view = _views.get(collection_name)
+    items = []
+    cursor = after
+    done = False
+
+    # Desde la vista se copian tramos de `limit + 1` documentos hasta completar
+    # la página; si deja de ser fiable a mitad se sigue en Firestore desde el cursor
+    while view is not None:
+        docs = view.documents(after=cursor, limit=batch_size)
+        if docs is None:
+            break
+        for doc in docs:
+            cursor = doc["id"]
+            if not _matches(doc, filters) or (predicate and not predicate(doc)):
+                continue
+            items.append(doc)
+            if limit is not None and len(items) > limit:
+                break
+        if batch_size is None or len(docs) < batch_size or len(items) > limit:
+            done = True
+            break
+
+    if not done:
+        query = db.collection(collection_name)
+        for field, value in filters:
+            query = query.where(field, "==", value)
+        if fields is not None:
+            select_fields = sorted(set(fields) | set(predicate_fields))
+            query = query.select(select_fields or [FieldPath.document_id()])
+        if paginated:
+            query = query.order_by(FieldPath.document_id())
+
+        while True:
+            page_query = query
+            if cursor is not None:
+                page_query = page_query.start_after({FieldPath.document_id(): cursor})
+            if batch_size is not None:
+                page_query = page_query.limit(batch_size)
+
+            fetched = 0
+            for doc in page_query.stream():
+                fetched += 1
+                cursor = doc.id
+                data = doc.to_dict() or {}
+                data["id"] = doc.id
+                if predicate and not predicate(data):
+                    continue
+                items.append(data)
+            # Con predicado puede faltar completar la página: seguir leyendo
+            if batch_size is None or fetched < batch_size or len(items) > limit:
+                break
+
+    next_cursor = None
+    if limit is not None and len(items) > limit:
+        items = items[:limit]
+        next_cursor = items[-1]["id"]
+    if fields is not None:
+        items = [_project(doc, fields) for doc in items]
+    return items, next_cursor
+
+
+def get_document(collection_name, doc_id):
+    """Documento por ID (con su `id`) o None si no existe."""
+    view = _views.get(collection_name)
+    found = view.lookup(doc_id) if view is not None else None
+    if found is not None:
+        return found[1]
+
+    doc = db.collection(collection_name).document(doc_id).get()
+    if not doc.exists:
+        return None
+    data = doc.to_dict()
+    data["id"] = doc.id
+    return data
+
+
+def get_documents(collection_name, doc_ids):
+    """
+    {id: documento} de los IDs que existen. Los que la vista no puede resolver
+    se leen de Firestore con una sola llamada `get_all()` (multi-get).
+    """
+    view = _views.get(collection_name)
+    found = {}
+    missing = []
+    for doc_id in dict.fromkeys(doc_ids):
+        hit = view.lookup(doc_id) if view is not None else None
+        if hit is None:
+            missing.append(doc_id)
+        elif hit[0]:
+            found[doc_id] = hit[1]
+
+    if missing:
+        collection = db.collection(collection_name)
+        for doc in db.get_all([collection.document(doc_id) for doc_id in missing]):
+            if doc.exists:
+                found[doc.id] = {**(doc.to_dict() or {}), "id": doc.id}
+    return found
+
+
+def notify_local_write(collection_name):
+    """
+    Invalida la caché de la colección tras una escritura hecha por esta
+    instancia, también en los demás workers (ver catalog_cache.py).
+    """
+    view = _views.get(collection_name)
+    if view is not None:
+        view.mark_stale()
+    get_catalog_cache(collection_name).invalidate(shared=True)
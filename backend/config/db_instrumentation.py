@@ -0,0 +1,227 @@
+"""
+Contabilidad de operaciones de almacenamiento por request.
+
+`instrument_client(client)` envuelve el cliente de `db` (Firestore o motor
+local) con proxies delgados sobre colecciones, documentos, consultas y
+batches. Mientras hay un request activo (`start_accounting()` en
+middleware/metrics.py) cada operación suma a su contador:
+
+- lecturas de documentos con el criterio de facturación de Firestore:
+  `get()` de un documento = 1 (exista o no), una consulta = documentos
+  devueltos (mínimo 1) y `get_all()` = referencias pedidas;
+- escrituras: `create/set/update/delete` = 1, `batch.commit()` = operaciones
+  del batch;
+- RPCs y tiempo total dentro del cliente.
+
+Las operaciones fuera de un request (listeners, colas write-behind, scripts)
+no se cuentan. El contador vive en un contextvar: los pools que leen en nombre
+de un request deben ejecutar la tarea con `contextvars.copy_context().run`.
+"""
+
+import contextvars
+import os
+import threading
+import time
+
+DB_INSTRUMENTATION_ENABLED = os.getenv("DB_INSTRUMENTATION", "true").lower() in ("1", "true", "yes", "on")
+
+# Métodos que devuelven otra referencia/consulta (se envuelve el resultado)
+_CHAINED_METHODS = {
+    "collection",
+    "document",
+    "where",
+    "select",
+    "order_by",
+    "start_after",
+    "start_at",
+    "end_before",
+    "end_at",
+    "limit",
+    "limit_to_last",
+    "offset",
+}
+_DOCUMENT_WRITES = {"create", "set", "update", "delete"}
+
+_current = contextvars.ContextVar("db_accounting", default=None)
+
+
+class DbAccounting:
+    """Lecturas, escrituras, RPCs y segundos de almacenamiento de un request."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reads = 0
+        self.writes = 0
+        self.rpcs = 0
+        self.seconds = 0.0
+
+    def add(self, reads=0, writes=0, seconds=0.0):
+        with self._lock:
+            self.reads += reads
+            self.writes += writes
+            self.rpcs += 1
+            self.seconds += seconds
+
+
+def start_accounting():
+    """Abre el contador del request actual; devuelve el token para `stop_accounting`."""
+    return _current.set(DbAccounting())
+
+
+def current_accounting():
+    return _current.get()
+
+
+def stop_accounting(token):
+    _current.reset(token)
+
+
+def _record(reads=0, writes=0, seconds=0.0):
+    accounting = _current.get()
+    if accounting is not None:
+        accounting.add(reads, writes, seconds)
+
+
+def _unwrap(value):
+    if isinstance(value, _Instrumented):
+        return value._target
+    if isinstance(value, (list, tuple)):
+        return type(value)(_unwrap(item) for item in value)
+    return value
+
+
+class _Instrumented:
+    """Proxy que delega todo en `_target` salvo los métodos que se cuentan."""
+
+    __slots__ = ("_target",)
+
+    def __init__(self, target):
+        self._target = target
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if name in _CHAINED_METHODS and callable(value):
+            return lambda *args, **kwargs: _Reference(value(*_unwrap(args), **kwargs))
+        return value
+
+    def __repr__(self):
+        return f"Instrumented({self._target!r})"
+
+
+def _timed(method, *args, reads=0, writes=0, **kwargs):
+    started_at = time.perf_counter()
+    try:
+        return method(*_unwrap(args), **kwargs)
+    finally:
+        _record(reads, writes, time.perf_counter() - started_at)
+
+
+def _counted(accounting, iterator, reads=None):
+    """
+    Reenvía los snapshots de `iterator` midiendo el tiempo dentro de él (las
+    páginas llegan a medida que se consumen). Sin `reads` se cuentan los
+    documentos devueltos, con mínimo 1 como una consulta en Firestore.
+    """
+    count = 0
+    elapsed = 0.0
+    try:
+        while True:
+            started_at = time.perf_counter()
+            try:
+                snapshot = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                elapsed += time.perf_counter() - started_at
+            count += 1
+            yield snapshot
+    finally:
+        accounting.add(reads=max(1, count) if reads is None else reads, seconds=elapsed)
+
+
+class _Reference(_Instrumented):
+    """Colección, documento o consulta."""
+
+    __slots__ = ()
+
+    def get(self, *args, **kwargs):
+        started_at = time.perf_counter()
+        result = self._target.get(*args, **kwargs)
+        # DocumentReference.get → snapshot; Query.get → lista de snapshots
+        reads = max(1, len(result)) if isinstance(result, list) else 1
+        _record(reads=reads, seconds=time.perf_counter() - started_at)
+        return result
+
+    def stream(self, *args, **kwargs):
+        accounting = _current.get()
+        if accounting is None:
+            return self._target.stream(*args, **kwargs)
+        return _counted(accounting, self._target.stream(*args, **kwargs))
+
+    def add(self, *args, **kwargs):
+        return _timed(self._target.add, *args, writes=1, **kwargs)
+
+    def create(self, *args, **kwargs):
+        return _timed(self._target.create, *args, writes=1, **kwargs)
+
+    def set(self, *args, **kwargs):
+        return _timed(self._target.set, *args, writes=1, **kwargs)
+
+    def update(self, *args, **kwargs):
+        return _timed(self._target.update, *args, writes=1, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        return _timed(self._target.delete, *args, writes=1, **kwargs)
+
+
+class _Batch(_Instrumented):
+    """WriteBatch: las operaciones se cuentan al confirmar."""
+
+    __slots__ = ("_pending",)
+
+    def __init__(self, target):
+        super().__init__(target)
+        self._pending = 0
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if name in _DOCUMENT_WRITES:
+
+            def queue(*args, **kwargs):
+                self._pending += 1
+                value(*_unwrap(args), **kwargs)
+                return self
+
+            return queue
+        return value
+
+    def commit(self, *args, **kwargs):
+        writes, self._pending = self._pending, 0
+        return _timed(self._target.commit, *args, writes=writes, **kwargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+
+
+class _Client(_Instrumented):
+    __slots__ = ()
+
+    def batch(self, *args, **kwargs):
+        return _Batch(self._target.batch(*args, **kwargs))
+
+    def get_all(self, references, *args, **kwargs):
+        references = _unwrap(list(references))
+        accounting = _current.get()
+        if accounting is None:
+            return self._target.get_all(references, *args, **kwargs)
+        # get_all cobra una lectura por referencia pedida, exista o no
+        return _counted(accounting, self._target.get_all(references, *args, **kwargs), reads=len(references))
+
+
+def instrument_client(client):
+    """Cliente envuelto (o el original si DB_INSTRUMENTATION está desactivado)."""
+    return _Client(client) if DB_INSTRUMENTATION_ENABLED else client
@@ -2,31 +2,36 @@ import json
 import os, jwt
 from datetime import datetime, timedelta
 import firebase_admin
-from firebase_admin import credentials, firestore, auth
+from firebase_admin import credentials, auth
 from dotenv import load_dotenv
 from pathlib import Path
+from config.db_instrumentation import instrument_client
+from config.role_cache import admin_role_cache
+from config.storage import STORAGE_BACKEND, ClientProxy, create_client
+from config.write_behind import WriteBehindQueue
 
 load_dotenv()
 
 # Base del proyecto (backend/)
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-# Opcion 1 (recomendada en Render): JSON completo en variable de entorno
-raw_json = os.getenv("FIREBASE_CREDENTIALS_JSON")
 
-if raw_json:
-    try:
-        cred_info = json.loads(raw_json)
-    except json.JSONDecodeError as exc:
-        raise RuntimeError("FIREBASE_CREDENTIALS_JSON no es un JSON valido") from exc
-    cred = credentials.Certificate(cred_info)
-else:
+def load_credentials():
+    """Credenciales de Firebase desde variables de entorno, o None si no hay."""
+    # Opcion 1 (recomendada en Render): JSON completo en variable de entorno
+    raw_json = os.getenv("FIREBASE_CREDENTIALS_JSON")
+
+    if raw_json:
+        try:
+            cred_info = json.loads(raw_json)
+        except json.JSONDecodeError as exc:
+            raise RuntimeError("FIREBASE_CREDENTIALS_JSON no es un JSON valido") from exc
+        return credentials.Certificate(cred_info)
+
     # Opcion 2: ruta a archivo local
     raw_path = os.getenv("FIREBASE_CREDENTIALS_PATH")
     if not raw_path:
-        raise RuntimeError(
-            "Define FIREBASE_CREDENTIALS_JSON o FIREBASE_CREDENTIALS_PATH"
-        )
+        return None
 
     cred_path = Path(raw_path)
 
@@ -37,11 +42,62 @@ else:
     if not cred_path.exists():
         raise FileNotFoundError(f"No se encontró el archivo Firebase: {cred_path}")
 
-    cred = credentials.Certificate(str(cred_path))
-firebase_admin.initialize_app(cred)
+    return credentials.Certificate(str(cred_path))
+
+
+cred = load_credentials()
+if cred is not None:
+    firebase_admin.initialize_app(cred)
+elif STORAGE_BACKEND == "firestore":
+    raise RuntimeError(
+        "Define FIREBASE_CREDENTIALS_JSON o FIREBASE_CREDENTIALS_PATH"
+    )
+
+# Cliente de almacenamiento (Firestore o motor local según STORAGE_BACKEND),
+# creado al primer uso en cada proceso. Sin credenciales, los motores locales funcionan pero el registro/login con
+# Firebase Auth no está disponible. El cliente va envuelto para contar lecturas
+# y escrituras por request (config/db_instrumentation.py).
+db = ClientProxy(lambda: instrument_client(create_client(STORAGE_BACKEND)))
+
+
+def reset_storage_clients():
+    """Descarta los clientes creados antes de un fork (ver gunicorn.conf.py)."""
+    # El motor en memoria no tiene conexiones; recrearlo perdería los datos
+    if STORAGE_BACKEND != "memory":
+        db.reset()
+    import config.firebase_async as firebase_async
+
+    firebase_async.reset_async_db()
+
+
+def start_catalog_listeners():
+    """Arranca los listeners on_snapshot que mantienen las vistas del catálogo."""
+    from config.catalog_views import start_views
+
+    # Los motores locales se leen directamente y no tienen listeners
+    # (on_snapshot lanza UnsupportedOperation)
+    if STORAGE_BACKEND != "firestore":
+        return
+    start_views(db)
+
+
+_admin_role_watch = None
+
+
+def start_admin_role_listener():
+    """Invalida el rol cacheado de un usuario cuando entra o sale del conjunto de admins."""
+    global _admin_role_watch
 
-# Cliente de Firestore
-db = firestore.client()
+    if STORAGE_BACKEND != "firestore":
+        return
+
+    def on_admins_snapshot(docs, changes, read_time):
+        for change in changes:
+            admin_role_cache.invalidate(change.document.id)
+
+    if _admin_role_watch is not None:
+        _admin_role_watch.unsubscribe()
+    _admin_role_watch = db.collection('user').where('admin', '==', True).on_snapshot(on_admins_snapshot)
 
 # Configuración JWT
 JWT_SECRET = os.getenv('JWT_SECRET_KEY')
@@ -72,19 +128,67 @@ def verify_jwt_token(token):
     except jwt.InvalidTokenError:
         return None
 
+def fetch_user_profile(uid):
+    """Lee el perfil del usuario; propaga los errores de Firestore"""
+    user_doc = db.collection('user').document(uid).get()
+    if user_doc.exists:
+        return user_doc.to_dict()
+    return None
+
 def get_user_profile(uid):
     """Obtiene el perfil del usuario desde Firestore"""
     try:
-        user_ref = db.collection('user').document(uid)
-        user_doc = user_ref.get()
-        
-        if user_doc.exists:
-            return user_doc.to_dict()
-        return None
+        return fetch_user_profile(uid)
     except Exception as e:
         print(f"Error obteniendo perfil: {e}")
         return None
 
+def resolve_admin_role(uid):
+    """Indica si el usuario es admin, usando la caché de roles.
+    Ante un fallo de Firestore sin entrada vigente se deniega (fail closed)."""
+    cached = admin_role_cache.get(uid)
+    if cached is not None:
+        return cached
+    try:
+        profile = fetch_user_profile(uid)
+    except Exception as e:
+        print(f"Error resolviendo rol admin: {e}")
+        return False
+    is_admin = bool(profile and profile.get('admin', False))
+    admin_role_cache.put(uid, is_admin)
+    return is_admin
+
+def new_user_data(email=None, is_anonymous=False):
+    """Documento inicial de un usuario nuevo"""
+    return {
+        'email': email or 'anonymous',
+        'displayName': email.split('@')[0] if email else 'Usuario Anónimo',
+        'admin': False,
+        'isAnonymous': is_anonymous,
+        'createdAt': datetime.utcnow().isoformat(),
+        'lastLogin': datetime.utcnow().isoformat(),
+        'preferences': {
+            'theme': 'dark',
+            'defaultPlatform': 'airflow',
+            'autoSaveInterval': 30
+        }
+    }
+
+def _flush_last_login(uid, timestamps):
+    db.collection('user').document(uid).update({'lastLogin': max(timestamps)})
+
+# lastLogin se escribe fuera de la ruta crítica del login; los logins seguidos
+# de un mismo usuario dentro de la ventana se confirman en una sola escritura
+last_login_queue = WriteBehindQueue(
+    'last-login',
+    _flush_last_login,
+    window_seconds=int(os.getenv('LAST_LOGIN_WRITE_DELAY_MS', '500')) / 1000,
+)
+
+def record_last_login(uid):
+    """Encola la actualización de lastLogin (no bloquea la respuesta)."""
+    last_login_queue.submit(uid, [datetime.utcnow().isoformat()])
+
 def create_user_document(uid, email=None, is_anonymous=False):
     """Crea o actualiza el documento del usuario en Firestore"""
     try:
@@ -93,26 +197,14 @@ def create_user_document(uid, email=None, is_anonymous=False):
         
         if not user_doc.exists:
             # Crear nuevo usuario
-            user_data = {
-                'email': email or 'anonymous',
-                'displayName': email.split('@')[0] if email else 'Usuario Anónimo',
-                'admin': False,
-                'isAnonymous': is_anonymous,
-                'createdAt': datetime.utcnow().isoformat(),
-                'lastLogin': datetime.utcnow().isoformat(),
-                'preferences': {
-                    'theme': 'dark',
-                    'defaultPlatform': 'airflow',
-                    'autoSaveInterval': 30
-                }
-            }
+            user_data = new_user_data(email, is_anonymous)
             user_ref.set(user_data)
+            admin_role_cache.invalidate(uid)
             return user_data
         else:
-            # Actualizar último login
-            user_ref.update({
-                'lastLogin': datetime.utcnow().isoformat()
-            })
+            # Actualizar último login (en segundo plano)
+            record_last_login(uid)
+            admin_role_cache.invalidate(uid)
             return user_doc.to_dict()
     except Exception as e:
         print(f"Error creando documento: {e}")
@@ -0,0 +1,60 @@
+"""
+Acceso asíncrono a Firestore para el modo ASGI (asgi.py).
+
+Con STORAGE_BACKEND=firestore se usa `firestore.AsyncClient`, creado de forma
+perezosa dentro del event loop que lo usa. Los motores locales (sqlite/memory)
+responden en menos de un milisegundo, así que se llaman de forma síncrona.
+"""
+
+import firebase_admin
+from firebase_admin import firestore_async
+
+from config.firebase import create_user_document, new_user_data, record_last_login
+from config.role_cache import admin_role_cache
+from config.storage import STORAGE_BACKEND
+
+_async_db = None
+
+
+def get_async_db():
+    """AsyncClient compartido, o None si el backend no es Firestore."""
+    global _async_db
+    if STORAGE_BACKEND != "firestore":
+        return None
+    if _async_db is None:
+        firebase_app = firebase_admin.get_app()
+        _async_db = firestore_async.AsyncClient(
+            credentials=firebase_app.credential.get_credential(),
+            project=firebase_app.project_id,
+        )
+    return _async_db
+
+
+def reset_async_db():
+    """Descarta el AsyncClient (se recrea en el siguiente uso, p. ej. tras un fork)."""
+    global _async_db
+    _async_db = None
+
+
+async def create_user_document_async(uid, email=None, is_anonymous=False):
+    """Equivalente async de create_user_document"""
+    client = get_async_db()
+    if client is None:
+        return create_user_document(uid, email, is_anonymous)
+    try:
+        user_ref = client.collection('user').document(uid)
+        user_doc = await user_ref.get()
+
+        if not user_doc.exists:
+            user_data = new_user_data(email, is_anonymous)
+            await user_ref.set(user_data)
+            admin_role_cache.invalidate(uid)
+            return user_data
+
+        # Actualizar último login (en segundo plano)
+        record_last_login(uid)
+        admin_role_cache.invalidate(uid)
+        return user_doc.to_dict()
+    except Exception as e:
+        print(f"Error creando documento: {e}")
+        return None
@@ -0,0 +1,67 @@
+"""
+Caché de corta duración del flag `admin` de cada usuario.
+
+Evita leer el documento `user/{uid}` en cada request de administración. Las
+entradas caducan a los ADMIN_ROLE_CACHE_TTL segundos y se invalidan
+explícitamente cuando el documento del usuario cambia (escrituras propias y
+listener sobre los usuarios admin), de modo que una degradación se aplica en
+segundos.
+"""
+
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+# ADMIN_ROLE_CACHE_TTL se lee al importar el módulo, antes del load_dotenv()
+# de config.firebase: sin esta llamada el valor de .env se ignoraba
+load_dotenv()
+
+
+class AdminRoleCache:
+    """Rol admin por uid con TTL; solo se cachean lecturas exitosas."""
+
+    def __init__(self, ttl_seconds=30):
+        self.ttl_seconds = max(0.0, float(ttl_seconds))
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, uid):
+        """True/False si hay una entrada vigente, None en caso contrario."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(uid)
+            if entry is None or entry[0] <= now:
+                self._entries.pop(uid, None)
+                self._misses += 1
+                return None
+            self._hits += 1
+            return entry[1]
+
+    def put(self, uid, is_admin):
+        if not self.ttl_seconds:
+            return
+        with self._lock:
+            self._entries[uid] = (time.monotonic() + self.ttl_seconds, bool(is_admin))
+
+    def invalidate(self, uid=None):
+        with self._lock:
+            if uid is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(uid, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "entries": len(self._entries),
+                "ttlSeconds": self.ttl_seconds,
+            }
+
+
+admin_role_cache = AdminRoleCache(os.getenv("ADMIN_ROLE_CACHE_TTL", "30"))
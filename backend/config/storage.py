@@ -0,0 +1,673 @@
+"""
+Backends de almacenamiento intercambiables para `db`.
+
+STORAGE_BACKEND selecciona el motor:
+
+- `firestore` (por defecto): cliente oficial de Firestore.
+- `sqlite`: archivo SQLite local (SQLITE_DATABASE_PATH) con índices sobre
+  `isActive` y `framework`; lecturas locales de menos de un milisegundo.
+- `memory`: diccionarios en memoria del proceso (pruebas y benchmarks offline).
+
+Los motores locales exponen el subconjunto de la API de Firestore que usan las
+rutas y scripts: `collection()/document()`, subcolecciones, `get/set/create/
+update/delete`, `add()`, consultas con `where(campo, "==", valor)`, `select()`,
+`order_by()`, `start_after()`, `limit()`, `stream()`, `get_all()` y `batch()`,
+además de campos bytes, `DELETE_FIELD` en `update()`, las transformaciones
+`ArrayUnion`/`ArrayRemove` en `set()`/`update()` y transacciones
+(`run_transaction`).
+Las precondiciones se respetan con las mismas excepciones de Firestore
+(`NotFound` en `update()`, `AlreadyExists` en `create()`) y un batch se aplica
+de forma atómica. No soportan listeners: `on_snapshot()` lanza
+UnsupportedOperation, y quien los arranca (config/firebase.py) lo hace solo
+con STORAGE_BACKEND=firestore.
+"""
+
+import base64
+import copy
+import json
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+from dotenv import load_dotenv
+from google.api_core.exceptions import AlreadyExists, NotFound
+from google.cloud.firestore_v1 import DELETE_FIELD, transactional
+from google.cloud.firestore_v1.transforms import ArrayRemove, ArrayUnion
+
+load_dotenv()
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+STORAGE_BACKENDS = ("firestore", "sqlite", "memory")
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "firestore").strip().lower()
+DOCUMENT_ID = "__name__"
+# Campos que se pueden filtrar en SQL (el resto se filtra en Python)
+SQL_FIELD_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$")
+
+
+def create_client(backend=None, sqlite_path=None):
+    """Cliente de almacenamiento para el backend indicado (o STORAGE_BACKEND)."""
+    backend = (backend or STORAGE_BACKEND).strip().lower()
+    if backend == "firestore":
+        import firebase_admin
+        from firebase_admin import firestore
+
+        # Cliente nuevo en cada llamada (firestore.client() lo cachea por app),
+        # necesario para recrear el canal gRPC tras un fork
+        firebase_app = firebase_admin.get_app()
+        return firestore.Client(
+            credentials=firebase_app.credential.get_credential(),
+            project=firebase_app.project_id,
+        )
+    if backend == "sqlite":
+        return LocalClient(SQLiteEngine(resolve_sqlite_path(sqlite_path)))
+    if backend == "memory":
+        return LocalClient(MemoryEngine())
+    raise RuntimeError(f"STORAGE_BACKEND debe ser uno de: {', '.join(STORAGE_BACKENDS)}")
+
+
+class UnsupportedOperation(NotImplementedError):
+    """Operación de Firestore que los motores locales no implementan (listeners)."""
+
+
+class ClientProxy:
+    """
+    Referencia estable al cliente de almacenamiento (`db`).
+
+    El cliente real se crea al primer uso y `reset()` lo descarta para que el
+    siguiente acceso cree uno nuevo: los canales gRPC de Firestore y las
+    conexiones SQLite no sobreviven a un fork, así que cada worker debe crear
+    los suyos.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        client = self._client
+        if client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+                client = self._client
+        return client
+
+    def __getattr__(self, name):
+        return getattr(self._get_client(), name)
+
+    def reset(self):
+        with self._lock:
+            self._client = None
+
+
+def resolve_sqlite_path(raw_path=None):
+    """Ruta del archivo SQLite; las relativas se resuelven contra backend/."""
+    path = Path(raw_path or os.getenv("SQLITE_DATABASE_PATH", "./storage.sqlite3"))
+    if not path.is_absolute():
+        path = BASE_DIR / path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+# ---------------------------------------------------------------------------
+# Utilidades sobre documentos (dicts anidados)
+# ---------------------------------------------------------------------------
+
+
+def _same_value(value, expected):
+    """Igualdad al estilo Firestore: True no es igual a 1."""
+    if isinstance(value, bool) or isinstance(expected, bool):
+        return type(value) is type(expected) and value == expected
+    return value == expected
+
+
+def _field_value(data, field_path):
+    """(encontrado, valor) para una ruta con puntos."""
+    value = data
+    for part in field_path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return False, None
+        value = value[part]
+    return True, value
+
+
+def _matches(doc_id, data, filters):
+    for field_path, expected in filters:
+        if field_path == DOCUMENT_ID:
+            found, value = True, doc_id
+        else:
+            found, value = _field_value(data, field_path)
+        if not found or not _same_value(value, expected):
+            return False
+    return True
+
+
+def _select(data, field_paths):
+    selected = {}
+    for field_path in field_paths:
+        if field_path == DOCUMENT_ID:
+            continue
+        found, value = _field_value(data, field_path)
+        if not found:
+            continue
+        parts = field_path.split(".")
+        target = selected
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = value
+    return selected
+
+
+def _resolve_transform(current, value):
+    """Valor final de un campo, resolviendo ArrayUnion/ArrayRemove como Firestore."""
+    if isinstance(value, ArrayUnion):
+        result = list(current) if isinstance(current, list) else []
+        for item in value.values:
+            if item not in result:
+                result.append(copy.deepcopy(item))
+        return result
+    if isinstance(value, ArrayRemove):
+        if not isinstance(current, list):
+            return []
+        return [item for item in current if item not in value.values]
+    return copy.deepcopy(value)
+
+
+def _apply_update(data, changes):
+    """Aplica `update()`: las claves con puntos modifican campos anidados."""
+    for field_path, value in changes.items():
+        parts = field_path.split(".")
+        target = data
+        for part in parts[:-1]:
+            child = target.get(part)
+            if not isinstance(child, dict):
+                child = {}
+                target[part] = child
+            target = child
+        if value is DELETE_FIELD:
+            target.pop(parts[-1], None)
+        else:
+            target[parts[-1]] = _resolve_transform(target.get(parts[-1]), value)
+    return data
+
+
+def _merge(data, changes):
+    """Aplica `set(merge=True)`: mezcla recursiva de mapas."""
+    for key, value in changes.items():
+        if isinstance(value, dict) and isinstance(data.get(key), dict):
+            _merge(data[key], value)
+        else:
+            data[key] = _resolve_transform(data.get(key), value)
+    return data
+
+
+def _sort_key(value):
+    # Orden estable entre tipos distintos (None primero, como Firestore)
+    if value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, str):
+        return (3, value)
+    return (4, json.dumps(value, sort_keys=True, default=str))
+
+
+# ---------------------------------------------------------------------------
+# Motores
+# ---------------------------------------------------------------------------
+
+
+def _encode_json_value(value):
+    # Campos bytes de Firestore (p. ej. fragmentos de plantillas comprimidos)
+    if isinstance(value, (bytes, bytearray)):
+        return {"__bytes__": base64.b64encode(value).decode("ascii")}
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+def _decode_json_object(obj):
+    if len(obj) == 1 and "__bytes__" in obj:
+        return base64.b64decode(obj["__bytes__"])
+    return obj
+
+
+def _dumps(data):
+    return json.dumps(data, ensure_ascii=False, default=_encode_json_value)
+
+
+def _loads(raw):
+    return json.loads(raw, object_hook=_decode_json_object)
+
+
+
+def commit_writes(engine, writes):
+    """
+    Aplica escrituras `(tipo, colección, id, datos, merge)` de forma atómica:
+    si alguna precondición falla no se escribe nada.
+    """
+    with engine.transaction():
+        pending = {}
+        for kind, collection_path, doc_id, data, merge in writes:
+            key = (collection_path, doc_id)
+            existing = pending[key] if key in pending else engine.load(collection_path, doc_id)
+            if kind == "create":
+                if existing is not None:
+                    raise AlreadyExists(f"Document already exists: {collection_path}/{doc_id}")
+                new_data = _merge({}, data)
+            elif kind == "set":
+                new_data = _merge((existing or {}) if merge else {}, data)
+            elif kind == "update":
+                if existing is None:
+                    raise NotFound(f"No document to update: {collection_path}/{doc_id}")
+                new_data = _apply_update(existing, data)
+            elif kind == "delete":
+                new_data = None
+            else:
+                raise ValueError(f"Escritura no soportada: {kind}")
+            pending[key] = new_data
+
+        for (collection_path, doc_id), data in pending.items():
+            if data is None:
+                engine.remove(collection_path, doc_id)
+            else:
+                engine.store(collection_path, doc_id, data)
+
+
+class MemoryEngine:
+    """Documentos en diccionarios del proceso."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._collections = {}
+
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            yield
+
+    def load(self, collection_path, doc_id):
+        with self._lock:
+            data = self._collections.get(collection_path, {}).get(doc_id)
+            return copy.deepcopy(data) if data is not None else None
+
+    def store(self, collection_path, doc_id, data):
+        with self._lock:
+            self._collections.setdefault(collection_path, {})[doc_id] = copy.deepcopy(data)
+
+    def remove(self, collection_path, doc_id):
+        with self._lock:
+            self._collections.get(collection_path, {}).pop(doc_id, None)
+
+    def scan(self, collection_path, filters=()):
+        """(id, datos) que cumplen los filtros, ordenados por ID."""
+        with self._lock:
+            docs = self._collections.get(collection_path, {})
+            return [
+                (doc_id, copy.deepcopy(docs[doc_id]))
+                for doc_id in sorted(docs)
+                if _matches(doc_id, docs[doc_id], filters)
+            ]
+
+    def close(self):
+        pass
+
+
+class SQLiteEngine:
+    """Documentos JSON en una tabla SQLite con índices de expresión."""
+
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS documents (
+            collection TEXT NOT NULL,
+            id TEXT NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (collection, id)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS documents_active_framework ON documents (
+            collection, json_extract(data, '$.isActive'), json_extract(data, '$.framework')
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS documents_framework ON documents (
+            collection, json_extract(data, '$.framework')
+        )
+        """,
+    )
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in self.SCHEMA:
+            self._conn.execute(statement)
+
+    @contextmanager
+    def transaction(self):
+        # Reentrante: una transacción local (LocalTransaction) confirma sus
+        # escrituras con commit_writes dentro de la transacción exterior
+        with self._lock:
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield
+                finally:
+                    self._depth -= 1
+                return
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._depth = 1
+            try:
+                yield
+            except BaseException:
+                self._depth = 0
+                self._conn.execute("ROLLBACK")
+                raise
+            self._depth = 0
+            self._conn.execute("COMMIT")
+
+    def load(self, collection_path, doc_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM documents WHERE collection = ? AND id = ?",
+                (collection_path, doc_id),
+            ).fetchone()
+        return _loads(row[0]) if row else None
+
+    def store(self, collection_path, doc_id, data):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents (collection, id, data) VALUES (?, ?, ?)",
+                (collection_path, doc_id, _dumps(data)),
+            )
+
+    def remove(self, collection_path, doc_id):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM documents WHERE collection = ? AND id = ?",
+                (collection_path, doc_id),
+            )
+
+    def scan(self, collection_path, filters=()):
+        """(id, datos) que cumplen los filtros, ordenados por ID."""
+        sql = ["SELECT id, data FROM documents WHERE collection = ?"]
+        params = [collection_path]
+        for field_path, expected in filters:
+            # Solo escalares con ruta simple se empujan a SQL (usa los índices);
+            # el filtro exacto final se hace en Python
+            if field_path == DOCUMENT_ID:
+                sql.append("AND id = ?")
+                params.append(expected)
+            elif SQL_FIELD_PATTERN.match(field_path) and isinstance(expected, (str, int, float, bool)):
+                sql.append(f"AND json_extract(data, '$.{field_path}') = ?")
+                params.append(expected)
+        sql.append("ORDER BY id")
+
+        with self._lock:
+            rows = self._conn.execute(" ".join(sql), params).fetchall()
+        docs = []
+        for doc_id, raw in rows:
+            data = _loads(raw)
+            if _matches(doc_id, data, filters):
+                docs.append((doc_id, data))
+        return docs
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# ---------------------------------------------------------------------------
+# API compatible con el cliente de Firestore
+# ---------------------------------------------------------------------------
+
+
+class LocalClient:
+    def __init__(self, engine):
+        self._engine = engine
+
+    def collection(self, collection_path):
+        return LocalCollectionReference(self, collection_path)
+
+    def document(self, document_path):
+        collection_path, _, doc_id = document_path.rpartition("/")
+        return LocalDocumentReference(self, collection_path, doc_id)
+
+    def batch(self):
+        return LocalWriteBatch(self)
+
+    def transaction(self):
+        return LocalTransaction(self)
+
+    def get_all(self, references, field_paths=None):
+        for reference in references:
+            yield reference.get(field_paths)
+
+    def close(self):
+        self._engine.close()
+
+    def _commit(self, writes):
+        commit_writes(self._engine, writes)
+
+
+class LocalDocumentSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field_path):
+        found, value = _field_value(self._data or {}, field_path)
+        if not found:
+            raise KeyError(field_path)
+        return copy.deepcopy(value)
+
+
+class LocalDocumentReference:
+    """Documento local; `on_snapshot()` lanza UnsupportedOperation."""
+
+    def __init__(self, client, collection_path, doc_id):
+        self._client = client
+        self._collection_path = collection_path
+        self.id = doc_id
+        self.path = f"{collection_path}/{doc_id}"
+
+    @property
+    def parent(self):
+        return LocalCollectionReference(self._client, self._collection_path)
+
+    def collection(self, collection_id):
+        return LocalCollectionReference(self._client, f"{self.path}/{collection_id}")
+
+    def get(self, field_paths=None, transaction=None):
+        # Dentro de una LocalTransaction el motor ya está bloqueado por este hilo
+        data = self._client._engine.load(self._collection_path, self.id)
+        if data is not None and field_paths is not None:
+            data = _select(data, field_paths)
+        return LocalDocumentSnapshot(self, data)
+
+    def create(self, document_data):
+        self._client._commit([("create", self._collection_path, self.id, document_data, False)])
+
+    def set(self, document_data, merge=False):
+        self._client._commit([("set", self._collection_path, self.id, document_data, merge)])
+
+    def update(self, field_updates):
+        self._client._commit([("update", self._collection_path, self.id, field_updates, False)])
+
+    def delete(self):
+        self._client._commit([("delete", self._collection_path, self.id, None, False)])
+
+    def on_snapshot(self, callback):
+        raise UnsupportedOperation("El almacenamiento local no soporta listeners")
+
+
+class LocalQuery:
+    """Consulta local; `on_snapshot()` lanza UnsupportedOperation."""
+
+    def __init__(self, client, collection_path, filters=(), field_paths=None, order=None, cursor=None, limit_count=None):
+        self._client = client
+        self._collection_path = collection_path
+        self._filters = tuple(filters)
+        self._field_paths = field_paths
+        self._order = order
+        self._cursor = cursor
+        self._limit = limit_count
+
+    def _copy(self, **changes):
+        state = {
+            "filters": self._filters,
+            "field_paths": self._field_paths,
+            "order": self._order,
+            "cursor": self._cursor,
+            "limit_count": self._limit,
+            **changes,
+        }
+        return LocalQuery(self._client, self._collection_path, **state)
+
+    def where(self, field_path, op_string, value):
+        if op_string != "==":
+            raise ValueError(f"Operador no soportado por el almacenamiento local: {op_string}")
+        return self._copy(filters=self._filters + ((str(field_path), value),))
+
+    def select(self, field_paths):
+        return self._copy(field_paths=[str(path) for path in field_paths])
+
+    def order_by(self, field_path, direction="ASCENDING"):
+        return self._copy(order=(str(field_path), direction == "DESCENDING"))
+
+    def start_after(self, document_fields_or_snapshot):
+        order_field = self._order[0] if self._order else DOCUMENT_ID
+        value = document_fields_or_snapshot
+        if isinstance(value, LocalDocumentSnapshot):
+            cursor = value.id if order_field == DOCUMENT_ID else value.get(order_field)
+        else:
+            cursor = value[order_field]
+        return self._copy(cursor=cursor)
+
+    def limit(self, count):
+        return self._copy(limit_count=count)
+
+    def stream(self):
+        docs = self._client._engine.scan(self._collection_path, self._filters)
+
+        order_field, descending = self._order or (DOCUMENT_ID, False)
+        if order_field == DOCUMENT_ID:
+            keys = [(doc_id, doc_id) for doc_id, _ in docs]
+        else:
+            keys = [(_sort_key(_field_value(data, order_field)[1]), doc_id) for doc_id, data in docs]
+        ordered = sorted(zip(keys, docs), key=lambda pair: pair[0], reverse=descending)
+
+        if self._cursor is not None:
+            cursor_key = self._cursor if order_field == DOCUMENT_ID else _sort_key(self._cursor)
+            ordered = [
+                pair
+                for pair in ordered
+                if (pair[0][0] < cursor_key if descending else pair[0][0] > cursor_key)
+            ]
+        if self._limit is not None:
+            ordered = ordered[: self._limit]
+
+        for _, (doc_id, data) in ordered:
+            if self._field_paths is not None:
+                data = _select(data, self._field_paths)
+            reference = LocalDocumentReference(self._client, self._collection_path, doc_id)
+            yield LocalDocumentSnapshot(reference, data)
+
+    def get(self):
+        return list(self.stream())
+
+    def on_snapshot(self, callback):
+        raise UnsupportedOperation("El almacenamiento local no soporta listeners")
+
+
+class LocalCollectionReference(LocalQuery):
+    def __init__(self, client, collection_path):
+        super().__init__(client, collection_path)
+        self.id = collection_path.rpartition("/")[2]
+
+    def document(self, document_id=None):
+        return LocalDocumentReference(self._client, self._collection_path, document_id or uuid.uuid4().hex[:20])
+
+    def add(self, document_data, document_id=None):
+        reference = self.document(document_id)
+        reference.create(document_data)
+        return datetime.now(timezone.utc), reference
+
+
+class LocalWriteBatch:
+    """Escrituras en cola aplicadas de forma atómica en `commit()`."""
+
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def _queue(self, kind, reference, data=None, merge=False):
+        self._writes.append((kind, reference._collection_path, reference.id, data, merge))
+
+    def create(self, reference, document_data):
+        self._queue("create", reference, document_data)
+
+    def set(self, reference, document_data, merge=False):
+        self._queue("set", reference, document_data, merge)
+
+    def update(self, reference, field_updates):
+        self._queue("update", reference, field_updates)
+
+    def delete(self, reference):
+        self._queue("delete", reference)
+
+    def commit(self):
+        writes, self._writes = self._writes, []
+        self._client._commit(writes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+
+
+class LocalTransaction(LocalWriteBatch):
+    """
+    Transacción local: el callback corre con el motor bloqueado (nadie más
+    lee ni escribe mientras tanto) y sus escrituras se aplican juntas al final.
+    """
+
+    def run(self, callback):
+        with self._client._engine.transaction():
+            self._writes = []
+            result = callback(self)
+            self.commit()
+        return result
+
+
+def run_transaction(client, callback):
+    """
+    Ejecuta `callback(transaction)` en una transacción y devuelve su resultado.
+    Las lecturas van con `ref.get(transaction=transaction)` antes de cualquier
+    escritura; en Firestore el callback se reintenta si hay contención, así que
+    no debe tener efectos fuera de la transacción.
+    """
+    transaction = client.transaction()
+    if isinstance(transaction, LocalTransaction):
+        return transaction.run(callback)
+    return transactional(callback)(transaction)
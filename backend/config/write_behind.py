@@ -0,0 +1,170 @@
+"""
+Cola write-behind que agrupa escrituras por clave.
+
+Las operaciones que llegan para la misma clave (p. ej. el uid) dentro de una
+ventana corta se acumulan y se confirman juntas con una sola llamada a
+`flush(clave, operaciones)`, que se ejecuta en un pool de hilos. Una clave no
+se vuelve a confirmar mientras su escritura anterior sigue en curso, así que
+las escrituras de una misma clave se aplican en orden.
+
+`pending(clave)` devuelve las operaciones aún no confirmadas (para que las
+lecturas de la misma instancia vean sus propios cambios) y `flush_all()`
+confirma todo lo pendiente; se registra con atexit para no perder cambios al
+reciclar o detener un worker.
+
+Una confirmación fallida vuelve a la cola (delante de lo que llegó después)
+hasta `max_attempts` intentos con espera creciente; después se descarta y
+queda contada en `stats()["dropped"]` junto con el último error.
+`discard(clave)` descarta lo que espera y además espera a que termine la
+confirmación en curso, marcándola como reemplazada para que un fallo no la
+reencole: quien escribe el valor completo después no es pisado por ella.
+"""
+
+import atexit
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class WriteBehindQueue:
+    def __init__(self, name, flush, window_seconds=0.25, max_workers=4, max_attempts=3, retry_seconds=1.0):
+        self.name = name
+        self.window_seconds = max(0.0, float(window_seconds))
+        self.max_attempts = max(1, int(max_attempts))
+        self.retry_seconds = max(0.0, float(retry_seconds))
+        self._flush = flush
+        self._max_workers = max_workers
+        self._cond = threading.Condition()
+        self._pending = {}
+        self._inflight = {}
+        self._superseded = set()
+        self._thread = None
+        self._executor = None
+        self._stats = {"submitted": 0, "commits": 0, "coalesced": 0, "errors": 0, "retries": 0, "dropped": 0}
+        self._last_error = None
+        atexit.register(self.flush_all)
+
+    def submit(self, key, operations):
+        """Encola operaciones para `key`; se confirman al cerrar su ventana."""
+        with self._cond:
+            entry = self._pending.get(key)
+            if entry is None:
+                entry = self._pending[key] = self._new_entry(time.monotonic() + self.window_seconds)
+            entry["operations"].extend(operations)
+            self._stats["submitted"] += len(operations)
+            self._ensure_worker()
+            self._cond.notify()
+
+    def pending(self, key):
+        """Operaciones de `key` todavía no confirmadas (en curso + en espera), en orden."""
+        with self._cond:
+            entry = self._pending.get(key)
+            return list(self._inflight.get(key, ())) + (list(entry["operations"]) if entry else [])
+
+    def discard(self, key, timeout=5.0):
+        """
+        Descarta lo que espera para `key` (p. ej. lo reemplaza una escritura
+        completa) y espera, hasta `timeout` segundos, la confirmación en curso.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._pending.pop(key, None)
+            if key in self._inflight:
+                self._superseded.add(key)
+            while key in self._inflight and time.monotonic() < deadline:
+                self._cond.wait(max(0.0, deadline - time.monotonic()))
+
+    def stats(self):
+        with self._cond:
+            return {
+                **self._stats,
+                "pendingKeys": len(self._pending),
+                "inflightKeys": len(self._inflight),
+                "lastError": self._last_error,
+            }
+
+    def flush_all(self, timeout=10.0):
+        """Confirma en este hilo todo lo pendiente (tras esperar lo que está en curso)."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._inflight and time.monotonic() < deadline:
+                self._cond.wait(0.05)
+            pending, self._pending = self._pending, {}
+            for key, entry in pending.items():
+                self._inflight[key] = entry["operations"]
+        for key, entry in pending.items():
+            # Sin hilo que reintente después: un único intento
+            self._commit(key, {**entry, "attempts": self.max_attempts - 1})
+
+    @staticmethod
+    def _new_entry(deadline, operations=None, attempts=0):
+        return {"deadline": deadline, "operations": list(operations or []), "attempts": attempts}
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._executor = ThreadPoolExecutor(self._max_workers, thread_name_prefix=f"{self.name}-flush")
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-write-behind", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                due = [
+                    key
+                    for key, entry in self._pending.items()
+                    if entry["deadline"] <= now and key not in self._inflight
+                ]
+                for key in due:
+                    entry = self._pending.pop(key)
+                    self._inflight[key] = entry["operations"]
+                    try:
+                        self._executor.submit(self._commit, key, entry)
+                    except RuntimeError:
+                        # El intérprete se está cerrando: flush_all() confirma lo que quede
+                        self._inflight.pop(key, None)
+                        self._pending[key] = entry
+                        return
+
+                waiting = [entry["deadline"] for key, entry in self._pending.items() if key not in self._inflight]
+                self._cond.wait(max(0.0, min(waiting) - now) if waiting else None)
+
+    def _commit(self, key, entry):
+        operations = entry["operations"]
+        error = None
+        try:
+            self._flush(key, operations)
+        except Exception as e:
+            error = e
+        with self._cond:
+            self._inflight.pop(key, None)
+            superseded = key in self._superseded
+            self._superseded.discard(key)
+            if error is None:
+                self._stats["commits"] += 1
+                self._stats["coalesced"] += max(0, len(operations) - 1)
+            else:
+                self._record_failure(key, entry, error, superseded)
+            self._cond.notify_all()
+
+    def _record_failure(self, key, entry, error, superseded):
+        # Se llama con el lock tomado
+        operations = entry["operations"]
+        attempts = entry["attempts"] + 1
+        self._stats["errors"] += 1
+        self._last_error = f"{key}: {error}"
+        print(f"Error confirmando escritura diferida ({self.name}, {key}, intento {attempts}): {error}")
+        if superseded:
+            # Una escritura completa posterior ya reemplazó estas operaciones
+            return
+        if attempts >= self.max_attempts:
+            self._stats["dropped"] += len(operations)
+            return
+        # Vuelve delante de lo que llegó mientras tanto, con espera creciente
+        self._stats["retries"] += 1
+        waiting = self._pending.get(key)
+        retry_at = time.monotonic() + self.retry_seconds * 2 ** (attempts - 1)
+        if waiting is not None:
+            retry_at = max(retry_at, waiting["deadline"])
+            operations = operations + waiting["operations"]
+        self._pending[key] = self._new_entry(retry_at, operations, attempts)
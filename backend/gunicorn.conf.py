@@ -0,0 +1,117 @@
+"""
+Configuración de gunicorn para producción:
+
+    gunicorn -c gunicorn.conf.py
+
+- SERVER_MODE=wsgi (por defecto): server:app con workers `gthread`.
+- SERVER_MODE=asgi: asgi:app con workers de uvicorn (rutas async de asgi.py).
+
+Workers (WEB_CONCURRENCY, por defecto 2 × núcleos + 1) e hilos por worker
+(GUNICORN_THREADS) son configurables. La app se precarga en el master
+(GUNICORN_PRELOAD) para compartir memoria entre workers; por eso los clientes
+de Firestore/SQLite se crean de forma perezosa y se descartan tras el fork, y
+los listeners se arrancan en cada worker.
+
+Métricas: los workers comparten sus contadores de /metrics por archivos en
+METRICS_MULTIPROC_DIR (si no se define, un directorio temporal propio de esta
+ejecución); el master limpia el directorio al arrancar y acumula el de cada
+worker que termina (p. ej. al reciclarse por GUNICORN_MAX_REQUESTS).
+
+Cachés del catálogo: cada worker tiene la suya; las escrituras se avisan entre
+workers con archivos de versión en CATALOG_VERSION_DIR (por defecto también un
+directorio temporal de esta ejecución).
+
+STORAGE_BACKEND=memory guarda los datos en cada proceso: se fuerza un único
+worker para que todas las escrituras y lecturas vean los mismos datos.
+
+Recarga sin cortar requests: `kill -HUP <master>` reemplaza los workers de
+forma ordenada (GUNICORN_GRACEFUL_TIMEOUT). Con precarga el código no se
+relee en un HUP; para desplegar código nuevo usar USR2 + QUIT del master viejo
+o reiniciar el contenedor.
+"""
+
+import math
+import os
+import tempfile
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _env_int(name, default):
+    raw = os.getenv(name)
+    return int(raw) if raw not in (None, "") else default
+
+
+def available_cpus():
+    """Núcleos utilizables por el contenedor (afinidad y cuota de cgroup v2)."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        quota, period = open("/sys/fs/cgroup/cpu.max").read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+SERVER_MODE = os.getenv("SERVER_MODE", "wsgi").strip().lower()
+
+bind = f"0.0.0.0:{os.getenv('PORT') or os.getenv('FLASK_PORT', '5000')}"
+wsgi_app = "asgi:app" if SERVER_MODE == "asgi" else "server:app"
+worker_class = "uvicorn.workers.UvicornWorker" if SERVER_MODE == "asgi" else "gthread"
+workers = _env_int("WEB_CONCURRENCY", available_cpus() * 2 + 1)
+if os.getenv("STORAGE_BACKEND", "firestore").strip().lower() == "memory" and workers != 1:
+    print("STORAGE_BACKEND=memory: los datos viven en cada proceso, se usa un solo worker")
+    workers = 1
+threads = _env_int("GUNICORN_THREADS", 8)
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() in ("1", "true", "yes", "on")
+
+timeout = _env_int("GUNICORN_TIMEOUT", 60)
+graceful_timeout = _env_int("GUNICORN_GRACEFUL_TIMEOUT", 30)
+keepalive = _env_int("GUNICORN_KEEPALIVE", 5)
+# Reciclar workers periódicamente (con jitter para no reiniciarlos a la vez)
+max_requests = _env_int("GUNICORN_MAX_REQUESTS", 10000)
+max_requests_jitter = _env_int("GUNICORN_MAX_REQUESTS_JITTER", 1000)
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-") or None
+errorlog = "-"
+
+# server.py no arranca listeners al importarse: los hilos y canales gRPC del
+# master no sobreviven al fork
+os.environ["SERVER_DEFER_LISTENERS"] = "1"
+# Sin directorio compartido cada worker respondería /metrics solo con lo suyo.
+# Se define antes de precargar la app (middleware/metrics.py lo lee al importarse)
+if not os.getenv("METRICS_MULTIPROC_DIR", "").strip():
+    os.environ["METRICS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="dagger-metrics-")
+# Invalidación de las cachés del catálogo entre workers (config/catalog_cache.py)
+if not os.getenv("CATALOG_VERSION_DIR", "").strip():
+    os.environ["CATALOG_VERSION_DIR"] = tempfile.mkdtemp(prefix="dagger-catalog-")
+
+
+def on_starting(server):
+    from middleware.metrics import clear_metrics_dir
+
+    clear_metrics_dir()
+
+
+def post_fork(server, worker):
+    from config.firebase import reset_storage_clients
+
+    reset_storage_clients()
+
+
+def post_worker_init(worker):
+    import server
+
+    server.start_background_listeners()
+
+
+def child_exit(server, worker):
+    from middleware.metrics import archive_worker_metrics
+
+    archive_worker_metrics(worker.pid)
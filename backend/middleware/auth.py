@@ -1,6 +1,21 @@
+import os
 from functools import wraps
 from flask import request, jsonify
-from config.firebase import verify_jwt_token, get_user_profile
+from config.firebase import verify_jwt_token, resolve_admin_role
+from middleware.token_cache import VerifiedTokenCache
+
+# Payloads ya verificados por token (AUTH_TOKEN_CACHE_SIZE=0 la desactiva)
+token_cache = VerifiedTokenCache(os.getenv('AUTH_TOKEN_CACHE_SIZE', '1024'))
+
+
+def verify_token_cached(token):
+    """Verifica un JWT reutilizando el resultado de verificaciones previas"""
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = verify_jwt_token(token)
+        if payload:
+            token_cache.put(token, payload)
+    return payload
 
 def require_auth(f):
     """Decorator para requerir autenticación"""
@@ -12,7 +27,7 @@ def require_auth(f):
             return jsonify({'error': 'No autorizado'}), 401
         
         token = auth_header.split('Bearer ')[1]
-        payload = verify_jwt_token(token)
+        payload = verify_token_cached(token)
         
         if not payload:
             return jsonify({'error': 'Token inválido o expirado'}), 401
@@ -36,14 +51,13 @@ def require_admin(f):
             return jsonify({'error': 'No autorizado'}), 401
         
         token = auth_header.split('Bearer ')[1]
-        payload = verify_jwt_token(token)
+        payload = verify_token_cached(token)
         
         if not payload:
             return jsonify({'error': 'Token inválido o expirado'}), 401
         
-        # Verificar permisos de admin desde Firestore (más seguro)
-        profile = get_user_profile(payload['uid'])
-        if not profile or not profile.get('admin', False):
+        # Verificar permisos de admin desde Firestore (más seguro), con caché de corta duración
+        if not resolve_admin_role(payload['uid']):
             return jsonify({'error': 'Se requieren permisos de administrador'}), 403
         
         request.uid = payload['uid']
@@ -51,4 +65,33 @@ def require_admin(f):
         request.is_admin = True
         return f(*args, **kwargs)
     
-    return decorated_function
\ No newline at end of file
+    return decorated_function
+
+def optional_auth(f):
+    """Decorator para rutas públicas que aprovechan la sesión si existe"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        auth_header = request.headers.get('Authorization')
+        request.uid = None
+        request.user_email = None
+        request.is_admin = False
+        request.is_anonymous = False
+
+        if not auth_header:
+            return f(*args, **kwargs)
+        if not auth_header.startswith('Bearer '):
+            return jsonify({'error': 'No autorizado'}), 401
+
+        token = auth_header.split('Bearer ')[1]
+        payload = verify_token_cached(token)
+
+        if not payload:
+            return jsonify({'error': 'Token inválido o expirado'}), 401
+
+        request.uid = payload['uid']
+        request.user_email = payload['email']
+        request.is_admin = payload.get('admin', False)
+        request.is_anonymous = payload.get('isAnonymous', False)
+        return f(*args, **kwargs)
+
+    return decorated_function
@@ -0,0 +1,126 @@
+"""
+Compresión negociada (brotli/gzip) de respuestas.
+
+- Respuestas dinámicas (JSON) por encima de COMPRESSION_MIN_SIZE bytes se
+  comprimen en `after_request` según el `Accept-Encoding` del cliente.
+- Los archivos del build (`dist`) se sirven desde hermanos precomprimidos
+  `.br` / `.gz` generados una sola vez con scripts/precompress_dist.py.
+
+brotli es opcional: si el paquete no está instalado solo se usa gzip.
+"""
+
+import gzip
+import mimetypes
+import os
+from pathlib import Path
+
+from flask import request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependencia opcional
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/javascript",
+    "text/javascript",
+    "text/css",
+    "text/html",
+    "text/plain",
+    "image/svg+xml",
+}
+# Niveles: dinámico prioriza velocidad, estático (precompresión) prioriza tamaño
+DYNAMIC_LEVELS = {"br": 5, "gzip": 6}
+STATIC_LEVELS = {"br": 11, "gzip": 9}
+STATIC_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+def supported_encodings():
+    """Codificaciones disponibles en orden de preferencia."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(available=None):
+    """Mejor codificación aceptada por el cliente entre `available`, o None."""
+    accept = request.accept_encodings
+    best, best_quality = None, 0
+    for encoding in available or supported_encodings():
+        quality = accept[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data, encoding, static=False):
+    levels = STATIC_LEVELS if static else DYNAMIC_LEVELS
+    if encoding == "br":
+        return brotli.compress(data, quality=levels["br"])
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=levels["gzip"], mtime=0)
+    raise ValueError(f"Codificación no soportada: {encoding}")
+
+
+def etag_variants(etag):
+    """ETags válidos para un recurso según la codificación con que se envió."""
+    return [etag, *(f"{etag}-{encoding}" for encoding in supported_encodings())]
+
+
+def encoded_etag(etag, encoding):
+    """ETag fuerte distinto por representación comprimida (estilo Apache)."""
+    return f"{etag}-{encoding}"
+
+
+def send_precompressed(directory, path):
+    """Envía un archivo estático usando su hermano `.br`/`.gz` si el cliente lo acepta."""
+    directory = Path(directory)
+    # Servir un .br ya generado no requiere el paquete brotli
+    available = [
+        encoding
+        for encoding in ("br", "gzip")
+        if (directory / f"{path}{STATIC_SUFFIXES[encoding]}").is_file()
+    ]
+    encoding = negotiate_encoding(available) if available else None
+
+    if encoding is None:
+        response = send_from_directory(directory, path)
+    else:
+        mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        response = send_from_directory(directory, f"{path}{STATIC_SUFFIXES[encoding]}", mimetype=mimetype)
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def init_compression(app):
+    """Registra la compresión de respuestas dinámicas en la app."""
+
+    @app.after_request
+    def compress_response(response):
+        if (
+            response.direct_passthrough
+            or response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        ):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        data = response.get_data()
+        if len(data) < COMPRESSION_MIN_SIZE:
+            return response
+
+        encoding = negotiate_encoding()
+        if encoding is None:
+            return response
+
+        response.set_data(compress(data, encoding))
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(encoded_etag(etag, encoding))
+        return response
+
+    return app
@@ -0,0 +1,309 @@
+"""
+Métricas de requests por endpoint en formato de texto de Prometheus (/metrics).
+
+Cada request registra, por endpoint de Flask (`tasks.get_tasks`,
+`templates.get_template`, ...) y método:
+
+- `http_request_duration_seconds`: histograma de latencia.
+- `http_response_size_bytes`: histograma del tamaño de la respuesta (tras la
+  compresión).
+- `http_requests_total`: contador por código de estado.
+- `db_document_reads_total`, `db_document_writes_total`, `db_rpcs_total` y
+  `db_rpc_seconds_total`: operaciones de almacenamiento hechas por el request
+  (config/db_instrumentation.py), para ubicar los endpoints más costosos.
+
+Cada respuesta lleva además un encabezado `Server-Timing` con el tiempo total
+y el de almacenamiento (lecturas/escrituras en la descripción), visible en las
+herramientas de desarrollo del navegador.
+
+Las URLs sin ruta se agrupan en el endpoint `unmatched` para no crear una serie
+por path. El costo por request es un `bisect` y unos incrementos bajo un lock.
+
+Con varios workers (gunicorn) cada proceso tiene sus propios contadores. Si
+METRICS_MULTIPROC_DIR está definido, cada worker vuelca los suyos a ese
+directorio cada METRICS_FLUSH_INTERVAL segundos y /metrics suma los de todos.
+Al morir un worker, gunicorn.conf.py acumula su archivo en uno de archivo
+histórico para que los contadores no retrocedan.
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+from flask import Response, g, request
+
+from config.db_instrumentation import current_accounting, start_accounting, stop_accounting
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR", "").strip()
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+ARCHIVE_FILENAME = "metrics-archive.json"
+UNMATCHED_ENDPOINT = "unmatched"
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() in ("1", "true", "yes", "on")
+DB_FIELDS = ("dbReads", "dbWrites", "dbRpcs", "dbSeconds")
+# (campo de la serie, métrica, ayuda)
+DB_COUNTERS = (
+    ("dbReads", "db_document_reads_total", "Documentos leídos por endpoint (criterio de facturación de Firestore)."),
+    ("dbWrites", "db_document_writes_total", "Documentos escritos por endpoint."),
+    ("dbRpcs", "db_rpcs_total", "Llamadas al almacenamiento por endpoint."),
+    ("dbSeconds", "db_rpc_seconds_total", "Segundos dentro del cliente de almacenamiento por endpoint."),
+)
+
+
+def _new_series():
+    return {
+        # Conteos por bucket (no acumulados); la última posición es +Inf
+        "latency": [0] * (len(LATENCY_BUCKETS) + 1),
+        "latencySum": 0.0,
+        "size": [0] * (len(SIZE_BUCKETS) + 1),
+        "sizeSum": 0,
+        "statuses": {},
+        "dbReads": 0,
+        "dbWrites": 0,
+        "dbRpcs": 0,
+        "dbSeconds": 0.0,
+    }
+
+
+def merge_series(target, source):
+    """Suma las series de `source` en `target` (ambos {"endpoint method": serie})."""
+    for key, series in source.items():
+        merged = target.setdefault(key, _new_series())
+        merged["latency"] = [a + b for a, b in zip(merged["latency"], series["latency"])]
+        merged["latencySum"] += series["latencySum"]
+        merged["size"] = [a + b for a, b in zip(merged["size"], series["size"])]
+        merged["sizeSum"] += series["sizeSum"]
+        for status, count in series["statuses"].items():
+            merged["statuses"][status] = merged["statuses"].get(status, 0) + count
+        for field in DB_FIELDS:
+            merged[field] += series.get(field, 0)
+    return target
+
+
+class RequestMetrics:
+    """Histogramas y contadores de requests de este proceso."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+        self._writer = None
+
+    def observe(self, endpoint, method, status, seconds, size, db=None):
+        latency_bucket = bisect_left(LATENCY_BUCKETS, seconds)
+        size_bucket = bisect_left(SIZE_BUCKETS, size) if size is not None else None
+        status = str(status)
+        with self._lock:
+            series = self._series.get((endpoint, method))
+            if series is None:
+                series = self._series[(endpoint, method)] = _new_series()
+            series["latency"][latency_bucket] += 1
+            series["latencySum"] += seconds
+            if size_bucket is not None:
+                series["size"][size_bucket] += 1
+                series["sizeSum"] += size
+            series["statuses"][status] = series["statuses"].get(status, 0) + 1
+            if db is not None:
+                series["dbReads"] += db.reads
+                series["dbWrites"] += db.writes
+                series["dbRpcs"] += db.rpcs
+                series["dbSeconds"] += db.seconds
+        if METRICS_MULTIPROC_DIR and self._writer is None:
+            self._start_writer()
+
+    def snapshot(self):
+        """Copia serializable: {"endpoint method": serie}."""
+        with self._lock:
+            return {
+                f"{endpoint} {method}": {
+                    **series,
+                    "latency": list(series["latency"]),
+                    "size": list(series["size"]),
+                    "statuses": dict(series["statuses"]),
+                }
+                for (endpoint, method), series in self._series.items()
+            }
+
+    def _start_writer(self):
+        # Se arranca con el primer request, es decir ya en el worker (tras el fork)
+        with self._lock:
+            if self._writer is not None:
+                return
+            self._writer = threading.Thread(target=self._write_loop, name="metrics-writer", daemon=True)
+        self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            time.sleep(METRICS_FLUSH_INTERVAL)
+            try:
+                self.write_snapshot()
+            except Exception as e:
+                print(f"Error guardando métricas: {e}")
+
+    def write_snapshot(self, directory=METRICS_MULTIPROC_DIR):
+        if directory:
+            write_series_file(Path(directory) / f"metrics-{os.getpid()}.json", self.snapshot())
+
+
+request_metrics = RequestMetrics()
+
+
+def write_series_file(path, series):
+    """Escritura atómica (archivo temporal + rename) para no leer archivos a medias."""
+    temp_path = path.with_name(f".{path.name}.tmp")
+    temp_path.write_text(json.dumps(series), encoding="utf-8")
+    os.replace(temp_path, path)
+
+
+def read_series_file(path):
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def archive_worker_metrics(pid, directory=METRICS_MULTIPROC_DIR):
+    """Acumula el archivo de un worker terminado en el histórico (lo llama el master)."""
+    if not directory:
+        return
+    worker_path = Path(directory) / f"metrics-{pid}.json"
+    if not worker_path.exists():
+        return
+    archive_path = Path(directory) / ARCHIVE_FILENAME
+    archived = merge_series(read_series_file(archive_path), read_series_file(worker_path))
+    write_series_file(archive_path, archived)
+    worker_path.unlink(missing_ok=True)
+
+
+def clear_metrics_dir(directory=METRICS_MULTIPROC_DIR):
+    """Borra los archivos de una ejecución anterior (al arrancar el master)."""
+    if not directory:
+        return
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+    for stale in path.glob("*metrics-*.json*"):
+        stale.unlink(missing_ok=True)
+
+
+def collect_series():
+    """Series de este proceso más las de los demás workers (si hay directorio compartido)."""
+    series = request_metrics.snapshot()
+    if not METRICS_MULTIPROC_DIR:
+        return series
+    own_file = f"metrics-{os.getpid()}.json"
+    collected = {}
+    for path in Path(METRICS_MULTIPROC_DIR).glob("metrics-*.json"):
+        if path.name != own_file:
+            merge_series(collected, read_series_file(path))
+    return merge_series(collected, series)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_bound(bound):
+    return repr(float(bound)) if isinstance(bound, float) else str(bound)
+
+
+def _histogram_lines(name, labels, counts, total_sum, bounds):
+    lines = []
+    cumulative = 0
+    for bound, count in zip(bounds, counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels},le="{_format_bound(bound)}"}} {cumulative}')
+    cumulative += counts[-1]
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {cumulative}')
+    lines.append(f"{name}_sum{{{labels}}} {total_sum}")
+    lines.append(f"{name}_count{{{labels}}} {cumulative}")
+    return lines
+
+
+def render_metrics(series):
+    """Texto en formato de exposición de Prometheus (versión 0.0.4)."""
+    items = sorted((key.split(" ", 1), value) for key, value in series.items())
+    latency = [
+        "# HELP http_request_duration_seconds Latencia de los requests por endpoint.",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    size = [
+        "# HELP http_response_size_bytes Tamaño de las respuestas por endpoint.",
+        "# TYPE http_response_size_bytes histogram",
+    ]
+    totals = [
+        "# HELP http_requests_total Requests por endpoint, método y código de estado.",
+        "# TYPE http_requests_total counter",
+    ]
+    db = {field: [f"# HELP {name} {help_text}", f"# TYPE {name} counter"] for field, name, help_text in DB_COUNTERS}
+    for (endpoint, method), value in items:
+        labels = f'endpoint="{_escape(endpoint)}",method="{_escape(method)}"'
+        latency += _histogram_lines(
+            "http_request_duration_seconds", labels, value["latency"], value["latencySum"], LATENCY_BUCKETS
+        )
+        if any(value["size"]):
+            size += _histogram_lines("http_response_size_bytes", labels, value["size"], value["sizeSum"], SIZE_BUCKETS)
+        for status, count in sorted(value["statuses"].items()):
+            totals.append(f'http_requests_total{{{labels},status="{_escape(status)}"}} {count}')
+        if value.get("dbRpcs"):
+            for field, name, _ in DB_COUNTERS:
+                db[field].append(f"{name}{{{labels}}} {value[field]}")
+    return "\n".join(latency + size + totals + [line for lines in db.values() for line in lines]) + "\n"
+
+
+def server_timing(total_seconds, db):
+    """Valor del encabezado Server-Timing (duraciones en milisegundos)."""
+    entries = [f"app;dur={total_seconds * 1000:.1f}"]
+    if db is not None and db.rpcs:
+        entries.append(
+            f'db;dur={db.seconds * 1000:.1f};desc="lecturas={db.reads} escrituras={db.writes} rpc={db.rpcs}"'
+        )
+    return ", ".join(entries)
+
+
+def init_metrics(app):
+    """
+    Registra la medición de requests y el endpoint /metrics. Debe llamarse
+    antes que init_compression para medir el tamaño ya comprimido.
+    """
+
+    @app.before_request
+    def start_timer():
+        g.metrics_started_at = time.perf_counter()
+        g.db_accounting_token = start_accounting()
+
+    @app.after_request
+    def record_request(response):
+        started_at = g.pop("metrics_started_at", None)
+        if started_at is None:
+            return response
+        elapsed = time.perf_counter() - started_at
+        db = current_accounting()
+        size = response.content_length
+        if size is None and not response.is_streamed:
+            size = response.calculate_content_length()
+        request_metrics.observe(
+            request.endpoint or UNMATCHED_ENDPOINT,
+            request.method,
+            response.status_code,
+            elapsed,
+            size,
+            db,
+        )
+        if SERVER_TIMING_ENABLED:
+            response.headers["Server-Timing"] = server_timing(elapsed, db)
+        return response
+
+    @app.teardown_request
+    def stop_db_accounting(exc):
+        token = g.pop("db_accounting_token", None)
+        if token is not None:
+            stop_accounting(token)
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        return Response(render_metrics(collect_series()), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+    return app
@@ -0,0 +1,72 @@
+"""
+LRU acotada de tokens JWT ya verificados.
+
+Las entradas se indexan por el SHA-256 del token (nunca se guarda el token en
+claro) y caducan en el `exp` del propio token, así que un token nunca se
+acepta desde la caché más allá de su vigencia.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class VerifiedTokenCache:
+    """Caché LRU de payloads verificados, con caducidad en el `exp` del token."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max(0, int(max_entries))
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token):
+        """Payload cacheado del token o None si no está o ya expiró."""
+        if not self.max_entries:
+            return None
+        key = self._key(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            expires_at, payload = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return payload
+
+    def put(self, token, payload):
+        """Guarda un payload verificado; sin `exp` numérico no se cachea."""
+        expires_at = payload.get("exp") if isinstance(payload, dict) else None
+        if not self.max_entries or not isinstance(expires_at, (int, float)):
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (expires_at, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+            }
@@ -0,0 +1,759 @@
+"""
+Generación de código Python de DAGs de Airflow a partir del grafo del editor.
+
+Port de `exportAirflowToPython` (frontend/src/services/dagService.js): mismo
+payload `nodes`/`edges`, mismo mapeo AIRFLOW_IMPORT_BY_TYPE, orden topológico,
+manejo de default_args y ramas de BranchPythonOperator, y misma salida.
+
+El módulo es puro (sin Firebase ni Flask) para poder ejecutarse en un pool de
+procesos. La salida compilada se cachea por hash del grafo; el encabezado con
+la fecha de generación se agrega al devolverla.
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from multiprocessing import get_context
+
+ROOT_AIRFLOW_TYPE = "DAG"
+ROOT_ARGO_TYPE = "ArgoWorkflow"
+BRANCH_TYPE = "BranchPythonOperator"
+
+AIRFLOW_IMPORT_BY_TYPE = {
+    "BashOperator": "from airflow.operators.bash import BashOperator",
+    "PythonOperator": "from airflow.operators.python import PythonOperator",
+    "PythonVirtualenvOperator": "from airflow.operators.python import PythonVirtualenvOperator",
+    "BranchPythonOperator": "from airflow.operators.python import BranchPythonOperator",
+    "ShortCircuitOperator": "from airflow.operators.python import ShortCircuitOperator",
+    "DummyOperator": "from airflow.operators.dummy import DummyOperator",
+    "PostgresOperator": "from airflow.providers.postgres.operators.postgres import PostgresOperator",
+    "BigQueryOperator": "from airflow.providers.google.cloud.operators.bigquery import BigQueryInsertJobOperator as BigQueryOperator",
+    "SQLExecuteQueryOperator": "from airflow.providers.common.sql.operators.sql import SQLExecuteQueryOperator",
+    "LocalFilesystemToS3Operator": "from airflow.providers.amazon.aws.transfers.local_to_s3 import LocalFilesystemToS3Operator",
+    "S3ToS3Operator": "from airflow.providers.amazon.aws.transfers.s3_to_s3 import S3ToS3Operator",
+    "SFTPOperator": "from airflow.providers.sftp.operators.sftp import SFTPOperator",
+    "GCSToBigQueryOperator": "from airflow.providers.google.cloud.transfers.gcs_to_bigquery import GCSToBigQueryOperator",
+    "FileSensor": "from airflow.sensors.filesystem import FileSensor",
+    "S3KeySensor": "from airflow.providers.amazon.aws.sensors.s3 import S3KeySensor",
+    "SqlSensor": "from airflow.sensors.sql import SqlSensor",
+    "HttpSensor": "from airflow.providers.http.sensors.http import HttpSensor",
+}
+
+DEFAULT_ARGS_KEYS = {
+    "owner",
+    "depends_on_past",
+    "start_date",
+    "email",
+    "email_on_failure",
+    "email_on_retry",
+    "retries",
+    "retry_delay",
+    "retry_exponential_backoff",
+    "max_retry_delay",
+    "sla",
+    "execution_timeout",
+}
+
+CALLABLE_OPERATOR_TYPES = {
+    "PythonOperator",
+    "PythonVirtualenvOperator",
+    BRANCH_TYPE,
+    "ShortCircuitOperator",
+}
+
+NUMERIC_FIELDS = {"retries", "poke_interval", "timeout", "concurrency", "max_active_runs"}
+
+CODEGEN_CACHE_SIZE = int(os.getenv("DAG_CODEGEN_CACHE_SIZE", "256"))
+# Pocos procesos fijos: cada worker de gunicorn tiene su propio pool
+CODEGEN_WORKERS = max(1, int(os.getenv("DAG_CODEGEN_WORKERS", "2")))
+
+MODULE_HEADER = '''"""
+DAG exportado desde DAGGER v1.0.0
+Compatible con Apache Airflow 2.4.0
+Generado: {generated}
+"""
+'''
+
+_JS_DECIMAL = re.compile(r"^[+-]?(\d+\.?\d*|\.\d+)(e[+-]?\d+)?$", re.IGNORECASE)
+_JS_PREFIXED = re.compile(r"^0([xob])([0-9a-f]+)$", re.IGNORECASE)
+
+
+# ---------------------------------------------------------------------------
+# Semántica de JavaScript necesaria para producir la misma salida
+# ---------------------------------------------------------------------------
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _js_truthy(value):
+    if isinstance(value, (list, dict)):
+        return True
+    if isinstance(value, float) and math.isnan(value):
+        return False
+    return value not in (None, False, 0, "")
+
+
+def _string_to_number(text):
+    """Number(str) de JavaScript (NaN si no es numérico)."""
+    text = text.strip()
+    if text == "":
+        return 0
+    if _JS_DECIMAL.match(text):
+        number = float(text)
+        return int(number) if number.is_integer() and abs(number) < 1e21 else number
+    prefixed = _JS_PREFIXED.match(text)
+    if prefixed:
+        base = {"x": 16, "o": 8, "b": 2}[prefixed.group(1).lower()]
+        try:
+            return int(prefixed.group(2), base)
+        except ValueError:
+            return math.nan
+    if text in ("Infinity", "+Infinity"):
+        return math.inf
+    if text == "-Infinity":
+        return -math.inf
+    return math.nan
+
+
+def _js_number(value):
+    """Number(value) de JavaScript para valores JSON."""
+    if value is None:
+        return 0
+    if isinstance(value, bool):
+        return int(value)
+    if _is_number(value):
+        return value
+    if isinstance(value, str):
+        return _string_to_number(value)
+    if isinstance(value, list):
+        if not value:
+            return 0
+        if len(value) == 1:
+            return _js_number(_js_string(value[0]))
+    return math.nan
+
+
+def _js_or(*values):
+    """Operador `||` de JavaScript: primer valor truthy o el último."""
+    for value in values[:-1]:
+        if _js_truthy(value):
+            return value
+    return values[-1]
+
+
+def _is_finite(value):
+    return _is_number(value) and math.isfinite(value)
+
+
+def _number_to_string(value):
+    """Number.prototype.toString() de JavaScript."""
+    if not isinstance(value, float):
+        return str(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "Infinity" if value > 0 else "-Infinity"
+    if value.is_integer() and abs(value) < 1e21:
+        return str(int(value))
+    text = repr(value)
+    if "e" in text:
+        mantissa, exponent = text.split("e")
+        text = f"{mantissa.removesuffix('.0')}e{'+' if int(exponent) > 0 else '-'}{abs(int(exponent))}"
+    return text
+
+
+def _js_string(value):
+    """String(value) de JavaScript para valores JSON."""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if _is_number(value):
+        return _number_to_string(value)
+    if isinstance(value, list):
+        return ",".join("" if item is None else _js_string(item) for item in value)
+    if isinstance(value, dict):
+        return "[object Object]"
+    return str(value)
+
+
+# ---------------------------------------------------------------------------
+# Helpers (mismos nombres que en dagService.js)
+# ---------------------------------------------------------------------------
+
+
+def sanitize_task_id(value, fallback="task"):
+    base = _js_string(value if _js_truthy(value) else fallback).strip().lower()
+    base = re.sub(r"[^a-z0-9_]+", "_", base).strip("_")
+    return base or fallback
+
+
+def sanitize_python_identifier(value, fallback="task_ref"):
+    cleaned = _js_string(value if _js_truthy(value) else fallback).strip()
+    cleaned = re.sub(r"[^a-zA-Z0-9_]+", "_", cleaned).strip("_")
+    return cleaned if re.match(r"^[a-zA-Z_]", cleaned) else f"n_{cleaned}"
+
+
+def parse_date_literal(value, timezone_name=None):
+    if not isinstance(value, str):
+        return None
+    match = re.match(r"^(\d{4})-(\d{2})-(\d{2})$", value.strip())
+    if not match:
+        return None
+    y, m, d = (int(part) for part in match.groups())
+    if timezone_name and _js_string(timezone_name).strip():
+        return f"datetime({y}, {m}, {d}, tzinfo=timezone('{_js_string(timezone_name).strip()}'))"
+    return f"datetime({y}, {m}, {d})"
+
+
+def _quote(text):
+    return "'" + text.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def to_python_literal(value):
+    if value is None:
+        return "None"
+    if isinstance(value, bool):
+        return "True" if value else "False"
+    if _is_number(value):
+        return _number_to_string(value) if math.isfinite(value) else "None"
+    if isinstance(value, str):
+        return _quote(value)
+    if isinstance(value, list):
+        return "[" + ", ".join(to_python_literal(item) for item in value) + "]"
+    if isinstance(value, dict):
+        if not value:
+            return "{}"
+        return "{" + ", ".join(f"{_quote(str(k))}: {to_python_literal(v)}" for k, v in value.items()) + "}"
+    return f"'{value}'"
+
+
+def normalize_primitive(value):
+    if isinstance(value, str):
+        v = value.strip().lower()
+        if v == "true":
+            return True
+        if v == "false":
+            return False
+        if v != "":
+            number = _string_to_number(v)
+            if not (isinstance(number, float) and math.isnan(number)):
+                return number
+    return value
+
+
+def normalize_import_meta(meta):
+    if not _js_truthy(meta):
+        return []
+    if isinstance(meta, str):
+        return [meta]
+    if isinstance(meta, list):
+        return [line for item in meta for line in normalize_import_meta(item)]
+    if isinstance(meta, dict):
+        from_module = _js_or(meta.get("from"), meta.get("module"))
+        imported = _js_or(meta.get("import"), meta.get("class"), meta.get("name"))
+        alias = _js_or(meta.get("as"), meta.get("alias"))
+        if _js_truthy(from_module) and _js_truthy(imported):
+            suffix = f" as {_js_string(alias)}" if _js_truthy(alias) else ""
+            return [f"from {_js_string(from_module)} import {_js_string(imported)}{suffix}"]
+    return []
+
+
+def topological_sort(node_ids, edges):
+    indegree = {node_id: 0 for node_id in node_ids}
+    adjacency = {node_id: [] for node_id in node_ids}
+    for edge in edges:
+        source, target = edge.get("source"), edge.get("target")
+        if source not in indegree or target not in indegree:
+            continue
+        adjacency[source].append(target)
+        indegree[target] += 1
+
+    queue = deque(node_id for node_id in node_ids if indegree[node_id] == 0)
+    result = []
+    while queue:
+        current = queue.popleft()
+        result.append(current)
+        for nxt in adjacency[current]:
+            indegree[nxt] -= 1
+            if indegree[nxt] == 0:
+                queue.append(nxt)
+
+    # Si hay ciclo, conservar orden estable original de ids faltantes
+    if len(result) < len(node_ids):
+        done = set(result)
+        result.extend(node_id for node_id in node_ids if node_id not in done)
+    return result
+
+
+def build_default_args_and_dag_config(root_params=None):
+    root_params = root_params or {}
+    default_args = {}
+    dag_config = {}
+    start_date_timezone = _js_or(root_params.get("start_date_timezone"), root_params.get("timezone"), None)
+
+    for key, value in root_params.items():
+        if value == "" and isinstance(value, str):
+            continue
+        if key in ("start_date_timezone", "timezone"):
+            continue
+        if key in DEFAULT_ARGS_KEYS:
+            if key == "start_date":
+                default_args[key] = parse_date_literal(value, start_date_timezone) or to_python_literal(value)
+            elif key == "retry_delay" and _is_number(value):
+                default_args[key] = f"timedelta(minutes={_number_to_string(value)})"
+            elif key == "retry_delay" and isinstance(value, str) and value.strip() != "" and _is_finite(_js_number(value)):
+                default_args[key] = f"timedelta(minutes={_number_to_string(_js_number(value))})"
+            else:
+                default_args[key] = to_python_literal(normalize_primitive(value))
+            continue
+        dag_config[key] = value
+
+    default_args.setdefault("owner", "'airflow'")
+    default_args.setdefault("depends_on_past", "False")
+    default_args.setdefault("start_date", "datetime(2024, 1, 1)")
+    default_args.setdefault("retries", "1")
+    default_args.setdefault("retry_delay", "timedelta(minutes=5)")
+    return default_args, dag_config
+
+
+def duration_to_timedelta_literal(value):
+    if _is_finite(value):
+        return f"timedelta(minutes={_number_to_string(value)})"
+    if not isinstance(value, str):
+        return None
+    trimmed = value.strip()
+    if not trimmed:
+        return None
+    if re.match(r"^timedelta\(.+\)$", trimmed):
+        return trimmed
+    numeric = _js_number(trimmed)
+    if _is_finite(numeric):
+        return f"timedelta(minutes={_number_to_string(numeric)})"
+    return None
+
+
+def _data(node):
+    data = node.get("data") if isinstance(node, dict) else None
+    return data if isinstance(data, dict) else {}
+
+
+def _params_of(data):
+    params = _js_or(data.get("parameters"), {})
+    return params if isinstance(params, dict) else {}
+
+
+def _defined_number(config, key):
+    if key not in config or config[key] == "":
+        return None
+    return _js_number(config[key])
+
+
+# ---------------------------------------------------------------------------
+# Compilador
+# ---------------------------------------------------------------------------
+
+
+def compile_airflow_body(nodes, edges, fallback_dag_id="generated_dag"):
+    """Módulo Python del DAG (sin el encabezado con la fecha). ValueError si el grafo no es exportable."""
+    nodes = [node for node in nodes or [] if isinstance(node, dict)]
+    edges = [edge for edge in edges or [] if isinstance(edge, dict)]
+
+    root_node = next((n for n in nodes if _data(n).get("type") == ROOT_AIRFLOW_TYPE), None)
+    if root_node is None:
+        raise ValueError("No se encontró el nodo raíz DAG para exportar a Airflow.")
+    if any(_data(n).get("type") == ROOT_ARGO_TYPE for n in nodes):
+        raise ValueError("Exportar Python de Airflow no soporta workflows de Argo.")
+
+    root_id = root_node.get("id")
+    task_nodes = [n for n in nodes if n.get("id") != root_id]
+    task_node_ids = [n.get("id") for n in task_nodes]
+    task_edges = [e for e in edges if e.get("source") != root_id and e.get("target") != root_id]
+    node_by_id = {}
+    for node in task_nodes:
+        node_by_id.setdefault(node.get("id"), node)
+
+    root_data = _data(root_node)
+    root_params = _params_of(root_data)
+    default_args, dag_config = build_default_args_and_dag_config(root_params)
+    dag_id = sanitize_task_id(
+        _js_or(root_params.get("dag_id"), root_data.get("task_id"), fallback_dag_id),
+        fallback_dag_id,
+    )
+
+    def coalesce(*values):
+        return next((value for value in values if value is not None), None)
+
+    dag_description = coalesce(dag_config.get("description"), root_data.get("description"), "")
+    dag_schedule = coalesce(dag_config.get("schedule_interval"), dag_config.get("schedule"), "@daily")
+    dag_catchup = dag_config["catchup"] if "catchup" in dag_config else False
+    dag_tags = dag_config.get("tags") if isinstance(dag_config.get("tags"), list) else []
+    dag_run_timeout_literal = duration_to_timedelta_literal(dag_config.get("dagrun_timeout"))
+    dag_concurrency = _defined_number(dag_config, "concurrency")
+    dag_max_active_runs = _defined_number(dag_config, "max_active_runs")
+    macros = dag_config.get("user_defined_macros")
+    dag_user_defined_macros = macros if _js_truthy(macros) and isinstance(macros, (dict, list)) else None
+
+    ordered_task_ids = topological_sort(task_node_ids, task_edges)
+
+    import_lines = {
+        "from datetime import datetime, timedelta": None,
+        "from airflow import DAG": None,
+        "from pendulum import timezone": None,
+    }
+    branch_callable_names = set()
+    task_var_by_node_id = {}
+    used_var_names = set()
+    task_definitions = []
+
+    def make_unique_var_name(base):
+        name = sanitize_python_identifier(base, "task_ref")
+        i = 2
+        while name in used_var_names:
+            name = f"{sanitize_python_identifier(base, 'task_ref')}_{i}"
+            i += 1
+        used_var_names.add(name)
+        return name
+
+    for node_id in ordered_task_ids:
+        node = node_by_id.get(node_id)
+        if node is None:
+            continue
+        data = _data(node)
+
+        operator_type = _js_or(data.get("type"), "PythonOperator")
+        params = dict(_params_of(data))
+        task_id = sanitize_task_id(_js_or(params.get("task_id"), data.get("task_id"), node_id), node_id)
+        task_var = make_unique_var_name(task_id)
+        task_var_by_node_id[node_id] = task_var
+
+        literal_import = _js_or(data.get("importLiteral"), data.get("pythonImportLiteral"))
+        if isinstance(literal_import, str) and literal_import.strip():
+            import_lines[literal_import.strip()] = None
+
+        custom_import_meta = _js_or(data.get("imports"), data.get("import"), data.get("operatorImport"))
+        for line in normalize_import_meta(custom_import_meta):
+            import_lines[line] = None
+        if not _js_truthy(literal_import) and not _js_truthy(custom_import_meta) and operator_type in AIRFLOW_IMPORT_BY_TYPE:
+            import_lines[AIRFLOW_IMPORT_BY_TYPE[operator_type]] = None
+
+        kwargs_lines = [f"task_id='{task_id}'"]
+        for key, raw_value in params.items():
+            if key == "task_id" or raw_value == "" and isinstance(raw_value, str):
+                continue
+
+            # python callable
+            if operator_type in CALLABLE_OPERATOR_TYPES and key == "python_callable":
+                callable_name = sanitize_python_identifier(
+                    raw_value if _js_truthy(raw_value) else f"{task_id}_callable",
+                    f"{task_id}_callable",
+                )
+                kwargs_lines.append(f"{key}={callable_name}")
+                branch_callable_names.add(callable_name)
+                continue
+
+            # manejo especial op_kwargs
+            if key == "op_kwargs":
+                if raw_value is None or isinstance(raw_value, (dict, list)):
+                    kwargs_lines.append(f"{key}={to_python_literal(raw_value)}")
+                else:
+                    kwargs_lines.append(f"{key}={{}}")
+                continue
+
+            value = normalize_primitive(raw_value)
+
+            # convertir campos numéricos
+            if key in NUMERIC_FIELDS and isinstance(value, str):
+                number = _js_number(value)
+                if _is_finite(number):
+                    value = number
+
+            # manejo especial retry_delay
+            if key == "retry_delay":
+                if _is_number(value):
+                    kwargs_lines.append(f"{key}=timedelta(minutes={_number_to_string(value)})")
+                    continue
+                if isinstance(value, str) and not (isinstance(_js_number(value), float) and math.isnan(_js_number(value))):
+                    kwargs_lines.append(f"{key}=timedelta(minutes={_number_to_string(_js_number(value))})")
+                    continue
+
+            kwargs_lines.append(f"{key}={to_python_literal(value)}")
+
+        if operator_type in CALLABLE_OPERATOR_TYPES and not any(
+            line.startswith("python_callable=") for line in kwargs_lines
+        ):
+            callable_name = sanitize_python_identifier(f"{task_id}_callable", "task_callable")
+            kwargs_lines.append(f"python_callable={callable_name}")
+            branch_callable_names.add(callable_name)
+
+        kwargs = ",\n        ".join(kwargs_lines)
+        task_definitions.append(f"    {task_var} = {operator_type}(\n        {kwargs},\n    )")
+
+    branch_nodes = [n for n in task_nodes if _data(n).get("type") == BRANCH_TYPE]
+    branch_dummy_definitions = []
+    dependency_lines = []
+
+    outgoing_by_node = {}
+    for edge in task_edges:
+        outgoing_by_node.setdefault(edge.get("source"), []).append(edge)
+
+    for edge in edges:
+        source, target = edge.get("source"), edge.get("target")
+        if source not in task_var_by_node_id or target not in task_var_by_node_id:
+            continue
+        dependency_lines.append(f"    {task_var_by_node_id[source]} >> {task_var_by_node_id[target]}")
+
+    def reachable_leaves(start_node_id):
+        if not start_node_id or start_node_id not in task_var_by_node_id:
+            return []
+        visited = {}
+        queue = deque([start_node_id])
+        while queue:
+            current = queue.popleft()
+            if current in visited:
+                continue
+            visited[current] = None
+            for edge in outgoing_by_node.get(current, []):
+                if edge.get("target") in task_var_by_node_id:
+                    queue.append(edge.get("target"))
+
+        leaves = [
+            node_id
+            for node_id in visited
+            if not any(edge.get("target") in visited for edge in outgoing_by_node.get(node_id, []))
+        ]
+        return leaves or [start_node_id]
+
+    for branch_node in branch_nodes:
+        branch_id = branch_node.get("id")
+        if branch_id not in task_var_by_node_id:
+            continue
+        branch_data = _data(branch_node)
+
+        branch_task_id = sanitize_task_id(
+            _js_or(_params_of(branch_data).get("task_id"), branch_data.get("task_id"), branch_id),
+            branch_id,
+        )
+        import_lines["from airflow.operators.dummy import DummyOperator"] = None
+
+        true_end_task_id = f"{branch_task_id}__true_end"
+        false_end_task_id = f"{branch_task_id}__false_end"
+        true_end_var = make_unique_var_name(true_end_task_id)
+        false_end_var = make_unique_var_name(false_end_task_id)
+
+        branch_dummy_definitions.append(f"    {true_end_var} = DummyOperator(task_id='{true_end_task_id}')")
+        branch_dummy_definitions.append(f"    {false_end_var} = DummyOperator(task_id='{false_end_task_id}')")
+
+        true_start_edge = next(
+            (e for e in edges if e.get("source") == branch_id and e.get("sourceHandle") == "true"), None
+        )
+        false_start_edge = next(
+            (e for e in edges if e.get("source") == branch_id and e.get("sourceHandle") == "false"), None
+        )
+
+        for leaf_node_id in reachable_leaves(true_start_edge and true_start_edge.get("target")):
+            dependency_lines.append(f"    {task_var_by_node_id[leaf_node_id]} >> {true_end_var}")
+        for leaf_node_id in reachable_leaves(false_start_edge and false_start_edge.get("target")):
+            dependency_lines.append(f"    {task_var_by_node_id[leaf_node_id]} >> {false_end_var}")
+
+    default_args_lines = [f"    '{k}': {v}," for k, v in default_args.items()]
+    branch_callable_defs = [
+        f'def {name}(**context):\n    """TODO: Implementar lógica para {name}"""\n    pass\n'
+        for name in sorted(branch_callable_names)
+    ]
+
+    dag_run_timeout_line = f"dagrun_timeout={dag_run_timeout_literal}," if dag_run_timeout_literal else ""
+    concurrency_line = f"concurrency={_number_to_string(dag_concurrency)}," if _is_finite(dag_concurrency) else ""
+    max_active_runs_line = (
+        f"max_active_runs={_number_to_string(dag_max_active_runs)}," if _is_finite(dag_max_active_runs) else ""
+    )
+    macros_line = (
+        f"user_defined_macros={to_python_literal(dag_user_defined_macros)}," if dag_user_defined_macros is not None else ""
+    )
+    newline = "\n"
+
+    return f"""
+{newline.join(sorted(import_lines))}
+
+{newline.join(branch_callable_defs)}
+# Default args para el nodo raíz del DAG
+default_args = {{
+{newline.join(default_args_lines)}
+}}
+
+with DAG(
+    dag_id='{dag_id}',
+    default_args=default_args,
+    schedule_interval={to_python_literal(dag_schedule)},
+    catchup={to_python_literal(_js_truthy(dag_catchup))},
+    {dag_run_timeout_line}
+    {concurrency_line}
+    {max_active_runs_line}
+    tags={to_python_literal(dag_tags)},
+    {macros_line}
+    description={to_python_literal(dag_description)},
+) as dag:
+{(newline + newline).join(task_definitions + branch_dummy_definitions)}
+
+    # Secuencia del workflow
+{newline.join(dependency_lines)}
+"""
+
+
+def render_module(body, generated_at=None):
+    """Módulo final: encabezado con la fecha de generación + cuerpo compilado."""
+    generated_at = generated_at or datetime.now()
+    return MODULE_HEADER.format(generated=generated_at.strftime("%d/%m/%Y, %H:%M:%S")) + body
+
+
+# ---------------------------------------------------------------------------
+# Caché por hash del grafo y compilación en paralelo
+# ---------------------------------------------------------------------------
+
+
+def graph_hash(nodes, edges, fallback_dag_id="generated_dag"):
+    """Hash de lo que afecta a la salida (ignora posiciones y estado visual del editor)."""
+    relevant = {
+        "nodes": [{"id": n.get("id"), "data": n.get("data")} for n in nodes or [] if isinstance(n, dict)],
+        "edges": [
+            {"source": e.get("source"), "target": e.get("target"), "sourceHandle": e.get("sourceHandle")}
+            for e in edges or []
+            if isinstance(e, dict)
+        ],
+        "fallbackDagId": fallback_dag_id,
+    }
+    canonical = json.dumps(relevant, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class CompiledDagCache:
+    """LRU de cuerpos compilados por hash del grafo."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max(0, int(max_entries))
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return body
+
+    def put(self, key, body):
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses, "entries": len(self._entries)}
+
+
+compiled_dag_cache = CompiledDagCache(CODEGEN_CACHE_SIZE)
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """Pool de procesos (spawn: no hereda hilos ni clientes gRPC del worker)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=CODEGEN_WORKERS, mp_context=get_context("spawn"))
+        return _pool
+
+
+def _discard_pool(pool):
+    """Descarta un pool roto (murió un proceso) para crear otro en el próximo uso."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _compile_graph(graph):
+    return compile_airflow_body(graph.get("nodes"), graph.get("edges"), graph.get("fallbackDagId") or "generated_dag")
+
+
+def compile_dag(graph):
+    """Compila un grafo `{nodes, edges, fallbackDagId}` usando la caché. Devuelve (hash, cuerpo, cacheado)."""
+    fallback_dag_id = graph.get("fallbackDagId") or "generated_dag"
+    key = graph_hash(graph.get("nodes"), graph.get("edges"), fallback_dag_id)
+    body = compiled_dag_cache.get(key)
+    if body is not None:
+        return key, body, True
+    body = _compile_graph(graph)
+    compiled_dag_cache.put(key, body)
+    return key, body, False
+
+
+def compile_many(graphs):
+    """
+    Compila varios grafos; los que no están en caché se reparten en el pool de
+    procesos. Devuelve una lista de (hash, cuerpo o None, cacheado, error o None).
+    """
+    results = [None] * len(graphs)
+    pending = []
+    for index, graph in enumerate(graphs):
+        fallback_dag_id = graph.get("fallbackDagId") or "generated_dag"
+        key = graph_hash(graph.get("nodes"), graph.get("edges"), fallback_dag_id)
+        body = compiled_dag_cache.get(key)
+        if body is not None:
+            results[index] = (key, body, True, None)
+        else:
+            pending.append((index, key, graph))
+
+    if len(pending) == 1:
+        index, key, graph = pending[0]
+        try:
+            _, body, _ = compile_dag(graph)
+            results[index] = (key, body, False, None)
+        except Exception as e:
+            results[index] = (key, None, False, str(e))
+    elif pending:
+        # Un grafo que hace fallar la compilación solo invalida su propio resultado
+        pool = _get_pool()
+        try:
+            futures = [(index, key, pool.submit(_compile_graph, graph)) for index, key, graph in pending]
+        except BrokenProcessPool:
+            # El pool se rompió después del último uso: se reemplaza una vez
+            _discard_pool(pool)
+            pool = _get_pool()
+            futures = [(index, key, pool.submit(_compile_graph, graph)) for index, key, graph in pending]
+        broken = False
+        for index, key, future in futures:
+            try:
+                body = future.result()
+            except BrokenProcessPool:
+                broken = True
+                results[index] = (key, None, False, "El proceso de compilación terminó inesperadamente")
+                continue
+            except Exception as e:
+                results[index] = (key, None, False, str(e))
+                continue
+            compiled_dag_cache.put(key, body)
+            results[index] = (key, body, False, None)
+        if broken:
+            _discard_pool(pool)
+    return results
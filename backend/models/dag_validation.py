@@ -0,0 +1,235 @@
+"""
+Validación estructural de grafos del editor (`nodes`/`edges` de React Flow).
+
+Una sola pasada O(V + E) que reporta todos los errores a la vez: nodos sin id
+o con id duplicado, conexiones colgantes, raíz DAG/ArgoWorkflow faltante o
+repetida y ciclos (componentes fuertemente conexas, Tarjan iterativo para no
+depender del límite de recursión con grafos de decenas de miles de nodos).
+"""
+
+ROOT_TYPES = {"DAG": "airflow", "ArgoWorkflow": "argo"}
+
+# Límites del reporte (el grafo se recorre completo igualmente)
+MAX_REPORTED_ERRORS = 100
+MAX_REPORTED_IDS = 20
+
+
+class GraphValidationError(ValueError):
+    """Grafo inválido; `errors` contiene el detalle de validate_graph."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        first = errors[0]["message"] if errors else "Grafo inválido"
+        extra = f" (y {len(errors) - 1} error(es) más)" if len(errors) > 1 else ""
+        super().__init__(f"{first}{extra}")
+
+
+def _issue(code, message, **details):
+    issue = {"code": code, "message": message}
+    for key, value in details.items():
+        if isinstance(value, list) and len(value) > MAX_REPORTED_IDS:
+            issue[f"{key}Total"] = len(value)
+            value = value[:MAX_REPORTED_IDS]
+        issue[key] = value
+    return issue
+
+
+def _nodes_outside_topological_order(node_ids, adjacency):
+    """Kahn: nodos que no se pueden ordenar (están en un ciclo o dependen de uno)."""
+    indegree = dict.fromkeys(node_ids, 0)
+    for targets in adjacency.values():
+        for target in targets:
+            indegree[target] += 1
+    queue = [node_id for node_id, degree in indegree.items() if degree == 0]
+    for node_id in queue:
+        for target in adjacency[node_id]:
+            indegree[target] -= 1
+            if indegree[target] == 0:
+                queue.append(target)
+    if len(queue) == len(indegree):
+        return []
+    ordered = set(queue)
+    return [node_id for node_id in node_ids if node_id not in ordered]
+
+
+def _strongly_connected_cycles(node_ids, adjacency):
+    """Componentes con ciclo (tamaño > 1), en orden de descubrimiento."""
+    index_of = {}
+    lowlink = {}
+    on_stack = set()
+    stack = []
+    cycles = []
+    counter = 0
+
+    for start in node_ids:
+        if start in index_of:
+            continue
+        index_of[start] = lowlink[start] = counter
+        counter += 1
+        stack.append(start)
+        on_stack.add(start)
+        work = [(start, iter(adjacency[start]))]
+
+        while work:
+            node, neighbors = work[-1]
+            advanced = False
+            for nxt in neighbors:
+                if nxt not in index_of:
+                    index_of[nxt] = lowlink[nxt] = counter
+                    counter += 1
+                    stack.append(nxt)
+                    on_stack.add(nxt)
+                    work.append((nxt, iter(adjacency[nxt])))
+                    advanced = True
+                    break
+                if nxt in on_stack:
+                    lowlink[node] = min(lowlink[node], index_of[nxt])
+            if advanced:
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+            if lowlink[node] == index_of[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                if len(component) > 1:
+                    component.reverse()
+                    cycles.append(component)
+    return cycles
+
+
+def validate_graph(nodes, edges, framework=None):
+    """
+    Valida el grafo y devuelve `{valid, errors, warnings, stats}`.
+    Cada error/advertencia es `{code, message, ...}` con los ids involucrados.
+    """
+    errors = []
+    warnings = []
+
+    node_ids = []
+    seen = set()
+    duplicates = {}
+    roots = []
+    for position, node in enumerate(nodes):
+        node_id = node.get("id") if isinstance(node, dict) else None
+        if not isinstance(node_id, str) or not node_id.strip():
+            errors.append(_issue("invalid_node", f"El nodo en la posición {position} no tiene id", index=position))
+            continue
+        if node_id in seen:
+            duplicates[node_id] = duplicates.get(node_id, 1) + 1
+            continue
+        seen.add(node_id)
+        node_ids.append(node_id)
+        data = node.get("data")
+        node_type = data.get("type") if isinstance(data, dict) else None
+        if node_type in ROOT_TYPES:
+            roots.append((node_id, node_type))
+
+    for node_id, count in duplicates.items():
+        errors.append(_issue("duplicate_node_id", f"Id de nodo duplicado: {node_id} ({count} veces)", nodeIds=[node_id]))
+
+    if not nodes:
+        errors.append(_issue("empty_graph", "El DAG no contiene nodos"))
+    elif not roots:
+        errors.append(_issue("missing_root", "Falta el nodo raíz DAG/ArgoWorkflow"))
+    elif len(roots) > 1:
+        errors.append(_issue(
+            "multiple_roots",
+            f"Solo se permite un nodo DAG/Workflow por diagrama ({len(roots)} encontrados)",
+            nodeIds=[node_id for node_id, _ in roots],
+        ))
+    if framework:
+        mismatched = [node_id for node_id, node_type in roots if ROOT_TYPES[node_type] != framework]
+        if mismatched:
+            errors.append(_issue(
+                "framework_mismatch",
+                f"El nodo raíz no corresponde al framework {framework}",
+                nodeIds=mismatched,
+            ))
+    root_ids = {node_id for node_id, _ in roots}
+
+    adjacency = {node_id: [] for node_id in node_ids}
+    connected = set()
+    seen_edges = set()
+    dangling = []
+    duplicate_edges = []
+    into_root = []
+    self_loops = []
+    for position, edge in enumerate(edges):
+        source = edge.get("source") if isinstance(edge, dict) else None
+        target = edge.get("target") if isinstance(edge, dict) else None
+        if not isinstance(source, str) or not isinstance(target, str):
+            errors.append(_issue("invalid_edge", f"La conexión en la posición {position} no tiene source/target", index=position))
+            continue
+        if source not in adjacency or target not in adjacency:
+            dangling.append(position)
+            continue
+        handle = edge.get("sourceHandle")
+        # sourceHandle llega como texto; otros valores (listas, objetos) no son hashables
+        key = (source, target, handle if handle is None or isinstance(handle, str) else repr(handle))
+        if key in seen_edges:
+            duplicate_edges.append(position)
+            continue
+        seen_edges.add(key)
+        connected.add(source)
+        connected.add(target)
+        if source == target:
+            self_loops.append(source)
+            continue
+        if target in root_ids:
+            into_root.append(position)
+        adjacency[source].append(target)
+
+    if dangling:
+        errors.append(_issue(
+            "dangling_edge",
+            f"{len(dangling)} conexión(es) apuntan a nodos inexistentes",
+            edgeIndexes=dangling,
+        ))
+    if into_root:
+        errors.append(_issue(
+            "root_has_incoming_edge",
+            "El nodo raíz no puede tener conexiones de entrada",
+            edgeIndexes=into_root,
+        ))
+    for node_id in self_loops:
+        errors.append(_issue("cycle", f"El nodo {node_id} se conecta consigo mismo", nodeIds=[node_id]))
+    # Tarjan solo sobre lo que Kahn no pudo ordenar (un DAG válido no llega aquí)
+    for component in _strongly_connected_cycles(_nodes_outside_topological_order(node_ids, adjacency), adjacency):
+        errors.append(_issue(
+            "cycle",
+            f"El DAG contiene un ciclo entre {len(component)} nodos",
+            nodeIds=component,
+        ))
+
+    if duplicate_edges:
+        warnings.append(_issue(
+            "duplicate_edge",
+            f"{len(duplicate_edges)} conexión(es) duplicada(s)",
+            edgeIndexes=duplicate_edges,
+        ))
+    isolated = [node_id for node_id in node_ids if node_id not in connected and node_id not in root_ids]
+    if isolated and len(node_ids) > 1:
+        warnings.append(_issue("isolated_node", f"{len(isolated)} nodo(s) aislado(s)", nodeIds=isolated))
+
+    return {
+        "valid": not errors,
+        "errors": errors[:MAX_REPORTED_ERRORS],
+        "warnings": warnings,
+        "stats": {"nodeCount": len(nodes), "edgeCount": len(edges), "errorCount": len(errors)},
+    }
+
+
+def ensure_valid_graph(nodes, edges, framework=None):
+    """validate_graph que lanza GraphValidationError si hay errores."""
+    result = validate_graph(nodes, edges, framework)
+    if not result["valid"]:
+        raise GraphValidationError(result["errors"])
+    return result
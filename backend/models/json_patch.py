@@ -0,0 +1,158 @@
+"""
+JSON Patch (RFC 6902) con copia por ruta.
+
+`apply_patch` no modifica el documento original: solo copia los contenedores
+que recorren las operaciones, así que aplicar un parche pequeño sobre un grafo
+grande cuesta en proporción al parche (los demás nodos se comparten).
+"""
+
+import copy
+
+OPERATIONS = ("add", "remove", "replace", "move", "copy", "test")
+
+
+class JsonPatchError(ValueError):
+    """Operación inválida o ruta inexistente."""
+
+
+class JsonPatchTestFailed(JsonPatchError):
+    """Una operación `test` no se cumplió."""
+
+
+def parse_pointer(pointer):
+    """JSON Pointer (RFC 6901) → lista de segmentos."""
+    if not isinstance(pointer, str) or (pointer and not pointer.startswith("/")):
+        raise JsonPatchError(f"Ruta inválida: {pointer!r}")
+    if pointer == "":
+        return []
+    return [part.replace("~1", "/").replace("~0", "~") for part in pointer[1:].split("/")]
+
+
+def _index(container, segment, allow_end=False):
+    if allow_end and segment == "-":
+        return len(container)
+    if not segment.isdigit() or (len(segment) > 1 and segment.startswith("0")):
+        raise JsonPatchError(f"Índice inválido: {segment}")
+    index = int(segment)
+    limit = len(container) + (1 if allow_end else 0)
+    if index >= limit:
+        raise JsonPatchError(f"Índice fuera de rango: {segment}")
+    return index
+
+
+class _Patcher:
+    def __init__(self, document):
+        self.root = copy.copy(document)
+        self._owned = {id(self.root)}
+
+    def _own_child(self, parent, key):
+        child = parent[key]
+        if isinstance(child, (dict, list)) and id(child) not in self._owned:
+            child = copy.copy(child)
+            parent[key] = child
+            self._owned.add(id(child))
+        return child
+
+    def _parent(self, parts):
+        """Contenedor padre del último segmento (copiado a lo largo de la ruta)."""
+        if not parts:
+            raise JsonPatchError("La operación no puede aplicarse a la raíz")
+        container = self.root
+        for segment in parts[:-1]:
+            if isinstance(container, dict):
+                if segment not in container:
+                    raise JsonPatchError(f"Ruta inexistente: /{'/'.join(parts)}")
+                container = self._own_child(container, segment)
+            elif isinstance(container, list):
+                container = self._own_child(container, _index(container, segment))
+            else:
+                raise JsonPatchError(f"Ruta inexistente: /{'/'.join(parts)}")
+        if not isinstance(container, (dict, list)):
+            raise JsonPatchError(f"Ruta inexistente: /{'/'.join(parts)}")
+        return container, parts[-1]
+
+    def get(self, parts):
+        value = self.root
+        for segment in parts:
+            if isinstance(value, dict) and segment in value:
+                value = value[segment]
+            elif isinstance(value, list):
+                value = value[_index(value, segment)]
+            else:
+                raise JsonPatchError(f"Ruta inexistente: /{'/'.join(parts)}")
+        return value
+
+    def add(self, parts, value):
+        container, key = self._parent(parts)
+        if isinstance(container, list):
+            container.insert(_index(container, key, allow_end=True), value)
+        else:
+            container[key] = value
+
+    def remove(self, parts):
+        container, key = self._parent(parts)
+        if isinstance(container, list):
+            return container.pop(_index(container, key))
+        if key not in container:
+            raise JsonPatchError(f"Ruta inexistente: /{'/'.join(parts)}")
+        return container.pop(key)
+
+    def replace(self, parts, value):
+        container, key = self._parent(parts)
+        if isinstance(container, list):
+            container[_index(container, key)] = value
+        else:
+            if key not in container:
+                raise JsonPatchError(f"Ruta inexistente: /{'/'.join(parts)}")
+            container[key] = value
+
+
+def _check_operation(position, operation):
+    if not isinstance(operation, dict) or operation.get("op") not in OPERATIONS:
+        raise JsonPatchError(f"Operación inválida en la posición {position}")
+
+
+def apply_patch(document, operations):
+    """Documento resultante de aplicar `operations` (lista de operaciones RFC 6902)."""
+    if not isinstance(operations, list):
+        raise JsonPatchError("operations debe ser un arreglo")
+    patcher = _Patcher(document)
+    for position, operation in enumerate(operations):
+        _check_operation(position, operation)
+        op = operation["op"]
+        parts = parse_pointer(operation.get("path"))
+        if op in ("add", "replace", "test") and "value" not in operation:
+            raise JsonPatchError(f"La operación {op} en la posición {position} requiere value")
+
+        if op == "add":
+            patcher.add(parts, copy.deepcopy(operation["value"]))
+        elif op == "remove":
+            patcher.remove(parts)
+        elif op == "replace":
+            patcher.replace(parts, copy.deepcopy(operation["value"]))
+        elif op in ("move", "copy"):
+            source = parse_pointer(operation.get("from"))
+            if op == "move":
+                if parts[:len(source)] == source and parts != source:
+                    raise JsonPatchError("No se puede mover un valor dentro de sí mismo")
+                patcher.add(parts, patcher.remove(source))
+            else:
+                patcher.add(parts, copy.deepcopy(patcher.get(source)))
+        elif patcher.get(parts) != operation["value"]:
+            raise JsonPatchTestFailed(f"test falló en {operation.get('path')}")
+    return patcher.root
+
+
+def touched_paths(operations):
+    """Rutas (segmentos) que modifica un parche, incluido el origen de `move`."""
+    if not isinstance(operations, list):
+        raise JsonPatchError("operations debe ser un arreglo")
+    paths = []
+    for position, operation in enumerate(operations):
+        _check_operation(position, operation)
+        if operation["op"] == "test":
+            continue
+        paths.append(parse_pointer(operation.get("path")))
+        if operation["op"] == "move":
+            paths.append(parse_pointer(operation.get("from")))
+    return paths
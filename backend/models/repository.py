@@ -0,0 +1,125 @@
+"""
+Capa de acceso compartida para las escrituras del catálogo.
+
+Cada mutación se resuelve en una sola llamada a Firestore usando las
+precondiciones del propio servidor en lugar de leer antes el documento:
+
+- `update()` exige que el documento exista (NotFound → DocumentNotFound → 404).
+- `create()` exige que no exista (AlreadyExists → DocumentExists → 409).
+
+Tras una escritura exitosa se avisa a las vistas/cachés del catálogo. Se
+contabilizan lecturas y escrituras por colección y operación (ver `repository_stats`).
+"""
+
+import threading
+from datetime import datetime
+
+from google.api_core.exceptions import Conflict, NotFound
+
+from config.catalog_views import notify_local_write
+from config.firebase import db
+from config.storage import run_transaction
+
+
+class DocumentNotFound(Exception):
+    """El documento a modificar no existe."""
+
+
+class DocumentExists(Exception):
+    """Ya existe un documento con ese ID."""
+
+
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def _record(collection_name, operation, reads=0, writes=0, outcome="ok"):
+    with _stats_lock:
+        entry = _stats.setdefault(collection_name, {}).setdefault(
+            operation,
+            {"calls": 0, "reads": 0, "writes": 0, "notFound": 0, "conflicts": 0, "errors": 0},
+        )
+        entry["calls"] += 1
+        entry["reads"] += reads
+        entry["writes"] += writes
+        if outcome != "ok":
+            entry[outcome] += 1
+
+
+def repository_stats():
+    """Lecturas/escrituras por colección y operación (por proceso)."""
+    with _stats_lock:
+        return {name: {op: dict(values) for op, values in ops.items()} for name, ops in _stats.items()}
+
+
+def _now():
+    return datetime.utcnow().isoformat()
+
+
+def create_document(collection_name, doc_id, data):
+    """Crea el documento si no existe (DocumentExists en caso contrario)."""
+    try:
+        db.collection(collection_name).document(doc_id).create(data)
+    except Conflict:
+        _record(collection_name, "create", outcome="conflicts")
+        raise DocumentExists(doc_id)
+    except Exception:
+        _record(collection_name, "create", outcome="errors")
+        raise
+    _record(collection_name, "create", writes=1)
+    notify_local_write(collection_name)
+
+
+def update_document(collection_name, doc_id, changes, operation="update"):
+    """Actualiza campos de un documento existente y su `metadata.updatedAt`."""
+    try:
+        db.collection(collection_name).document(doc_id).update(
+            {**changes, "metadata.updatedAt": _now()}
+        )
+    except NotFound:
+        _record(collection_name, operation, outcome="notFound")
+        raise DocumentNotFound(doc_id)
+    except Exception:
+        _record(collection_name, operation, outcome="errors")
+        raise
+    _record(collection_name, operation, writes=1)
+    notify_local_write(collection_name)
+
+
+def update_document_transaction(collection_name, doc_id, build_changes, operation="update"):
+    """
+    Lee el documento y lo actualiza en una sola transacción.
+    `build_changes(transaction, datos_actuales)` devuelve los campos a cambiar
+    (o None para no escribir) y puede agregar otras escrituras a la
+    transacción. Devuelve (escribió, datos leídos).
+    """
+    doc_ref = db.collection(collection_name).document(doc_id)
+
+    def apply(transaction):
+        snapshot = doc_ref.get(transaction=transaction)
+        if not snapshot.exists:
+            raise DocumentNotFound(doc_id)
+        current = snapshot.to_dict() or {}
+        changes = build_changes(transaction, current)
+        if changes is None:
+            return False, current
+        transaction.update(doc_ref, {**changes, "metadata.updatedAt": _now()})
+        return True, current
+
+    try:
+        written, current = run_transaction(db, apply)
+    except DocumentNotFound:
+        _record(collection_name, operation, reads=1, outcome="notFound")
+        raise
+    except Exception:
+        _record(collection_name, operation, outcome="errors")
+        raise
+    _record(collection_name, operation, reads=1, writes=1 if written else 0)
+    if written:
+        notify_local_write(collection_name)
+    return written, current
+
+
+def deactivate_document(collection_name, doc_id):
+    """Soft delete: marca `isActive = False`."""
+    update_document(collection_name, doc_id, {"isActive": False}, operation="delete")
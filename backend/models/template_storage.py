@@ -0,0 +1,398 @@
+"""
+Almacenamiento fragmentado y comprimido del grafo de las plantillas.
+
+Las plantillas pequeñas guardan `nodes`/`edges` en el propio documento. Si el
+grafo serializado supera TEMPLATE_INLINE_MAX_BYTES se guarda en la
+subcolección `templates/{id}/chunks`, en fragmentos de nodos y de conexiones
+comprimidos con zlib, y el documento padre solo conserva el manifiesto:
+
+    "graphStorage": {
+        "version": 1,
+        "encoding": "zlib",
+        "generation": "<hash del grafo><sufijo de la escritura>",
+        "chunks": [{"id": "<generation>-nodes-0000", "kind": "nodes", "count": 812}, ...],
+        "rawBytes": 4194304,
+        "storedBytes": 301234
+    }
+
+Cada escritura usa una generación propia (hash del grafo + sufijo aleatorio),
+así que sus fragmentos no los comparte nadie más. Una reescritura crea los
+fragmentos nuevos, luego lee el manifiesto anterior y lo reemplaza en una
+misma transacción y al final borra solo los fragmentos de ese manifiesto
+anterior: dos escrituras concurrentes nunca borran los fragmentos de la otra.
+Un lector que llega tarde (su manifiesto ya fue reemplazado) vuelve a leer el
+documento. Los grafos ya descomprimidos se cachean por generación.
+"""
+
+import hashlib
+import json
+import os
+import secrets
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+from google.cloud.firestore_v1 import DELETE_FIELD
+
+from config.firebase import db
+from models.repository import create_document, update_document_transaction
+
+COLLECTION = "templates"
+CHUNKS_COLLECTION = "chunks"
+GRAPH_KINDS = ("nodes", "edges")
+STORAGE_VERSION = 1
+
+TEMPLATE_INLINE_MAX_BYTES = int(os.getenv("TEMPLATE_INLINE_MAX_BYTES", "32768"))
+TEMPLATE_GRAPH_CACHE_SIZE = int(os.getenv("TEMPLATE_GRAPH_CACHE_SIZE", "64"))
+# Tamaño de referencia (sin comprimir) de cada fragmento y máximo ya comprimido:
+# Firestore limita los documentos a 1 MiB
+CHUNK_TARGET_RAW_BYTES = 2 * 1024 * 1024
+CHUNK_MAX_STORED_BYTES = 900 * 1024
+# Un batch admite 500 operaciones y ~10 MiB por request
+BATCH_MAX_WRITES = 500
+BATCH_MAX_BYTES = 8 * 1024 * 1024
+
+# Relecturas del documento si sus fragmentos desaparecen mientras se leen
+MAX_RELOAD_ATTEMPTS = 3
+
+_fetch_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="template-chunks")
+
+
+class TemplateGraphUnavailable(Exception):
+    """Falta un fragmento del manifiesto (reescritura concurrente)."""
+
+
+# ---------------------------------------------------------------------------
+# Codificación
+# ---------------------------------------------------------------------------
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _encode_items(items):
+    return zlib.compress(("[" + ",".join(items) + "]").encode("utf-8"), 6)
+
+
+def _split_chunks(kind, serialized):
+    """Agrupa elementos ya serializados en fragmentos comprimidos de tamaño acotado."""
+    chunks = []
+
+    def emit(items):
+        data = _encode_items(items)
+        if len(data) > CHUNK_MAX_STORED_BYTES:
+            if len(items) == 1:
+                raise ValueError(f"Un elemento de {kind} excede el tamaño máximo permitido")
+            middle = len(items) // 2
+            emit(items[:middle])
+            emit(items[middle:])
+            return
+        chunks.append({"kind": kind, "count": len(items), "data": data})
+
+    pending = []
+    pending_bytes = 0
+    for item in serialized:
+        if pending and pending_bytes + len(item) > CHUNK_TARGET_RAW_BYTES:
+            emit(pending)
+            pending, pending_bytes = [], 0
+        pending.append(item)
+        pending_bytes += len(item) + 1
+    if pending:
+        emit(pending)
+    return chunks
+
+
+def encode_graph(nodes, edges):
+    """
+    (campos del documento padre, fragmentos a escribir). Si el grafo cabe en
+    línea no hay fragmentos.
+    """
+    serialized = {"nodes": [_dumps(node) for node in nodes], "edges": [_dumps(edge) for edge in edges]}
+    raw_bytes = sum(len(item) + 1 for items in serialized.values() for item in items)
+    if raw_bytes <= TEMPLATE_INLINE_MAX_BYTES:
+        return {"nodes": nodes, "edges": edges, "graphStorage": DELETE_FIELD}, []
+
+    digest = hashlib.sha256()
+    for kind in GRAPH_KINDS:
+        digest.update(kind.encode())
+        for item in serialized[kind]:
+            digest.update(item.encode("utf-8"))
+            digest.update(b"\n")
+    # Sufijo por escritura: dos escrituras del mismo grafo no comparten fragmentos
+    generation = f"{digest.hexdigest()[:16]}{secrets.token_hex(4)}"
+
+    chunks = []
+    for kind in GRAPH_KINDS:
+        for index, chunk in enumerate(_split_chunks(kind, serialized[kind])):
+            chunk["id"] = f"{generation}-{kind}-{index:04d}"
+            chunks.append(chunk)
+
+    manifest = {
+        "version": STORAGE_VERSION,
+        "encoding": "zlib",
+        "generation": generation,
+        "chunks": [{"id": c["id"], "kind": c["kind"], "count": c["count"]} for c in chunks],
+        "rawBytes": raw_bytes,
+        "storedBytes": sum(len(c["data"]) for c in chunks),
+    }
+    return {"nodes": DELETE_FIELD, "edges": DELETE_FIELD, "graphStorage": manifest}, chunks
+
+
+# ---------------------------------------------------------------------------
+# Escritura
+# ---------------------------------------------------------------------------
+
+
+def _chunks_ref(template_id):
+    return db.collection(COLLECTION).document(template_id).collection(CHUNKS_COLLECTION)
+
+
+def _write_chunks(template_id, chunks):
+    chunks_ref = _chunks_ref(template_id)
+    batch, pending, pending_bytes = db.batch(), 0, 0
+    for chunk in chunks:
+        size = len(chunk["data"])
+        if pending and (pending >= BATCH_MAX_WRITES or pending_bytes + size > BATCH_MAX_BYTES):
+            batch.commit()
+            batch, pending, pending_bytes = db.batch(), 0, 0
+        batch.set(
+            chunks_ref.document(chunk["id"]),
+            {"kind": chunk["kind"], "count": chunk["count"], "data": chunk["data"]},
+        )
+        pending += 1
+        pending_bytes += size
+    if pending:
+        batch.commit()
+
+
+def _delete_chunks(template_id, chunk_ids):
+    chunks_ref = _chunks_ref(template_id)
+    chunk_ids = list(chunk_ids)
+    for start in range(0, len(chunk_ids), BATCH_MAX_WRITES):
+        batch = db.batch()
+        for chunk_id in chunk_ids[start:start + BATCH_MAX_WRITES]:
+            batch.delete(chunks_ref.document(chunk_id))
+        batch.commit()
+    return len(chunk_ids)
+
+
+def _manifest_chunk_ids(manifest):
+    if not isinstance(manifest, dict):
+        return []
+    return [chunk["id"] for chunk in manifest.get("chunks", [])]
+
+
+def _discard_own_chunks(template_id, fields, chunks):
+    """
+    Tras una escritura fallida borra los fragmentos recién escritos, salvo que
+    el manifiesto vigente sea el nuestro (el commit llegó a aplicarse).
+    """
+    if not chunks:
+        return
+    snapshot = db.collection(COLLECTION).document(template_id).get(field_paths=["graphStorage"])
+    current = (snapshot.to_dict() or {}).get("graphStorage") if snapshot.exists else None
+    if isinstance(current, dict) and current.get("generation") == fields["graphStorage"]["generation"]:
+        return
+    _delete_chunks(template_id, [chunk["id"] for chunk in chunks])
+
+
+def create_template_document(template_id, payload, metadata):
+    """Crea la plantilla (DocumentExists si ya existe) con el grafo en línea o fragmentado."""
+    fields, chunks = encode_graph(payload["nodes"], payload["edges"])
+    # Los sentinels de borrado no aplican en create()
+    data = {key: value for key, value in {**payload, **fields}.items() if value is not DELETE_FIELD}
+
+    _write_chunks(template_id, chunks)
+    try:
+        create_document(COLLECTION, template_id, {**data, "metadata": metadata})
+    except Exception:
+        _discard_own_chunks(template_id, fields, chunks)
+        raise
+
+
+def update_template_document(template_id, payload, prepare=None):
+    """
+    Reemplaza el grafo y los campos de la plantilla (DocumentNotFound si no
+    existe). `prepare(transaction, datos_actuales)`, si se indica, corre dentro
+    de la transacción: devuelve campos extra para el documento, None para no
+    escribir, o lanza una excepción. Devuelve True si se escribió.
+    """
+    fields, chunks = encode_graph(payload["nodes"], payload["edges"])
+    _write_chunks(template_id, chunks)
+
+    def build_changes(transaction, current):
+        extra = prepare(transaction, current) if prepare is not None else {}
+        if extra is None:
+            return None
+        return {**payload, **fields, **extra}
+
+    try:
+        written, previous = update_document_transaction(COLLECTION, template_id, build_changes)
+    except Exception:
+        _discard_own_chunks(template_id, fields, chunks)
+        raise
+    if not written:
+        _delete_chunks(template_id, [chunk["id"] for chunk in chunks])
+        return False
+    # Solo los fragmentos del manifiesto que esta escritura reemplazó
+    _delete_chunks(template_id, _manifest_chunk_ids(previous.get("graphStorage")))
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Lectura
+# ---------------------------------------------------------------------------
+
+
+class _GraphCache:
+    """LRU de grafos descomprimidos por (plantilla, generación)."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max(0, max_entries)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            graph = self._entries.get(key)
+            if graph is not None:
+                self._entries.move_to_end(key)
+            return graph
+
+    def put(self, key, graph):
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._entries[key] = graph
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_graph_cache = _GraphCache(TEMPLATE_GRAPH_CACHE_SIZE)
+_stats_lock = threading.Lock()
+_stats = {"cacheHits": 0, "cacheMisses": 0, "chunkReads": 0, "storedBytesRead": 0, "retries": 0}
+
+
+def _count(**deltas):
+    with _stats_lock:
+        for key, value in deltas.items():
+            _stats[key] += value
+
+
+def template_storage_stats():
+    with _stats_lock:
+        return {**_stats, "cachedGraphs": len(_graph_cache)}
+
+
+def _fetch_chunk(template_id, chunk_id):
+    snapshot = _chunks_ref(template_id).document(chunk_id).get()
+    if not snapshot.exists:
+        raise TemplateGraphUnavailable(f"{template_id}/{chunk_id}")
+    return (snapshot.to_dict() or {}).get("data") or b""
+
+
+def _load_graphs(requests):
+    """
+    Grafos de varias plantillas `[(template_id, manifest)]`. Todos los
+    fragmentos que no están en caché se descargan en paralelo.
+    """
+    graphs = {}
+    futures = []
+    for template_id, manifest in requests:
+        key = (template_id, manifest.get("generation"))
+        cached = _graph_cache.get(key)
+        if cached is not None:
+            graphs[template_id] = cached
+            _count(cacheHits=1)
+            continue
+        _count(cacheMisses=1)
+        futures.append((
+            template_id,
+            key,
+            manifest,
+            [
+                _fetch_executor.submit(copy_context().run, _fetch_chunk, template_id, chunk["id"])
+                for chunk in manifest["chunks"]
+            ],
+        ))
+
+    for template_id, key, manifest, chunk_futures in futures:
+        graph = {kind: [] for kind in GRAPH_KINDS}
+        for chunk, future in zip(manifest["chunks"], chunk_futures):
+            data = future.result()
+            _count(chunkReads=1, storedBytesRead=len(data))
+            graph[chunk["kind"]].extend(json.loads(zlib.decompress(data)))
+        graph = (graph["nodes"], graph["edges"])
+        _graph_cache.put(key, graph)
+        graphs[template_id] = graph
+    return graphs
+
+
+def _with_graph(doc, graph):
+    hydrated = {key: value for key, value in doc.items() if key != "graphStorage"}
+    if graph is not None:
+        hydrated["nodes"], hydrated["edges"] = graph
+    return hydrated
+
+
+def _reload_template(template_id, stale_doc):
+    """
+    Documento releído de la fuente con su grafo, cuando los fragmentos del
+    manifiesto leído ya fueron reemplazados. Se devuelve el documento completo
+    (no solo el grafo) para que versión, checkpoint y grafo sean coherentes.
+    """
+    for _ in range(MAX_RELOAD_ATTEMPTS):
+        _count(retries=1)
+        snapshot = db.collection(COLLECTION).document(template_id).get()
+        if not snapshot.exists:
+            return _with_graph(stale_doc, ([], []))
+        data = {**(snapshot.to_dict() or {}), "id": snapshot.id}
+        manifest = data.get("graphStorage")
+        if not manifest:
+            # Volvió a guardarse en línea
+            return data
+        try:
+            return _with_graph(data, _load_graphs([(template_id, manifest)])[template_id])
+        except TemplateGraphUnavailable:
+            continue
+    raise TemplateGraphUnavailable(template_id)
+
+
+def hydrate_templates(docs):
+    """
+    Copia de las plantillas con `nodes`/`edges` reensamblados desde sus
+    fragmentos (las que están en línea se devuelven tal cual).
+    """
+    requests = [(doc["id"], doc["graphStorage"]) for doc in docs if doc.get("graphStorage")]
+    if not requests:
+        return docs
+    try:
+        graphs = _load_graphs(requests)
+    except TemplateGraphUnavailable:
+        # Algún manifiesto leído quedó obsoleto: cargar cada plantilla por separado
+        graphs = {}
+        for template_id, manifest in requests:
+            try:
+                graphs.update(_load_graphs([(template_id, manifest)]))
+            except TemplateGraphUnavailable:
+                pass
+
+    hydrated = []
+    for doc in docs:
+        if not doc.get("graphStorage"):
+            hydrated.append(doc)
+        elif doc["id"] in graphs:
+            hydrated.append(_with_graph(doc, graphs[doc["id"]]))
+        else:
+            hydrated.append(_reload_template(doc["id"], doc))
+    return hydrated
+
+
+def hydrate_template(doc):
+    return hydrate_templates([doc])[0]
@@ -0,0 +1,317 @@
+"""
+Versiones de plantillas con deltas JSON Patch.
+
+Cada plantilla tiene `version` (cabeza) y `checkpointVersion`: el grafo
+guardado en el documento (en línea o fragmentado, ver template_storage.py)
+corresponde al checkpoint, y los cambios posteriores viven como parches en
+`templates/{id}/versions/{version:08d}`:
+
+    {"version": 7, "kind": "patch", "operations": [...], "createdAt": ..., "createdBy": ...}
+
+`create` y `replace` (PUT) escriben el grafo completo y dejan una entrada sin
+operaciones. Un PATCH escribe su entrada y actualiza la cabeza en un mismo
+batch, y un PUT en la misma transacción que lee la versión: la entrada se crea
+con `create()`, así que dos escrituras sobre la misma versión no pueden
+confirmarse ambas (VersionConflict → 409). Cada TEMPLATE_CHECKPOINT_INTERVAL
+versiones se reescribe el grafo completo para acotar los parches a aplicar al
+leer; el checkpoint se descarta si mientras tanto llegó uno más nuevo.
+
+El estado de la cabeza (checkpoint + parches) se cachea por (plantilla, versión).
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from google.api_core.exceptions import Conflict, NotFound
+from google.cloud.firestore_v1.field_path import FieldPath
+
+from config.catalog_views import notify_local_write
+from config.firebase import db
+from models.dag_validation import ensure_valid_graph
+from models.json_patch import apply_patch, touched_paths
+from models.repository import DocumentNotFound
+from models.template_storage import (
+    COLLECTION,
+    create_template_document,
+    hydrate_templates as hydrate_checkpoints,
+    update_template_document,
+)
+
+VERSIONS_COLLECTION = "versions"
+# Campos de la plantilla que se pueden modificar con PATCH
+PATCHABLE_FIELDS = ("nodes", "edges", "name", "description")
+TEMPLATE_CHECKPOINT_INTERVAL = int(os.getenv("TEMPLATE_CHECKPOINT_INTERVAL", "20"))
+TEMPLATE_HEAD_CACHE_SIZE = int(os.getenv("TEMPLATE_HEAD_CACHE_SIZE", "64"))
+# Máximo de parches devueltos por ?sinceVersion= (más allá conviene recargar)
+MAX_PATCHES_PER_RESPONSE = 500
+
+class VersionConflict(Exception):
+    """La versión base del PATCH ya no es la cabeza de la plantilla."""
+
+    def __init__(self, current_version):
+        super().__init__(current_version)
+        self.current_version = current_version
+
+
+def _now():
+    return datetime.utcnow().isoformat()
+
+
+def _versions_ref(template_id):
+    return db.collection(COLLECTION).document(template_id).collection(VERSIONS_COLLECTION)
+
+
+def _version_id(version):
+    return f"{version:08d}"
+
+
+def _versions_of(doc):
+    version = int(doc.get("version") or 0)
+    checkpoint = int(doc.get("checkpointVersion") or version)
+    return version, min(checkpoint, version)
+
+
+def _record_entry(template_id, version, kind, uid=None):
+    _versions_ref(template_id).document(_version_id(version)).set(
+        {"version": version, "kind": kind, "createdAt": _now(), "createdBy": uid}
+    )
+
+
+def history(template_id, after_version, up_to_version):
+    """Entradas de historial con after_version < versión <= up_to_version, en orden."""
+    if up_to_version <= after_version:
+        return []
+    query = (
+        _versions_ref(template_id)
+        .order_by(FieldPath.document_id())
+        .start_after({FieldPath.document_id(): _version_id(after_version)})
+        .limit(up_to_version - after_version)
+    )
+    return [doc.to_dict() or {} for doc in query.stream()]
+
+
+# ---------------------------------------------------------------------------
+# Estado de la cabeza
+# ---------------------------------------------------------------------------
+
+
+class _HeadCache:
+    def __init__(self, max_entries):
+        self.max_entries = max(0, max_entries)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_head_cache = _HeadCache(TEMPLATE_HEAD_CACHE_SIZE)
+
+
+def _apply_history(state, entries, from_version, to_version):
+    expected = from_version
+    for entry in entries:
+        expected += 1
+        if entry.get("version") != expected or entry.get("kind") != "patch":
+            raise RuntimeError(f"Historial incompleto en la versión {expected}")
+        state = apply_patch(state, entry.get("operations") or [])
+    if expected != to_version:
+        raise RuntimeError(f"Historial incompleto: se esperaba hasta la versión {to_version}")
+    return state
+
+
+def hydrate_templates(docs):
+    """Plantillas con el grafo de la cabeza (checkpoint + parches pendientes)."""
+    hydrated = hydrate_checkpoints(docs)
+    results = []
+    for doc in hydrated:
+        version, checkpoint = _versions_of(doc)
+        if version == checkpoint:
+            results.append(doc)
+            continue
+        key = (doc["id"], version)
+        graph = _head_cache.get(key)
+        if graph is None:
+            state = {"nodes": doc.get("nodes") or [], "edges": doc.get("edges") or []}
+            entries = history(doc["id"], checkpoint, version)
+            state = _apply_history(state, entries, checkpoint, version)
+            graph = (state["nodes"], state["edges"])
+            _head_cache.put(key, graph)
+        results.append({**doc, "nodes": graph[0], "edges": graph[1]})
+    return results
+
+
+def hydrate_template(doc):
+    return hydrate_templates([doc])[0]
+
+
+def _load_head(template_id):
+    """Documento actual (leído de la fuente, no de la vista) con el grafo de la cabeza."""
+    snapshot = db.collection(COLLECTION).document(template_id).get()
+    if not snapshot.exists:
+        raise DocumentNotFound(template_id)
+    data = snapshot.to_dict() or {}
+    data["id"] = snapshot.id
+    return hydrate_template(data)
+
+
+# ---------------------------------------------------------------------------
+# Escritura
+# ---------------------------------------------------------------------------
+
+
+def create_versioned_template(template_id, payload, metadata):
+    """Crea la plantilla en la versión 1."""
+    create_template_document(template_id, {**payload, "version": 1, "checkpointVersion": 1}, metadata)
+    _record_entry(template_id, 1, "create", metadata.get("createdBy"))
+
+
+def replace_template(template_id, payload, uid=None):
+    """
+    PUT: reemplaza el grafo completo como nueva versión (checkpoint). Devuelve
+    la versión. VersionConflict si otra escritura cambió la cabeza mientras tanto.
+    """
+    snapshot = db.collection(COLLECTION).document(template_id).get(field_paths=["version"])
+    if not snapshot.exists:
+        raise DocumentNotFound(template_id)
+    base_version = int((snapshot.to_dict() or {}).get("version") or 0)
+    version = base_version + 1
+
+    def prepare(transaction, current):
+        current_version = int(current.get("version") or 0)
+        if current_version != base_version:
+            raise VersionConflict(current_version)
+        transaction.create(
+            _versions_ref(template_id).document(_version_id(version)),
+            {"version": version, "kind": "replace", "createdAt": _now(), "createdBy": uid},
+        )
+        return {"version": version, "checkpointVersion": version}
+
+    try:
+        update_template_document(template_id, payload, prepare)
+    except Conflict:
+        raise VersionConflict(version)
+    return version
+
+
+def _is_structural(paths):
+    """True si el parche puede cambiar ids, tipos o conexiones (hay que revalidar)."""
+    for parts in paths:
+        if parts[0] == "edges":
+            return True
+        if parts[0] != "nodes":
+            continue
+        # /nodes, /nodes/i, /nodes/i/id, /nodes/i/data y /nodes/i/data/type
+        if len(parts) <= 2 or parts[2] == "id":
+            return True
+        if parts[2] == "data" and (len(parts) == 3 or parts[3] == "type"):
+            return True
+    return False
+
+
+def patch_template(template_id, base_version, operations, uid=None):
+    """
+    Aplica un JSON Patch sobre la versión `base_version`. Devuelve
+    (versión nueva, hubo checkpoint). VersionConflict si la base no es la cabeza.
+    """
+    if not isinstance(operations, list) or not operations:
+        raise ValueError("operations debe ser un arreglo no vacío")
+    paths = touched_paths(operations)
+    for parts in paths:
+        if not parts or parts[0] not in PATCHABLE_FIELDS:
+            raise ValueError(f"Solo se pueden modificar: {', '.join(PATCHABLE_FIELDS)}")
+
+    current = _load_head(template_id)
+    version, checkpoint = _versions_of(current)
+    if base_version != version:
+        raise VersionConflict(version)
+
+    state = apply_patch({field: current.get(field) for field in PATCHABLE_FIELDS}, operations)
+    if not isinstance(state.get("nodes"), list) or not isinstance(state.get("edges"), list):
+        raise ValueError("nodes y edges deben ser arreglos")
+    if not isinstance(state.get("name"), str) or not state["name"].strip():
+        raise ValueError("name es requerido")
+    if _is_structural(paths):
+        ensure_valid_graph(state["nodes"], state["edges"], current.get("framework"))
+
+    new_version = version + 1
+    now = _now()
+    changes = {
+        "version": new_version,
+        "nodeCount": len(state["nodes"]),
+        "edgeCount": len(state["edges"]),
+        "metadata.updatedAt": now,
+    }
+    for field in ("name", "description"):
+        if state.get(field) != current.get(field):
+            changes[field] = str(state.get(field) or "").strip()
+
+    parent_ref = db.collection(COLLECTION).document(template_id)
+    batch = db.batch()
+    batch.create(
+        _versions_ref(template_id).document(_version_id(new_version)),
+        {"version": new_version, "kind": "patch", "operations": operations, "createdAt": now, "createdBy": uid},
+    )
+    batch.update(parent_ref, changes)
+    try:
+        batch.commit()
+    except Conflict:
+        raise VersionConflict(version + 1)
+    except NotFound:
+        raise DocumentNotFound(template_id)
+    _head_cache.put((template_id, new_version), (state["nodes"], state["edges"]))
+    notify_local_write(COLLECTION)
+
+    checkpointed = False
+    if new_version - checkpoint >= TEMPLATE_CHECKPOINT_INTERVAL:
+        # El parche ya está confirmado: si el checkpoint falla lo reintenta el próximo PATCH
+        try:
+            checkpointed = _write_checkpoint(template_id, new_version, state)
+        except Exception as e:
+            print(f"Error guardando checkpoint de la plantilla {template_id} (versión {new_version}): {e}")
+    return new_version, checkpointed
+
+
+def _write_checkpoint(template_id, version, state):
+    """
+    Guarda el grafo completo de `version` como nuevo checkpoint (sin tocar la
+    cabeza). No escribe si otra escritura ya dejó un checkpoint igual o posterior.
+    Devuelve True si se escribió.
+    """
+
+    def prepare(transaction, current):
+        if int(current.get("checkpointVersion") or 0) >= version or int(current.get("version") or 0) < version:
+            return None
+        return {"checkpointVersion": version}
+
+    return update_template_document(template_id, {"nodes": state["nodes"], "edges": state["edges"]}, prepare)
+
+
+def patches_since(template_id, since_version, current_version):
+    """
+    Parches para pasar de `since_version` a la cabeza, o None si en ese rango
+    hay un reemplazo completo (el cliente debe recargar la plantilla).
+    """
+    if since_version > current_version:
+        raise ValueError(f"sinceVersion es mayor que la versión actual ({current_version})")
+    if current_version - since_version > MAX_PATCHES_PER_RESPONSE:
+        return None
+    entries = history(template_id, since_version, current_version)
+    if len(entries) != current_version - since_version or any(e.get("kind") != "patch" for e in entries):
+        return None
+    return [{"version": e["version"], "operations": e.get("operations") or []} for e in entries]
@@ -1,11 +1,22 @@
 from flask import Blueprint, request, jsonify
 from firebase_admin import auth
 import os
+import requests
+from requests.adapters import HTTPAdapter
 from config.firebase import create_jwt_token, create_user_document, get_user_profile, verify_jwt_token
+from config.firebase_async import create_user_document_async
 from middleware.auth import require_auth
 
 auth_bp = Blueprint('auth', __name__)
 
+# Sesión HTTP compartida: reutiliza las conexiones TLS a Identity Toolkit
+# (keep-alive) en lugar de abrir una por login. El pool admite un hilo por conexión.
+identity_toolkit_session = requests.Session()
+identity_toolkit_session.mount(
+    'https://',
+    HTTPAdapter(pool_connections=1, pool_maxsize=int(os.getenv('IDENTITY_TOOLKIT_POOL_SIZE', '16'))),
+)
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     """Registro con email y contraseña"""
@@ -57,6 +68,63 @@ def register():
         print(f"Error en registro: {e}")
         return jsonify({'error': 'Error al crear la cuenta'}), 500
 
+IDENTITY_TOOLKIT_ERRORS = {
+    'EMAIL_NOT_FOUND': ('Email no registrado', 401),
+    'INVALID_PASSWORD': ('Contraseña incorrecta', 401),
+    'INVALID_LOGIN_CREDENTIALS': ('Credenciales incorrectas', 401),
+    'USER_DISABLED': ('Usuario deshabilitado', 403),
+    'INVALID_API_KEY': ('FIREBASE_WEB_API_KEY inválida', 500),
+    'PROJECT_NOT_FOUND': ('Proyecto Firebase no encontrado (revisa FIREBASE_WEB_API_KEY)', 500),
+    'API_KEY_SERVICE_BLOCKED': ('FIREBASE_WEB_API_KEY bloqueada para Identity Toolkit', 500),
+    'OPERATION_NOT_ALLOWED': ('Proveedor Email/Password no habilitado en Firebase Auth', 500),
+}
+
+def identity_toolkit_url():
+    """URL de signInWithPassword; RuntimeError si FIREBASE_WEB_API_KEY no es usable"""
+    firebase_api_key = os.getenv("FIREBASE_WEB_API_KEY")
+    if not firebase_api_key:
+        raise RuntimeError('FIREBASE_WEB_API_KEY no configurado en el backend')
+    if firebase_api_key.strip() == 'TU_FIREBASE_WEB_API_KEY':
+        raise RuntimeError('FIREBASE_WEB_API_KEY tiene valor placeholder; configúrala con la Web API Key real de Firebase')
+    return f"https://identitytoolkit.googleapis.com/v1/accounts:signInWithPassword?key={firebase_api_key}"
+
+def login_failure(response):
+    """(cuerpo, status) para un error de Identity Toolkit (respuesta de requests o httpx)"""
+    firebase_error = None
+    try:
+        firebase_error = response.json().get('error', {}).get('message')
+    except Exception:
+        firebase_error = None
+
+    message, status = IDENTITY_TOOLKIT_ERRORS.get(firebase_error, ('Error autenticando con Firebase', 401))
+    return {'error': message, 'firebaseError': firebase_error}, status
+
+def login_success(uid, email, user_data):
+    """Cuerpo de respuesta de un login correcto con el JWT propio"""
+    if not user_data:
+        user_data = {
+            'displayName': email.split('@')[0] if email else 'Usuario',
+            'admin': False
+        }
+
+    token = create_jwt_token(
+        uid=uid,
+        email=email,
+        is_admin=user_data.get('admin', False),
+        is_anonymous=False
+    )
+
+    return {
+        'token': token,
+        'user': {
+            'uid': uid,
+            'email': email,
+            'displayName': user_data.get('displayName'),
+            'admin': user_data.get('admin', False),
+            'isAnonymous': False
+        }
+    }
+
 @auth_bp.route('/login', methods=['POST'])
 def login():
     """Login con email y contraseña"""
@@ -71,14 +139,10 @@ def login():
         # Verificar usuario en Firebase Auth
         # Nota: Firebase Admin SDK no puede verificar contraseñas directamente
         # Necesitamos usar la REST API de Firebase
-        import requests
-        
-        firebase_api_key = os.getenv("FIREBASE_WEB_API_KEY")
-        if not firebase_api_key:
-            return jsonify({'error': 'FIREBASE_WEB_API_KEY no configurado en el backend'}), 500
-        if firebase_api_key.strip() == 'TU_FIREBASE_WEB_API_KEY':
-            return jsonify({'error': 'FIREBASE_WEB_API_KEY tiene valor placeholder; configúrala con la Web API Key real de Firebase'}), 500
-        url = f"https://identitytoolkit.googleapis.com/v1/accounts:signInWithPassword?key={firebase_api_key}"
+        try:
+            url = identity_toolkit_url()
+        except RuntimeError as e:
+            return jsonify({'error': str(e)}), 500
         
         payload = {
             "email": email,
@@ -86,62 +150,55 @@ def login():
             "returnSecureToken": True
         }
         
-        response = requests.post(url, json=payload, timeout=10)
+        response = identity_toolkit_session.post(url, json=payload, timeout=10)
         
         if response.status_code != 200:
-            firebase_error = None
-            try:
-                firebase_error = response.json().get('error', {}).get('message')
-            except Exception:
-                firebase_error = None
-
-            error_map = {
-                'EMAIL_NOT_FOUND': ('Email no registrado', 401),
-                'INVALID_PASSWORD': ('Contraseña incorrecta', 401),
-                'INVALID_LOGIN_CREDENTIALS': ('Credenciales incorrectas', 401),
-                'USER_DISABLED': ('Usuario deshabilitado', 403),
-                'INVALID_API_KEY': ('FIREBASE_WEB_API_KEY inválida', 500),
-                'PROJECT_NOT_FOUND': ('Proyecto Firebase no encontrado (revisa FIREBASE_WEB_API_KEY)', 500),
-                'API_KEY_SERVICE_BLOCKED': ('FIREBASE_WEB_API_KEY bloqueada para Identity Toolkit', 500),
-                'OPERATION_NOT_ALLOWED': ('Proveedor Email/Password no habilitado en Firebase Auth', 500),
-            }
-            message, status = error_map.get(firebase_error, ('Error autenticando con Firebase', 401))
-            return jsonify({'error': message, 'firebaseError': firebase_error}), status
+            body, status = login_failure(response)
+            return jsonify(body), status
         
         firebase_data = response.json()
         uid = firebase_data['localId']
         
         # Crear o actualizar documento en Firestore
         user_data = create_user_document(uid, email, is_anonymous=False)
-        if not user_data:
-            user_data = {
-                'displayName': email.split('@')[0] if email else 'Usuario',
-                'admin': False
-            }
         
-        # Generar JWT propio
-        token = create_jwt_token(
-            uid=uid,
-            email=email,
-            is_admin=user_data.get('admin', False),
-            is_anonymous=False
-        )
-        
-        return jsonify({
-            'token': token,
-            'user': {
-                'uid': uid,
-                'email': email,
-                'displayName': user_data.get('displayName'),
-                'admin': user_data.get('admin', False),
-                'isAnonymous': False
-            }
-        }), 200
+        return jsonify(login_success(uid, email, user_data)), 200
         
     except Exception as e:
         print(f"Error en login: {e}")
         return jsonify({'error': 'Error al iniciar sesión', 'detail': str(e)}), 500
 
+async def login_async(data, http_client):
+    """Versión async de login para el modo ASGI (httpx + Firestore AsyncClient).
+    Devuelve (cuerpo, status)."""
+    try:
+        email = data.get('email')
+        password = data.get('password')
+
+        if not email or not password:
+            return {'error': 'Email y contraseña requeridos'}, 400
+
+        try:
+            url = identity_toolkit_url()
+        except RuntimeError as e:
+            return {'error': str(e)}, 500
+
+        response = await http_client.post(
+            url,
+            json={"email": email, "password": password, "returnSecureToken": True},
+            timeout=10,
+        )
+        if response.status_code != 200:
+            return login_failure(response)
+
+        uid = response.json()['localId']
+        user_data = await create_user_document_async(uid, email, is_anonymous=False)
+        return login_success(uid, email, user_data), 200
+
+    except Exception as e:
+        print(f"Error en login: {e}")
+        return {'error': 'Error al iniciar sesión', 'detail': str(e)}, 500
+
 @auth_bp.route('/login/anonymous', methods=['POST'])
 def login_anonymous():
     """Login anónimo. No se registra usuario en Firebase Auth ni en Firestore."""
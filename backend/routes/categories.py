@@ -2,10 +2,20 @@ from datetime import datetime
 
 from flask import Blueprint, jsonify, request
 
-from config.firebase import db
+from config.catalog_cache import catalog_response, get_catalog_cache
+from config.catalog_views import page_documents, query_documents
 from middleware.auth import require_admin
+from models.repository import (
+    DocumentExists,
+    DocumentNotFound,
+    create_document,
+    deactivate_document,
+    update_document,
+)
+from routes.pagination import listing_response, parse_listing_args
 
 categories_bp = Blueprint("categories", __name__)
+categories_cache = get_catalog_cache("categories")
 
 CATEGORY_REQUIRED_FIELDS = ["id", "label"]
 VALID_FRAMEWORKS = {"all", "airflow", "argo"}
@@ -44,29 +54,32 @@ def normalize_category_payload(data):
     }
 
 
+def load_active_categories(framework=None):
+    """Categorías activas visibles para un framework (vista en memoria o Firestore)."""
+    categories = []
+    for category in query_documents("categories", [("isActive", True)]):
+        if framework and category.get("framework", "all") not in ("all", framework):
+            continue
+        categories.append(category)
+
+    categories.sort(
+        key=lambda item: (
+            int(item.get("order", 999)),
+            str(item.get("label") or item.get("id") or "").lower(),
+        )
+    )
+    return categories
+
+
 @categories_bp.route("/categories", methods=["GET"])
 def get_categories():
     """Obtiene categorías activas. Query: ?framework=airflow|argo"""
     try:
         framework = request.args.get("framework")
-        docs = db.collection("categories").where("isActive", "==", True).stream()
-
-        categories = []
-        for doc in docs:
-            category = doc.to_dict()
-            category["id"] = doc.id
-            if framework in ("airflow", "argo"):
-                if category.get("framework", "all") not in ("all", framework):
-                    continue
-            categories.append(category)
-
-        categories.sort(
-            key=lambda item: (
-                int(item.get("order", 999)),
-                str(item.get("label") or item.get("id") or "").lower(),
-            )
-        )
-        return jsonify(categories), 200
+        if framework not in ("airflow", "argo"):
+            framework = None
+
+        return catalog_response(categories_cache, framework or "all", lambda: load_active_categories(framework))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -74,31 +87,37 @@ def get_categories():
 @categories_bp.route("/admin/categories", methods=["GET"])
 @require_admin
 def get_categories_admin():
-    """Obtiene categorías para administración. Query: ?framework=all|airflow|argo&includeInactive=true|false"""
+    """Obtiene categorías para administración.
+    Query: ?framework=all|airflow|argo&includeInactive=true|false&limit=&after=&fields="""
     try:
+        limit, after, fields = parse_listing_args(request.args)
         framework = request.args.get("framework")
         include_inactive = request.args.get("includeInactive", "true").lower() == "true"
-        query = db.collection("categories")
-        if not include_inactive:
-            query = query.where("isActive", "==", True)
-
-        docs = query.stream()
-        categories = []
-        for doc in docs:
-            category = doc.to_dict()
-            category["id"] = doc.id
-            if framework in VALID_FRAMEWORKS and framework != "all":
-                if category.get("framework", "all") not in ("all", framework):
-                    continue
-            categories.append(category)
-
-        categories.sort(
-            key=lambda item: (
-                int(item.get("order", 999)),
-                str(item.get("label") or item.get("id") or "").lower(),
-            )
+        filters = [] if include_inactive else [("isActive", True)]
+
+        predicate = None
+        if framework in VALID_FRAMEWORKS and framework != "all":
+            predicate = lambda category: category.get("framework", "all") in ("all", framework)
+
+        categories, next_cursor = page_documents(
+            "categories",
+            filters,
+            limit=limit,
+            after=after,
+            fields=fields,
+            predicate=predicate,
+            predicate_fields=("framework",),
         )
-        return jsonify(categories), 200
+        if limit is None:
+            categories.sort(
+                key=lambda item: (
+                    int(item.get("order", 999)),
+                    str(item.get("label") or item.get("id") or "").lower(),
+                )
+            )
+        return listing_response(categories, limit, next_cursor)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -109,12 +128,10 @@ def create_category(category_id):
     """Crea categoría con ID explícito"""
     try:
         payload = normalize_category_payload({**(request.json or {}), "id": category_id})
-        doc_ref = db.collection("categories").document(payload["id"])
-        if doc_ref.get().exists:
-            return jsonify({"error": "Ya existe una categoría con ese ID"}), 409
-
         now = datetime.utcnow().isoformat()
-        doc_ref.set(
+        create_document(
+            "categories",
+            payload["id"],
             {
                 **payload,
                 "metadata": {
@@ -122,9 +139,11 @@ def create_category(category_id):
                     "updatedAt": now,
                     "createdBy": request.uid,
                 },
-            }
+            },
         )
         return jsonify({"id": payload["id"], "message": "Categoría creada exitosamente"}), 201
+    except DocumentExists:
+        return jsonify({"error": "Ya existe una categoría con ese ID"}), 409
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
@@ -136,15 +155,12 @@ def create_category(category_id):
 def update_category(category_id):
     """Actualiza categoría"""
     try:
-        doc_ref = db.collection("categories").document(category_id)
-        if not doc_ref.get().exists:
-            return jsonify({"error": "Categoría no encontrada"}), 404
-
         payload = normalize_category_payload({**(request.json or {}), "id": category_id})
         payload.pop("id", None)
-        payload["metadata.updatedAt"] = datetime.utcnow().isoformat()
-        doc_ref.update(payload)
+        update_document("categories", category_id, payload)
         return jsonify({"message": "Categoría actualizada exitosamente"}), 200
+    except DocumentNotFound:
+        return jsonify({"error": "Categoría no encontrada"}), 404
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
@@ -156,15 +172,9 @@ def update_category(category_id):
 def delete_category(category_id):
     """Desactiva categoría (soft delete)"""
     try:
-        doc_ref = db.collection("categories").document(category_id)
-        if not doc_ref.get().exists:
-            return jsonify({"error": "Categoría no encontrada"}), 404
-        doc_ref.update(
-            {
-                "isActive": False,
-                "metadata.updatedAt": datetime.utcnow().isoformat(),
-            }
-        )
+        deactivate_document("categories", category_id)
         return jsonify({"message": "Categoría desactivada exitosamente"}), 200
+    except DocumentNotFound:
+        return jsonify({"error": "Categoría no encontrada"}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
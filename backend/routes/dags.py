@@ -0,0 +1,126 @@
+from flask import Blueprint, jsonify, request
+
+from middleware.auth import require_auth
+from models.airflow_codegen import compile_dag, compile_many, render_module
+from models.dag_validation import validate_graph
+
+dags_bp = Blueprint("dags", __name__)
+
+# Límite de DAGs por request en la compilación en lote
+DAG_BATCH_MAX = 200
+
+
+def parse_graph_lists(data):
+    """`(nodes, edges)` del payload; solo exige que sean arreglos."""
+    if not isinstance(data, dict):
+        raise ValueError("Payload inválido")
+    nodes = data.get("nodes")
+    edges = data.get("edges", [])
+    if not isinstance(nodes, list):
+        raise ValueError("nodes debe ser un arreglo")
+    if not isinstance(edges, list):
+        raise ValueError("edges debe ser un arreglo")
+    return nodes, edges
+
+
+def parse_dag_graph(data):
+    """Valida `{nodes, edges, filename?, fallbackDagId?}` del editor para compilarlo."""
+    nodes, edges = parse_graph_lists(data)
+    for position, node in enumerate(nodes):
+        if not isinstance(node, dict) or not isinstance(node.get("id"), str):
+            raise ValueError(f"El nodo en la posición {position} debe tener un id de texto")
+    for position, edge in enumerate(edges):
+        endpoints = (edge.get("source"), edge.get("target")) if isinstance(edge, dict) else (None, None)
+        if not all(isinstance(endpoint, str) for endpoint in endpoints):
+            raise ValueError(f"La conexión en la posición {position} debe tener source y target de texto")
+
+    filename = str(data.get("filename") or "dag.py").strip() or "dag.py"
+    if not filename.endswith(".py"):
+        filename = f"{filename}.py"
+    fallback_dag_id = filename[:-3] or "generated_dag"
+    return {
+        "nodes": nodes,
+        "edges": edges,
+        "fallbackDagId": str(data.get("fallbackDagId") or fallback_dag_id),
+        "filename": filename,
+    }
+
+
+def compiled_result(graph, graph_hash, body, cached):
+    return {
+        "code": render_module(body),
+        "filename": graph["filename"],
+        "framework": "airflow",
+        "graphHash": graph_hash,
+        "cached": cached,
+    }
+
+
+@dags_bp.route("/dags:compile", methods=["POST"])
+@require_auth
+def compile_airflow_dag():
+    """Genera el módulo Python de Airflow para el grafo del editor"""
+    try:
+        graph = parse_dag_graph(request.get_json(silent=True))
+        graph_hash, body, cached = compile_dag(graph)
+        return jsonify(compiled_result(graph, graph_hash, body, cached)), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@dags_bp.route("/dags:compile-batch", methods=["POST"])
+@require_auth
+def compile_airflow_dags():
+    """Genera varios DAGs en paralelo; los errores se informan por elemento"""
+    try:
+        data = request.get_json(silent=True)
+        items = data.get("dags") if isinstance(data, dict) else None
+        if not isinstance(items, list) or not items:
+            raise ValueError("dags debe ser un arreglo no vacío")
+        if len(items) > DAG_BATCH_MAX:
+            raise ValueError(f"Máximo {DAG_BATCH_MAX} DAGs por request")
+
+        results = [None] * len(items)
+        graphs = []
+        for index, item in enumerate(items):
+            try:
+                graphs.append((index, parse_dag_graph(item)))
+            except ValueError as e:
+                results[index] = {"index": index, "error": str(e)}
+
+        compiled = compile_many([graph for _, graph in graphs])
+        for (index, graph), (graph_hash, body, cached, error) in zip(graphs, compiled):
+            if error:
+                results[index] = {"index": index, "graphHash": graph_hash, "error": error}
+            else:
+                results[index] = {"index": index, **compiled_result(graph, graph_hash, body, cached)}
+
+        return jsonify({
+            "total": len(items),
+            "compiled": sum(1 for result in results if "code" in result),
+            "results": results,
+        }), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@dags_bp.route("/dags:validate", methods=["POST"])
+@require_auth
+def validate_dag():
+    """Valida la estructura del grafo; devuelve todos los errores y advertencias"""
+    try:
+        data = request.get_json(silent=True)
+        # Los nodos/conexiones mal formados se informan en `errors` con su posición
+        nodes, edges = parse_graph_lists(data)
+        framework = data.get("framework")
+        if framework not in (None, "airflow", "argo"):
+            raise ValueError('framework debe ser "airflow" o "argo"')
+        return jsonify(validate_graph(nodes, edges, framework)), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,50 @@
+import re
+
+from flask import jsonify
+
+MAX_PAGE_SIZE = 500
+MAX_PROJECTION_FIELDS = 30
+FIELD_PATH_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$")
+
+
+def parse_listing_args(args):
+    """
+    Lee ?limit=&after=&fields= de un listado de administración.
+    Devuelve (limit, after, fields); limit/fields son None si no se pidieron.
+    """
+    limit = None
+    raw_limit = args.get("limit")
+    if raw_limit not in (None, ""):
+        try:
+            limit = int(raw_limit)
+        except (TypeError, ValueError):
+            raise ValueError("limit debe ser un número entero")
+        if limit < 1 or limit > MAX_PAGE_SIZE:
+            raise ValueError(f"limit debe estar entre 1 y {MAX_PAGE_SIZE}")
+
+    after = str(args.get("after") or "").strip() or None
+    if after is not None and limit is None:
+        raise ValueError("after requiere limit")
+
+    fields = None
+    raw_fields = args.get("fields")
+    if raw_fields is not None:
+        fields = []
+        for field in raw_fields.split(","):
+            field = field.strip()
+            if not field or field == "id" or field in fields:
+                continue
+            if not FIELD_PATH_PATTERN.match(field):
+                raise ValueError(f"Campo inválido en fields: {field}")
+            fields.append(field)
+        if len(fields) > MAX_PROJECTION_FIELDS:
+            raise ValueError(f"fields admite como máximo {MAX_PROJECTION_FIELDS} campos")
+
+    return limit, after, fields
+
+
+def listing_response(items, limit, next_cursor):
+    """Lista simple sin paginación; con `limit`, objeto con `items` y `nextCursor`."""
+    if limit is None:
+        return jsonify(items), 200
+    return jsonify({"items": items, "nextCursor": next_cursor, "limit": limit}), 200
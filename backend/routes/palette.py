@@ -0,0 +1,123 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+from flask import Blueprint, jsonify, request
+
+from middleware.auth import optional_auth
+from routes.categories import categories_cache, load_active_categories
+from routes.styles import load_active_styles, styles_cache
+from routes.tasks import load_active_tasks, tasks_cache
+from routes.user_preferences import load_user_preferences
+
+palette_bp = Blueprint("palette", __name__)
+
+FRAMEWORKS = ("airflow", "argo")
+DEFAULT_PREFERENCES = {
+    "favoriteTaskIds": [],
+    "hasCustomFavorites": False,
+    "source": "server-default",
+}
+
+# Pool compartido para resolver las colecciones del bootstrap en paralelo
+_bootstrap_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="palette-bootstrap")
+
+
+def categories_for_framework(categories, framework):
+    """Equivalente a getCategoriesForFramework del frontend (ya vienen ordenadas)."""
+    return [
+        category
+        for category in categories
+        if category.get("isActive", True) is not False
+        and category.get("framework", "all") in ("all", framework)
+    ]
+
+
+def group_palette(tasks, categories, favorite_task_ids, has_custom_favorites):
+    """
+    Agrupa ids de tasks por framework y categoría, igual que
+    groupBlocksByFrameworkAndCategory en el frontend ("common" = Favoritos).
+    Devuelve (grupos, orden de categorías por framework).
+    """
+    category_meta = {category.get("id"): category for category in categories}
+    favorite_set = {str(task_id).strip() for task_id in favorite_task_ids if str(task_id).strip()}
+    grouped = {framework: {"common": []} for framework in FRAMEWORKS}
+
+    for task in tasks:
+        framework = task.get("framework") if task.get("framework") in FRAMEWORKS else "airflow"
+        groups = grouped[framework]
+        groups.setdefault(framework, [])
+        category = task.get("category") or "others"
+        groups.setdefault(category, []).append(task["id"])
+
+        if has_custom_favorites:
+            if str(task["id"]).strip() in favorite_set:
+                groups["common"].append(task["id"])
+        elif task.get("isDefaultFavorite") or (category_meta.get(category) or {}).get("showInDefaultFavorites"):
+            groups["common"].append(task["id"])
+
+    # Mismo orden que BlockPalette: Favoritos, categorías por `order` y luego el resto
+    order = {}
+    for framework, groups in grouped.items():
+        base = [c["id"] for c in categories_for_framework(categories, framework) if c.get("id") != "common"]
+        ordered = [c for c in ["common", *base] if groups.get(c)]
+        ordered += [c for c in groups if c not in ordered and c not in base and c != "common"]
+        order[framework] = ordered
+
+    return grouped, order
+
+
+@palette_bp.route("/palette/bootstrap", methods=["GET"])
+@optional_auth
+def get_palette_bootstrap():
+    """
+    Tasks, categorías, estilos y preferencias del usuario en una sola respuesta.
+    Query: ?framework=airflow|argo (opcional). Sin token se usan favoritos por defecto.
+    """
+    try:
+        framework = request.args.get("framework")
+        if framework not in FRAMEWORKS:
+            framework = None
+        cache_key = framework or "all"
+        uid = request.uid
+
+        # copy_context: las lecturas de los hilos se cuentan en este request (Server-Timing)
+        tasks_future = _bootstrap_executor.submit(
+            copy_context().run, tasks_cache.get_or_load, cache_key, lambda: load_active_tasks(framework)
+        )
+        categories_future = _bootstrap_executor.submit(
+            copy_context().run, categories_cache.get_or_load, cache_key, lambda: load_active_categories(framework)
+        )
+        styles_future = _bootstrap_executor.submit(
+            copy_context().run, styles_cache.get_or_load, "all", load_active_styles
+        )
+        preferences_future = (
+            _bootstrap_executor.submit(copy_context().run, load_user_preferences, uid) if uid else None
+        )
+
+        tasks = tasks_future.result()
+        categories = categories_future.result()
+        styles = styles_future.result()
+        preferences = preferences_future.result() if preferences_future else dict(DEFAULT_PREFERENCES)
+
+        palette, category_order = group_palette(
+            tasks,
+            categories,
+            preferences.get("favoriteTaskIds", []),
+            preferences.get("hasCustomFavorites", False),
+        )
+
+        return jsonify(
+            {
+                "framework": framework,
+                "tasks": tasks,
+                "categories": categories,
+                "styles": styles,
+                "preferences": preferences,
+                "palette": palette,
+                "categoryOrder": category_order,
+            }
+        ), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
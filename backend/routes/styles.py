@@ -2,10 +2,20 @@ from datetime import datetime
 
 from flask import Blueprint, jsonify, request
 
-from config.firebase import db
+from config.catalog_cache import catalog_response, get_catalog_cache
+from config.catalog_views import page_documents, query_documents
 from middleware.auth import require_admin
+from models.repository import (
+    DocumentExists,
+    DocumentNotFound,
+    create_document,
+    deactivate_document,
+    update_document,
+)
+from routes.pagination import listing_response, parse_listing_args
 
 styles_bp = Blueprint("styles", __name__)
+styles_cache = get_catalog_cache("styles")
 
 STYLE_REQUIRED_FIELDS = ["id"]
 
@@ -38,24 +48,23 @@ def normalize_style_payload(data):
     }
 
 
+def load_active_styles():
+    """Estilos activos ordenados por `order` y etiqueta (vista en memoria o Firestore)."""
+    styles = query_documents("styles", [("isActive", True)])
+    styles.sort(
+        key=lambda item: (
+            int(item.get("order", 999)),
+            str(item.get("label") or item.get("id") or "").lower(),
+        )
+    )
+    return styles
+
+
 @styles_bp.route("/styles", methods=["GET"])
 def get_styles():
     """Obtiene estilos activos."""
     try:
-        docs = db.collection("styles").where("isActive", "==", True).stream()
-        styles = []
-        for doc in docs:
-            style = doc.to_dict()
-            style["id"] = doc.id
-            styles.append(style)
-
-        styles.sort(
-            key=lambda item: (
-                int(item.get("order", 999)),
-                str(item.get("label") or item.get("id") or "").lower(),
-            )
-        )
-        return jsonify(styles), 200
+        return catalog_response(styles_cache, "all", load_active_styles)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -63,27 +72,22 @@ def get_styles():
 @styles_bp.route("/admin/styles", methods=["GET"])
 @require_admin
 def get_styles_admin():
-    """Obtiene estilos para administración. Query: ?includeInactive=true|false"""
+    """Obtiene estilos para administración. Query: ?includeInactive=true|false&limit=&after=&fields="""
     try:
+        limit, after, fields = parse_listing_args(request.args)
         include_inactive = request.args.get("includeInactive", "true").lower() == "true"
-        query = db.collection("styles")
-        if not include_inactive:
-            query = query.where("isActive", "==", True)
-
-        docs = query.stream()
-        styles = []
-        for doc in docs:
-            style = doc.to_dict()
-            style["id"] = doc.id
-            styles.append(style)
-
-        styles.sort(
-            key=lambda item: (
-                int(item.get("order", 999)),
-                str(item.get("label") or item.get("id") or "").lower(),
+        filters = [] if include_inactive else [("isActive", True)]
+        styles, next_cursor = page_documents("styles", filters, limit=limit, after=after, fields=fields)
+        if limit is None:
+            styles.sort(
+                key=lambda item: (
+                    int(item.get("order", 999)),
+                    str(item.get("label") or item.get("id") or "").lower(),
+                )
             )
-        )
-        return jsonify(styles), 200
+        return listing_response(styles, limit, next_cursor)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -94,12 +98,10 @@ def create_style(style_id):
     """Crea estilo con ID explícito."""
     try:
         payload = normalize_style_payload({**(request.json or {}), "id": style_id})
-        doc_ref = db.collection("styles").document(payload["id"])
-        if doc_ref.get().exists:
-            return jsonify({"error": "Ya existe un estilo con ese ID"}), 409
-
         now = datetime.utcnow().isoformat()
-        doc_ref.set(
+        create_document(
+            "styles",
+            payload["id"],
             {
                 **payload,
                 "metadata": {
@@ -107,9 +109,11 @@ def create_style(style_id):
                     "updatedAt": now,
                     "createdBy": request.uid,
                 },
-            }
+            },
         )
         return jsonify({"id": payload["id"], "message": "Estilo creado exitosamente"}), 201
+    except DocumentExists:
+        return jsonify({"error": "Ya existe un estilo con ese ID"}), 409
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
@@ -121,15 +125,12 @@ def create_style(style_id):
 def update_style(style_id):
     """Actualiza estilo."""
     try:
-        doc_ref = db.collection("styles").document(style_id)
-        if not doc_ref.get().exists:
-            return jsonify({"error": "Estilo no encontrado"}), 404
-
         payload = normalize_style_payload({**(request.json or {}), "id": style_id})
         payload.pop("id", None)
-        payload["metadata.updatedAt"] = datetime.utcnow().isoformat()
-        doc_ref.update(payload)
+        update_document("styles", style_id, payload)
         return jsonify({"message": "Estilo actualizado exitosamente"}), 200
+    except DocumentNotFound:
+        return jsonify({"error": "Estilo no encontrado"}), 404
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
@@ -141,16 +142,10 @@ def update_style(style_id):
 def delete_style(style_id):
     """Desactiva estilo (soft delete)."""
     try:
-        doc_ref = db.collection("styles").document(style_id)
-        if not doc_ref.get().exists:
-            return jsonify({"error": "Estilo no encontrado"}), 404
-        doc_ref.update(
-            {
-                "isActive": False,
-                "metadata.updatedAt": datetime.utcnow().isoformat(),
-            }
-        )
+        deactivate_document("styles", style_id)
         return jsonify({"message": "Estilo desactivado exitosamente"}), 200
+    except DocumentNotFound:
+        return jsonify({"error": "Estilo no encontrado"}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1,6 +1,13 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
 from flask import Blueprint, request, jsonify
+from google.cloud.firestore_v1 import DELETE_FIELD
 from config.firebase import db
+from config.catalog_cache import catalog_response, get_catalog_cache
+from config.catalog_views import get_document, get_documents, notify_local_write, page_documents, query_documents
 from middleware.auth import require_auth, require_admin
+from models.repository import DocumentNotFound, deactivate_document, update_document
+from routes.pagination import listing_response, parse_listing_args
 from datetime import datetime
 
 tasks_bp = Blueprint('tasks', __name__)
@@ -17,31 +24,79 @@ TASK_REQUIRED_FIELDS = [
     'parameters',
 ]
 ROOT_TASK_TYPES = {'DAG', 'ArgoWorkflow'}
+# Firestore permite máximo 500 operaciones por batch
+BATCH_WRITE_LIMIT = 500
+BATCH_MAX_TASKS = 5000
+BATCH_COMMIT_WORKERS = 4
+# Máximo de IDs por /tasks:batchGet
+BATCH_GET_MAX_IDS = 300
+# Hash que deja scripts/insertar-tasks.py; las escrituras de la API lo borran
+# para que la siguiente sincronización restaure la task desde los JSON
+CONTENT_HASH_FIELD = 'contentHash'
+tasks_cache = get_catalog_cache('tasks')
 
 
 def requires_task_id_parameter(task_data):
     """Solo tasks no-raíz requieren parameters.task_id."""
     return task_data.get('type') not in ROOT_TASK_TYPES
 
+def validate_task_payload(data):
+    """Valida una task nueva con las mismas reglas que create_task (ValueError si no es válida)."""
+    if not isinstance(data, dict):
+        raise ValueError('Payload inválido')
+    for field in TASK_REQUIRED_FIELDS:
+        if field not in data or data.get(field) in (None, ''):
+            raise ValueError(f'Campo requerido: {field}')
+    if data.get('framework') not in ('airflow', 'argo'):
+        raise ValueError('framework debe ser "airflow" o "argo"')
+    if not isinstance(data.get('parameters'), dict):
+        raise ValueError('parameters debe ser un objeto')
+    if requires_task_id_parameter(data) and 'task_id' not in data.get('parameters', {}):
+        raise ValueError('parameters.task_id es obligatorio')
+
+def build_task_document(data, uid):
+    """Documento a guardar para una task nueva (agrega metadata e isActive)."""
+    now = datetime.utcnow().isoformat()
+    return {
+        **{k: v for k, v in data.items() if k != CONTENT_HASH_FIELD},
+        'metadata': {
+            'version': data.get('version', '1.0.0'),
+            'createdAt': now,
+            'updatedAt': now,
+            'createdBy': uid
+        },
+        'isActive': True
+    }
+
+def load_active_tasks(framework=None):
+    """Tasks activas, opcionalmente filtradas por framework (vista en memoria o Firestore)."""
+    filters = [('isActive', True)]
+    if framework:
+        filters.append(('framework', framework))
+    return query_documents('tasks', filters)
+
+def parse_task_ids(raw_value):
+    """IDs separados por coma (sin vacíos ni duplicados, en orden)."""
+    ids = list(dict.fromkeys(part.strip() for part in (raw_value or '').split(',') if part.strip()))
+    if len(ids) > BATCH_GET_MAX_IDS:
+        raise ValueError(f'Máximo {BATCH_GET_MAX_IDS} ids por solicitud')
+    return ids
+
+def load_tasks_by_ids(task_ids):
+    """Tasks activas con esos IDs, en el mismo orden; las inactivas o inexistentes se omiten."""
+    found = get_documents('tasks', task_ids)
+    return [found[task_id] for task_id in task_ids if found.get(task_id, {}).get('isActive') is True]
+
 # GET todas las tasks desde Firestore (público, sin autenticación)
 @tasks_bp.route('/tasks', methods=['GET'])
 def get_tasks():
     """Obtiene todas las tasks activas. Query: ?framework=airflow|argo (opcional)."""
     try:
         framework = request.args.get('framework')
-        tasks_ref = db.collection('tasks')
-        query = tasks_ref.where('isActive', '==', True)
-        if framework in ('airflow', 'argo'):
-            query = query.where('framework', '==', framework)
-        tasks = query.stream()
+        if framework not in ('airflow', 'argo'):
+            framework = None
 
-        tasks_list = []
-        for task in tasks:
-            task_data = task.to_dict()
-            task_data['id'] = task.id
-            tasks_list.append(task_data)
-
-        return jsonify(tasks_list), 200
+        return catalog_response(tasks_cache, framework or 'all', lambda: load_active_tasks(framework))
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -50,25 +105,35 @@ def get_tasks():
 @tasks_bp.route('/admin/tasks', methods=['GET'])
 @require_admin
 def get_tasks_admin():
-    """Obtiene todas las tasks. Query: ?framework=airflow|argo&includeInactive=true|false"""
+    """Obtiene todas las tasks.
+    Query: ?framework=airflow|argo&includeInactive=true|false&limit=&after=&fields="""
     try:
+        limit, after, fields = parse_listing_args(request.args)
         framework = request.args.get('framework')
         include_inactive = request.args.get('includeInactive', 'true').lower() == 'true'
 
-        query = db.collection('tasks')
+        filters = []
         if not include_inactive:
-            query = query.where('isActive', '==', True)
+            filters.append(('isActive', True))
         if framework in ('airflow', 'argo'):
-            query = query.where('framework', '==', framework)
+            filters.append(('framework', framework))
 
-        tasks = query.stream()
-        tasks_list = []
-        for task in tasks:
-            task_data = task.to_dict()
-            task_data['id'] = task.id
-            tasks_list.append(task_data)
+        tasks_list, next_cursor = page_documents('tasks', filters, limit=limit, after=after, fields=fields)
+        return listing_response(tasks_list, limit, next_cursor)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        return jsonify(tasks_list), 200
+# GET varias tasks por ID (público)
+@tasks_bp.route('/tasks:batchGet', methods=['GET'])
+def batch_get_tasks():
+    """Obtiene tasks activas por ID. Query: ?ids=a,b,c (las que no existen se omiten)."""
+    try:
+        task_ids = parse_task_ids(request.args.get('ids'))
+        return jsonify({'tasks': load_tasks_by_ids(task_ids)}), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -77,15 +142,11 @@ def get_tasks_admin():
 def get_task(task_id):
     """Obtiene una task por ID"""
     try:
-        task_ref = db.collection('tasks').document(task_id)
-        task = task_ref.get()
+        task_data = get_document('tasks', task_id)
         
-        if not task.exists:
+        if task_data is None:
             return jsonify({'error': 'Task no encontrada'}), 404
         
-        task_data = task.to_dict()
-        task_data['id'] = task.id
-        
         return jsonify(task_data), 200
     
     except Exception as e:
@@ -100,28 +161,10 @@ def create_task():
         data = request.json
         
         # Validaciones básicas
-        required_fields = TASK_REQUIRED_FIELDS
-        for field in required_fields:
-            if field not in data or data.get(field) in (None, ''):
-                return jsonify({'error': f'Campo requerido: {field}'}), 400
-        if data.get('framework') not in ('airflow', 'argo'):
-            return jsonify({'error': 'framework debe ser "airflow" o "argo"'}), 400
-        if not isinstance(data.get('parameters'), dict):
-            return jsonify({'error': 'parameters debe ser un objeto'}), 400
-        if requires_task_id_parameter(data) and 'task_id' not in data.get('parameters', {}):
-            return jsonify({'error': 'parameters.task_id es obligatorio'}), 400
+        validate_task_payload(data)
         
         # Agregar metadata
-        task_data = {
-            **data,
-            'metadata': {
-                'version': data.get('version', '1.0.0'),
-                'createdAt': datetime.utcnow().isoformat(),
-                'updatedAt': datetime.utcnow().isoformat(),
-                'createdBy': request.uid
-            },
-            'isActive': True
-        }
+        task_data = build_task_document(data, request.uid)
         
         # Crear documento con ID personalizado o auto-generado
         task_id = data.get('id', None)
@@ -130,9 +173,92 @@ def create_task():
         else:
             task_ref = db.collection('tasks').add(task_data)
             task_id = task_ref[1].id
+        notify_local_write('tasks')
         
         return jsonify({'id': task_id, 'message': 'Task creada exitosamente'}), 201
     
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _commit_task_chunk(chunk):
+    """Escribe un bloque de (índice, id, documento) en un único WriteBatch.
+    Las tasks que ya existen se reemplazan conservando createdAt/createdBy."""
+    collection = db.collection('tasks')
+    refs = [collection.document(task_id) for _, task_id, _ in chunk]
+    created = {
+        doc.id: (doc.to_dict() or {}).get('metadata') or {}
+        for doc in db.get_all(refs, field_paths=['metadata.createdAt', 'metadata.createdBy'])
+        if doc.exists
+    }
+    batch = db.batch()
+    for ref, (_, task_id, task_data) in zip(refs, chunk):
+        original = created.get(task_id)
+        if original is not None:
+            metadata = {**task_data['metadata']}
+            for field in ('createdAt', 'createdBy'):
+                if field in original:
+                    metadata[field] = original[field]
+            task_data = {**task_data, 'metadata': metadata}
+        batch.set(ref, task_data)
+    batch.commit()
+
+# POST alta/actualización masiva de tasks (solo admins)
+@tasks_bp.route('/admin/tasks:batch', methods=['POST'])
+@require_admin
+def batch_upsert_tasks():
+    """Crea o reemplaza varias tasks. Body: [task, ...] o {"tasks": [...]}.
+    Cada task se valida como en create_task; se escriben en WriteBatch de 500
+    operaciones confirmados en paralelo (las existentes conservan su fecha y
+    autor de creación). Devuelve el resultado de cada elemento."""
+    try:
+        payload = request.get_json(silent=True)
+        items = payload.get('tasks') if isinstance(payload, dict) else payload
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'Se requiere un arreglo de tasks'}), 400
+        if len(items) > BATCH_MAX_TASKS:
+            return jsonify({'error': f'Máximo {BATCH_MAX_TASKS} tasks por solicitud'}), 400
+
+        results = [None] * len(items)
+        writes = []
+        seen_ids = set()
+        for index, data in enumerate(items):
+            task_id = str(data.get('id', '')).strip() if isinstance(data, dict) else ''
+            try:
+                validate_task_payload(data)
+                if task_id in seen_ids:
+                    raise ValueError('id duplicado en el lote')
+            except ValueError as e:
+                results[index] = {'index': index, 'id': task_id or None, 'status': 'invalid', 'error': str(e)}
+                continue
+            seen_ids.add(task_id)
+            writes.append((index, task_id, build_task_document(data, request.uid)))
+
+        chunks = [writes[i:i + BATCH_WRITE_LIMIT] for i in range(0, len(writes), BATCH_WRITE_LIMIT)]
+        if chunks:
+            with ThreadPoolExecutor(max_workers=min(BATCH_COMMIT_WORKERS, len(chunks))) as executor:
+                futures = [(chunk, executor.submit(copy_context().run, _commit_task_chunk, chunk)) for chunk in chunks]
+                for chunk, future in futures:
+                    error = future.exception()
+                    for index, task_id, _ in chunk:
+                        if error is None:
+                            results[index] = {'index': index, 'id': task_id, 'status': 'upserted'}
+                        else:
+                            results[index] = {'index': index, 'id': task_id, 'status': 'failed', 'error': str(error)}
+
+        upserted = sum(1 for result in results if result['status'] == 'upserted')
+        if upserted:
+            notify_local_write('tasks')
+
+        return jsonify({
+            'total': len(items),
+            'upserted': upserted,
+            'invalid': sum(1 for result in results if result['status'] == 'invalid'),
+            'failed': sum(1 for result in results if result['status'] == 'failed'),
+            'results': results,
+        }), 200
+
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -143,10 +269,6 @@ def update_task(task_id):
     """Actualiza una task existente"""
     try:
         data = request.json
-        task_ref = db.collection('tasks').document(task_id)
-        
-        if not task_ref.get().exists:
-            return jsonify({'error': 'Task no encontrada'}), 404
 
         if 'framework' in data and data.get('framework') not in ('airflow', 'argo'):
             return jsonify({'error': 'framework debe ser "airflow" o "argo"'}), 400
@@ -159,16 +281,13 @@ def update_task(task_id):
         ):
             return jsonify({'error': 'parameters.task_id es obligatorio'}), 400
         
-        # Actualizar metadata
-        update_data = {
-            **data,
-            'metadata.updatedAt': datetime.utcnow().isoformat()
-        }
-        
-        task_ref.update(update_data)
+        # Actualiza solo si existe (metadata.updatedAt lo agrega el repositorio)
+        update_document('tasks', task_id, {**data, CONTENT_HASH_FIELD: DELETE_FIELD})
         
         return jsonify({'message': 'Task actualizada exitosamente'}), 200
     
+    except DocumentNotFound:
+        return jsonify({'error': 'Task no encontrada'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -178,17 +297,11 @@ def update_task(task_id):
 def delete_task(task_id):
     """Desactiva una task (soft delete)"""
     try:
-        task_ref = db.collection('tasks').document(task_id)
-        
-        if not task_ref.get().exists:
-            return jsonify({'error': 'Task no encontrada'}), 404
-        
-        task_ref.update({
-            'isActive': False,
-            'metadata.updatedAt': datetime.utcnow().isoformat()
-        })
+        deactivate_document('tasks', task_id)
         
         return jsonify({'message': 'Task desactivada exitosamente'}), 200
     
+    except DocumentNotFound:
+        return jsonify({'error': 'Task no encontrada'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
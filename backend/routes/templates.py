@@ -2,10 +2,25 @@ from datetime import datetime
 
 from flask import Blueprint, jsonify, request
 
-from config.firebase import db
+from config.catalog_cache import catalog_response, get_catalog_cache
+from config.catalog_views import get_document, page_documents, query_documents
 from middleware.auth import require_admin
+from models.dag_validation import GraphValidationError, ensure_valid_graph
+from models.json_patch import JsonPatchTestFailed
+from models.repository import DocumentExists, DocumentNotFound, deactivate_document
+from models.template_versions import (
+    VersionConflict,
+    create_versioned_template,
+    hydrate_template,
+    hydrate_templates,
+    patch_template,
+    patches_since,
+    replace_template,
+)
+from routes.pagination import listing_response, parse_listing_args
 
 templates_bp = Blueprint("templates", __name__)
+templates_cache = get_catalog_cache("templates")
 
 TEMPLATE_REQUIRED_FIELDS = [
     "id",
@@ -14,6 +29,17 @@ TEMPLATE_REQUIRED_FIELDS = [
     "nodes",
     "edges",
 ]
+# Campos del listado resumido (?view=summary): sin los arreglos nodes/edges
+TEMPLATE_SUMMARY_FIELDS = [
+    "name",
+    "description",
+    "framework",
+    "isActive",
+    "nodeCount",
+    "edgeCount",
+    "version",
+    "metadata.updatedAt",
+]
 
 
 def normalize_template_payload(data):
@@ -38,6 +64,7 @@ def normalize_template_payload(data):
         raise ValueError("nodes debe ser un arreglo")
     if not isinstance(edges, list):
         raise ValueError("edges debe ser un arreglo")
+    ensure_valid_graph(nodes, edges, framework)
 
     return {
         "id": str(data.get("id", "")).strip(),
@@ -46,28 +73,48 @@ def normalize_template_payload(data):
         "framework": framework,
         "nodes": nodes,
         "edges": edges,
+        "nodeCount": len(nodes),
+        "edgeCount": len(edges),
         "isActive": data.get("isActive", True) is not False,
     }
 
 
+def load_active_templates(framework=None, summary=False):
+    """Plantillas activas ordenadas por nombre (vista en memoria o Firestore).
+    Con `summary` solo se leen los metadatos y los contadores de nodos/conexiones."""
+    filters = [("isActive", True)]
+    if framework:
+        filters.append(("framework", framework))
+
+    templates = query_documents("templates", filters, fields=TEMPLATE_SUMMARY_FIELDS if summary else None)
+    if not summary:
+        templates = hydrate_templates(templates)
+    if summary:
+        for template in templates:
+            # Plantillas previas a los contadores (ver scripts/backfill_template_counts.py)
+            template.setdefault("nodeCount", None)
+            template.setdefault("edgeCount", None)
+    templates.sort(key=lambda item: str(item.get("name") or item.get("id") or "").lower())
+    return templates
+
+
 @templates_bp.route("/templates", methods=["GET"])
 def get_templates():
-    """Obtiene plantillas activas. Query: ?framework=airflow|argo"""
+    """Obtiene plantillas activas. Query: ?framework=airflow|argo&view=full|summary
+    El modo summary omite nodes/edges e incluye nodeCount/edgeCount; el grafo
+    completo se obtiene con GET /templates/<id>."""
     try:
         framework = request.args.get("framework")
-        query = db.collection("templates").where("isActive", "==", True)
-        if framework in ("airflow", "argo"):
-            query = query.where("framework", "==", framework)
-
-        docs = query.stream()
-        templates = []
-        for doc in docs:
-            data = doc.to_dict()
-            data["id"] = doc.id
-            templates.append(data)
-
-        templates.sort(key=lambda item: str(item.get("name") or item.get("id") or "").lower())
-        return jsonify(templates), 200
+        if framework not in ("airflow", "argo"):
+            framework = None
+        summary = request.args.get("view", "full").lower() == "summary"
+
+        cache_key = f"{'summary' if summary else 'full'}:{framework or 'all'}"
+        return catalog_response(
+            templates_cache,
+            cache_key,
+            lambda: load_active_templates(framework, summary=summary),
+        )
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -75,44 +122,64 @@ def get_templates():
 @templates_bp.route("/admin/templates", methods=["GET"])
 @require_admin
 def get_templates_admin():
-    """Obtiene plantillas para administración. Query: ?framework=airflow|argo&includeInactive=true|false"""
+    """Obtiene plantillas para administración.
+    Query: ?framework=airflow|argo&includeInactive=true|false&limit=&after=&fields="""
     try:
+        limit, after, fields = parse_listing_args(request.args)
         framework = request.args.get("framework")
         include_inactive = request.args.get("includeInactive", "true").lower() == "true"
 
-        query = db.collection("templates")
+        filters = []
         if not include_inactive:
-            query = query.where("isActive", "==", True)
+            filters.append(("isActive", True))
         if framework in ("airflow", "argo"):
-            query = query.where("framework", "==", framework)
-
-        docs = query.stream()
-        templates = []
-        for doc in docs:
-            data = doc.to_dict()
-            data["id"] = doc.id
-            templates.append(data)
-
-        templates.sort(key=lambda item: str(item.get("name") or item.get("id") or "").lower())
-        return jsonify(templates), 200
+            filters.append(("framework", framework))
+
+        # Los grafos fragmentados se reensamblan si se piden nodes/edges
+        with_graph = fields is None or bool({"nodes", "edges"} & set(fields))
+        if fields is not None and with_graph:
+            fields = [*fields, "graphStorage"]
+        templates, next_cursor = page_documents("templates", filters, limit=limit, after=after, fields=fields)
+        if with_graph:
+            templates = hydrate_templates(templates)
+        if limit is None:
+            templates.sort(key=lambda item: str(item.get("name") or item.get("id") or "").lower())
+        return listing_response(templates, limit, next_cursor)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 @templates_bp.route("/templates/<template_id>", methods=["GET"])
 def get_template(template_id):
-    """Obtiene una plantilla activa por ID"""
+    """Obtiene una plantilla activa por ID.
+    Con ?sinceVersion=N devuelve solo los parches JSON Patch desde esa versión;
+    si no se pueden expresar como parches (p. ej. hubo un PUT) `patches` es null
+    y se incluye la plantilla completa en `template`."""
     try:
-        doc = db.collection("templates").document(template_id).get()
-        if not doc.exists:
-            return jsonify({"error": "Plantilla no encontrada"}), 404
-
-        data = doc.to_dict()
-        if data.get("isActive", True) is False:
+        data = get_document("templates", template_id)
+        if data is None or data.get("isActive", True) is False:
             return jsonify({"error": "Plantilla no encontrada"}), 404
 
-        data["id"] = doc.id
-        return jsonify(data), 200
+        raw_since = request.args.get("sinceVersion")
+        if raw_since in (None, ""):
+            return jsonify(hydrate_template(data)), 200
+
+        try:
+            since_version = int(raw_since)
+        except ValueError:
+            raise ValueError("sinceVersion debe ser un número entero")
+        if since_version < 0:
+            raise ValueError("sinceVersion debe ser mayor o igual a 0")
+        version = int(data.get("version") or 0)
+        patches = patches_since(template_id, since_version, version)
+        body = {"id": template_id, "version": version, "sinceVersion": since_version, "patches": patches}
+        if patches is None:
+            body["template"] = hydrate_template(data)
+        return jsonify(body), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -125,23 +192,22 @@ def create_template():
         payload = normalize_template_payload(request.json or {})
         template_id = payload["id"]
 
-        doc_ref = db.collection("templates").document(template_id)
-        if doc_ref.get().exists:
-            return jsonify({"error": "Ya existe una plantilla con ese ID"}), 409
-
         now = datetime.utcnow().isoformat()
-        doc_ref.set(
+        create_versioned_template(
+            template_id,
+            payload,
             {
-                **payload,
-                "metadata": {
-                    "createdAt": now,
-                    "updatedAt": now,
-                    "createdBy": request.uid,
-                },
-            }
+                "createdAt": now,
+                "updatedAt": now,
+                "createdBy": request.uid,
+            },
         )
 
-        return jsonify({"id": template_id, "message": "Plantilla creada exitosamente"}), 201
+        return jsonify({"id": template_id, "version": 1, "message": "Plantilla creada exitosamente"}), 201
+    except DocumentExists:
+        return jsonify({"error": "Ya existe una plantilla con ese ID"}), 409
+    except GraphValidationError as e:
+        return jsonify({"error": str(e), "details": e.errors}), 400
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
@@ -153,16 +219,51 @@ def create_template():
 def update_template(template_id):
     """Actualiza una plantilla existente"""
     try:
-        doc_ref = db.collection("templates").document(template_id)
-        if not doc_ref.get().exists:
-            return jsonify({"error": "Plantilla no encontrada"}), 404
-
         payload = normalize_template_payload({**(request.json or {}), "id": template_id})
         payload.pop("id", None)
-        payload["metadata.updatedAt"] = datetime.utcnow().isoformat()
+        version = replace_template(template_id, payload, request.uid)
+        return jsonify({"version": version, "message": "Plantilla actualizada exitosamente"}), 200
+    except DocumentNotFound:
+        return jsonify({"error": "Plantilla no encontrada"}), 404
+    except VersionConflict as e:
+        return jsonify({
+            "error": "La plantilla cambió durante la actualización",
+            "currentVersion": e.current_version,
+        }), 409
+    except GraphValidationError as e:
+        return jsonify({"error": str(e), "details": e.errors}), 400
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 
-        doc_ref.update(payload)
-        return jsonify({"message": "Plantilla actualizada exitosamente"}), 200
+@templates_bp.route("/templates/<template_id>", methods=["PATCH"])
+@require_admin
+def patch_template_route(template_id):
+    """Aplica operaciones JSON Patch sobre nodes/edges/name/description.
+    Body: {"baseVersion": N, "operations": [...]}"""
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            raise ValueError("Payload inválido")
+        base_version = data.get("baseVersion")
+        if not isinstance(base_version, int) or isinstance(base_version, bool) or base_version < 0:
+            raise ValueError("baseVersion debe ser un número entero")
+
+        version, checkpointed = patch_template(template_id, base_version, data.get("operations"), request.uid)
+        return jsonify({"id": template_id, "version": version, "checkpoint": checkpointed}), 200
+    except DocumentNotFound:
+        return jsonify({"error": "Plantilla no encontrada"}), 404
+    except VersionConflict as e:
+        return jsonify({
+            "error": "La plantilla cambió desde la versión base",
+            "currentVersion": e.current_version,
+        }), 409
+    except JsonPatchTestFailed as e:
+        return jsonify({"error": str(e)}), 409
+    except GraphValidationError as e:
+        return jsonify({"error": str(e), "details": e.errors}), 400
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
@@ -174,16 +275,9 @@ def update_template(template_id):
 def delete_template(template_id):
     """Desactiva una plantilla (soft delete)"""
     try:
-        doc_ref = db.collection("templates").document(template_id)
-        if not doc_ref.get().exists:
-            return jsonify({"error": "Plantilla no encontrada"}), 404
-
-        doc_ref.update(
-            {
-                "isActive": False,
-                "metadata.updatedAt": datetime.utcnow().isoformat(),
-            }
-        )
+        deactivate_document("templates", template_id)
         return jsonify({"message": "Plantilla desactivada exitosamente"}), 200
+    except DocumentNotFound:
+        return jsonify({"error": "Plantilla no encontrada"}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
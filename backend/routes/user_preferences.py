@@ -1,13 +1,20 @@
 from datetime import datetime
 
 from flask import Blueprint, jsonify, request
+from google.cloud.firestore_v1.transforms import ArrayRemove, ArrayUnion
 
 from config.firebase import db
+from config.firebase_async import get_async_db
+from config.storage import run_transaction
 from middleware.auth import require_auth
+from routes.tasks import load_tasks_by_ids
 
 user_preferences_bp = Blueprint("user_preferences", __name__)
 
 PREFERENCES_DOC_ID = "palette"
+EXPANSIONS = ("tasks",)
+FAVORITE_OPERATIONS = ("add", "remove", "move")
+MAX_FAVORITE_OPERATIONS = 100
 
 
 def _normalize_favorite_ids(raw_value):
@@ -34,35 +41,180 @@ def _normalize_favorite_ids(raw_value):
     return deduped
 
 
-def _preferences_doc_ref(uid):
-    return db.collection("user").document(uid).collection("preferences").document(PREFERENCES_DOC_ID)
+def _normalize_favorite_operations(raw_value):
+    """Valida las operaciones de un PATCH: [{"op": add|remove|move, "taskId", "index"?}]."""
+    if not isinstance(raw_value, list) or not raw_value:
+        raise ValueError("operations debe ser un arreglo no vacío")
+    if len(raw_value) > MAX_FAVORITE_OPERATIONS:
+        raise ValueError(f"Máximo {MAX_FAVORITE_OPERATIONS} operaciones por solicitud")
+
+    operations = []
+    for position, item in enumerate(raw_value):
+        if not isinstance(item, dict) or item.get("op") not in FAVORITE_OPERATIONS:
+            raise ValueError(f"Operación inválida en la posición {position}")
+        task_id = str(item.get("taskId") or "").strip()
+        if not task_id:
+            raise ValueError(f"taskId es requerido en la posición {position}")
+        operation = {"op": item["op"], "taskId": task_id}
+        if item["op"] == "move":
+            index = item.get("index")
+            if isinstance(index, bool) or not isinstance(index, int) or index < 0:
+                raise ValueError(f"index debe ser un entero >= 0 en la posición {position}")
+            operation["index"] = index
+        operations.append(operation)
+    return operations
+
+
+def _apply_favorite_operations(favorite_ids, operations):
+    """Lista resultante de aplicar las operaciones en orden (move de un id ausente lo agrega)."""
+    result = list(favorite_ids)
+    for operation in operations:
+        task_id = operation["taskId"]
+        if operation["op"] == "add":
+            if task_id not in result:
+                result.append(task_id)
+            continue
+        if task_id in result:
+            result.remove(task_id)
+        if operation["op"] == "move":
+            result.insert(min(operation["index"], len(result)), task_id)
+    return result
+
+
+def _write_favorite_operations(uid, operations):
+    """
+    Aplica las operaciones de un PATCH en una sola escritura. Es síncrono: con
+    varios workers no hay cola en memoria que otro proceso no vería.
+    """
+    doc_ref = _preferences_doc_ref(uid)
+    now = datetime.utcnow().isoformat()
+
+    if any(operation["op"] == "move" for operation in operations):
+        # Reordenar requiere la lista actual: se lee y reescribe completa en
+        # una transacción para no pisar un PUT concurrente
+        def rewrite(transaction):
+            snapshot = doc_ref.get(transaction=transaction)
+            current = _normalize_favorite_ids((snapshot.to_dict() or {}).get("favoriteTaskIds", []))
+            transaction.set(
+                doc_ref,
+                {"favoriteTaskIds": _apply_favorite_operations(current, operations), "updatedAt": now},
+                merge=True,
+            )
+
+        run_transaction(db, rewrite)
+        return
+
+    # Solo add/remove: cuenta la última operación de cada id. Los ids quitados y
+    # vueltos a agregar se quitan primero para que queden al final, como al aplicarlas una a una.
+    final_ops = {}
+    removed = set()
+    for operation in operations:
+        final_ops.pop(operation["taskId"], None)
+        final_ops[operation["taskId"]] = operation["op"]
+        if operation["op"] == "remove":
+            removed.add(operation["taskId"])
+    adds = [task_id for task_id, op in final_ops.items() if op == "add"]
+    removes = [task_id for task_id in final_ops if task_id in removed]
+
+    # Firestore no admite dos transformaciones sobre el mismo campo en una
+    # escritura: ArrayRemove y ArrayUnion van en un batch (atómico)
+    batch = db.batch()
+    if removes:
+        batch.set(doc_ref, {"favoriteTaskIds": ArrayRemove(removes)}, merge=True)
+    batch.set(
+        doc_ref,
+        {"favoriteTaskIds": ArrayUnion(adds), "updatedAt": now} if adds else {"updatedAt": now},
+        merge=True,
+    )
+    batch.commit()
+
+
+def _preferences_doc_ref(uid, client=None):
+    client = client or db
+    return client.collection("user").document(uid).collection("preferences").document(PREFERENCES_DOC_ID)
+
+
+def _preferences_from_snapshot(doc):
+    if not doc.exists:
+        return {
+            "favoriteTaskIds": [],
+            "hasCustomFavorites": False,
+            "source": "server-default",
+        }
+
+    data = doc.to_dict() or {}
+    return {
+        "favoriteTaskIds": _normalize_favorite_ids(data.get("favoriteTaskIds", [])),
+        "hasCustomFavorites": True,
+        "source": "user-preferences",
+        "updatedAt": data.get("updatedAt"),
+    }
+
+
+def _preferences_update(payload):
+    """(campos a guardar, cuerpo de respuesta) para un PUT de preferencias."""
+    favorite_ids = _normalize_favorite_ids(payload.get("favoriteTaskIds"))
+    now = datetime.utcnow().isoformat()
+    fields = {
+        "favoriteTaskIds": favorite_ids,
+        "updatedAt": now,
+    }
+    body = {
+        "message": "Preferencias actualizadas",
+        "favoriteTaskIds": favorite_ids,
+        "hasCustomFavorites": True,
+        "updatedAt": now,
+    }
+    return fields, body
+
+
+def parse_expand(raw_value):
+    """Expansiones pedidas en ?expand= (separadas por coma)."""
+    expand = {part.strip() for part in (raw_value or "").split(",") if part.strip()}
+    unknown = expand.difference(EXPANSIONS)
+    if unknown:
+        raise ValueError(f"expand no soportado: {', '.join(sorted(unknown))}")
+    return expand
+
+
+def expand_preferences(preferences, expand):
+    """Agrega `tasks` (favoritos activos resueltos con un solo multi-get) si se pidió."""
+    if "tasks" not in expand:
+        return preferences
+    return {**preferences, "tasks": load_tasks_by_ids(preferences["favoriteTaskIds"])}
+
+
+def load_user_preferences(uid):
+    """Lee las preferencias de paleta del usuario (o los valores por defecto)."""
+    return _preferences_from_snapshot(_preferences_doc_ref(uid).get())
+
+
+async def load_user_preferences_async(uid):
+    """Versión async de load_user_preferences (modo ASGI)."""
+    client = get_async_db()
+    if client is None:
+        return load_user_preferences(uid)
+    return _preferences_from_snapshot(await _preferences_doc_ref(uid, client).get())
+
+
+async def save_user_preferences_async(uid, payload):
+    """Guarda las preferencias (modo ASGI); devuelve el cuerpo de respuesta."""
+    fields, body = _preferences_update(payload)
+    client = get_async_db()
+    if client is None:
+        _preferences_doc_ref(uid).set(fields, merge=True)
+    else:
+        await _preferences_doc_ref(uid, client).set(fields, merge=True)
+    return body
 
 
 @user_preferences_bp.route("/user/preferences", methods=["GET"])
 @require_auth
 def get_user_preferences():
-    """Obtiene preferencias del usuario para la paleta."""
+    """Obtiene preferencias del usuario para la paleta. Query: ?expand=tasks (opcional)."""
     try:
-        doc = _preferences_doc_ref(request.uid).get()
-        if not doc.exists:
-            return jsonify(
-                {
-                    "favoriteTaskIds": [],
-                    "hasCustomFavorites": False,
-                    "source": "server-default",
-                }
-            ), 200
-
-        data = doc.to_dict() or {}
-        favorite_ids = _normalize_favorite_ids(data.get("favoriteTaskIds", []))
-        return jsonify(
-            {
-                "favoriteTaskIds": favorite_ids,
-                "hasCustomFavorites": True,
-                "source": "user-preferences",
-                "updatedAt": data.get("updatedAt"),
-            }
-        ), 200
+        expand = parse_expand(request.args.get("expand"))
+        return jsonify(expand_preferences(load_user_preferences(request.uid), expand)), 200
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
@@ -74,28 +226,31 @@ def get_user_preferences():
 def update_user_preferences():
     """Actualiza preferencias del usuario para la paleta."""
     try:
-        payload = request.json or {}
-        favorite_ids = _normalize_favorite_ids(payload.get("favoriteTaskIds"))
-        now = datetime.utcnow().isoformat()
-
-        _preferences_doc_ref(request.uid).set(
-            {
-                "favoriteTaskIds": favorite_ids,
-                "updatedAt": now,
-            },
-            merge=True,
-        )
-
-        return jsonify(
-            {
-                "message": "Preferencias actualizadas",
-                "favoriteTaskIds": favorite_ids,
-                "hasCustomFavorites": True,
-                "updatedAt": now,
-            }
-        ), 200
+        fields, body = _preferences_update(request.json or {})
+        _preferences_doc_ref(request.uid).set(fields, merge=True)
+
+        return jsonify(body), 200
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+
+
+@user_preferences_bp.route("/user/preferences", methods=["PATCH"])
+@require_auth
+def patch_user_preferences():
+    """
+    Aplica cambios incrementales a los favoritos:
+    {"operations": [{"op": "add"|"remove"|"move", "taskId": "...", "index": 0}]}.
+    Se confirman en una sola escritura antes de responder.
+    """
+    try:
+        operations = _normalize_favorite_operations((request.json or {}).get("operations"))
+        _write_favorite_operations(request.uid, operations)
+
+        return jsonify({"message": "Preferencias actualizadas", "applied": len(operations)}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,61 @@
+"""
+Completa nodeCount/edgeCount en las plantillas creadas antes de que
+create_template/update_template los calcularan (listado ?view=summary).
+
+Uso:
+  python -m scripts.backfill_template_counts
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+# Añadir backend al path para importar config
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from config.firebase import db
+
+COLLECTION = "templates"
+BATCH_LIMIT = 500
+
+
+def backfill_template_counts() -> int:
+    batch = db.batch()
+    pending = 0
+    updated = 0
+
+    for doc in db.collection(COLLECTION).stream():
+        data = doc.to_dict() or {}
+        # Las plantillas fragmentadas ya guardan los contadores al escribirse
+        if data.get("graphStorage"):
+            continue
+        nodes = data.get("nodes")
+        edges = data.get("edges")
+        counts = {
+            "nodeCount": len(nodes) if isinstance(nodes, list) else 0,
+            "edgeCount": len(edges) if isinstance(edges, list) else 0,
+        }
+        if all(data.get(key) == value for key, value in counts.items()):
+            continue
+
+        batch.update(doc.reference, counts)
+        pending += 1
+        updated += 1
+        print(f"   ✓ {doc.id}: {counts['nodeCount']} nodos, {counts['edgeCount']} conexiones")
+
+        # Firestore permite máximo 500 operaciones por batch
+        if pending >= BATCH_LIMIT:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+
+    if pending:
+        batch.commit()
+    return updated
+
+
+if __name__ == "__main__":
+    total = backfill_template_counts()
+    print(f"OK: {total} plantillas actualizadas")
@@ -0,0 +1,87 @@
+"""
+Benchmark del costo de autenticación por request con y sin la caché de tokens.
+
+Mide una ruta protegida con @require_auth (vía el cliente de pruebas de Flask)
+y la verificación aislada del JWT. Requiere la misma configuración que el
+backend (.env con JWT_SECRET_KEY y credenciales de Firebase).
+
+Uso:
+  python -m scripts.bench_token_cache [--requests 5000]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Añadir backend al path para importar config
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from flask import Flask, jsonify
+
+from config.firebase import create_jwt_token, verify_jwt_token
+from middleware import auth as auth_middleware
+from middleware.auth import require_auth, verify_token_cached
+
+
+def build_app():
+    app = Flask(__name__)
+
+    @app.route("/bench", methods=["GET"])
+    @require_auth
+    def bench():
+        return jsonify({"ok": True}), 200
+
+    return app
+
+
+def time_per_call(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+def run(iterations):
+    token = create_jwt_token(uid="bench-user", email="bench@example.com")
+    headers = {"Authorization": f"Bearer {token}"}
+    client = build_app().test_client()
+    cache = auth_middleware.token_cache
+    original_size = cache.max_entries
+
+    results = {}
+    try:
+        for label, size in (("sin caché", 0), ("con caché", original_size or 1024)):
+            cache.clear()
+            cache.max_entries = size
+            verify_token_cached(token)  # calentar
+            results[label] = {
+                "verify": time_per_call(lambda: verify_token_cached(token), iterations),
+                "request": time_per_call(lambda: client.get("/bench", headers=headers), iterations),
+            }
+        cache_stats = cache.stats()
+    finally:
+        cache.clear()
+        cache.max_entries = original_size
+
+    baseline = time_per_call(lambda: verify_jwt_token(token), iterations)
+
+    print(f"Iteraciones: {iterations}")
+    print(f"jwt.decode directo: {baseline:8.2f} µs/llamada")
+    for label, data in results.items():
+        print(f"{label:>10}: verificación {data['verify']:8.2f} µs | request completo {data['request']:8.2f} µs")
+    saved = results["sin caché"]["request"] - results["con caché"]["request"]
+    print(f"Ahorro por request: {saved:.2f} µs")
+    print(f"Caché: {cache_stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000, help="Iteraciones por escenario")
+    args = parser.parse_args()
+    run(args.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Exporta o importa el catálogo (tasks, categories, styles, templates) como
+snapshot msgpack, el mismo formato que usan las vistas del backend para
+arrancar en caliente (config/catalog_snapshot.py).
+
+Uso:
+  python scripts/catalog_snapshot.py export catalog.snapshot.msgpack
+  python scripts/catalog_snapshot.py import catalog.snapshot.msgpack [--collections tasks,styles]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Añadir backend al path para importar config
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from config.catalog_snapshot import load_snapshot, write_snapshot
+from config.catalog_views import CATALOG_COLLECTIONS
+from config.firebase import db
+
+# Firestore permite máximo 500 operaciones por batch
+BATCH_SIZE = 500
+
+
+def export_catalog(path, collections):
+    data = {}
+    for name in collections:
+        data[name] = {doc.id: doc.to_dict() or {} for doc in db.collection(name).stream()}
+        print(f"  • {name}: {len(data[name])} documentos")
+    size = write_snapshot(path, data)
+    print(f"\n✅ Snapshot guardado en {path} ({size} bytes)")
+
+
+def import_catalog(path, collections):
+    snapshot = load_snapshot(Path(path).read_bytes())
+    print(f"Snapshot creado el {snapshot.get('createdAt')}")
+    for name in collections:
+        docs = snapshot["collections"].get(name)
+        if docs is None:
+            print(f"  • {name}: no está en el snapshot, se omite")
+            continue
+        items = list(docs.items())
+        for start in range(0, len(items), BATCH_SIZE):
+            batch = db.batch()
+            for doc_id, data in items[start:start + BATCH_SIZE]:
+                batch.set(db.collection(name).document(doc_id), data)
+            batch.commit()
+        print(f"  • {name}: {len(items)} documentos escritos")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("action", choices=("export", "import"))
+    parser.add_argument("path", type=Path)
+    parser.add_argument(
+        "--collections",
+        default=",".join(CATALOG_COLLECTIONS),
+        help="Colecciones separadas por coma (por defecto todo el catálogo)",
+    )
+    args = parser.parse_args()
+    collections = [name.strip() for name in args.collections.split(",") if name.strip()]
+
+    if args.action == "export":
+        export_catalog(args.path, collections)
+    else:
+        import_catalog(args.path, collections)
+
+
+if __name__ == "__main__":
+    main()
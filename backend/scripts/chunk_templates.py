@@ -0,0 +1,55 @@
+"""
+Mueve el grafo de las plantillas grandes guardadas en línea a fragmentos
+comprimidos (models/template_storage.py). Las plantillas por debajo de
+TEMPLATE_INLINE_MAX_BYTES no se modifican.
+
+Uso:
+  python scripts/chunk_templates.py [--dry-run]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Añadir backend al path para importar config
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from config.firebase import db
+from models.template_storage import COLLECTION, encode_graph, update_template_document
+
+
+def chunk_templates(dry_run=False):
+    migrated = 0
+    for doc in db.collection(COLLECTION).stream():
+        data = doc.to_dict() or {}
+        if data.get("graphStorage"):
+            continue
+        nodes = data.get("nodes") if isinstance(data.get("nodes"), list) else []
+        edges = data.get("edges") if isinstance(data.get("edges"), list) else []
+        fields, chunks = encode_graph(nodes, edges)
+        if not chunks:
+            continue
+
+        manifest = fields["graphStorage"]
+        print(
+            f"   ✓ {doc.id}: {manifest['rawBytes']} → {manifest['storedBytes']} bytes "
+            f"en {len(chunks)} fragmento(s)"
+        )
+        if not dry_run:
+            update_template_document(doc.id, {"nodes": nodes, "edges": edges})
+        migrated += 1
+    return migrated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="Solo muestra las plantillas a migrar")
+    args = parser.parse_args()
+
+    total = chunk_templates(dry_run=args.dry_run)
+    print(f"OK: {total} plantillas {'a migrar' if args.dry_run else 'migradas'}")
+
+
+if __name__ == "__main__":
+    main()
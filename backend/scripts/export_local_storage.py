@@ -0,0 +1,74 @@
+"""
+Copia las colecciones del catálogo desde Firestore a un archivo SQLite local
+para servirlo con STORAGE_BACKEND=sqlite.
+
+Uso (requiere credenciales de Firebase):
+    python scripts/export_local_storage.py [ruta.sqlite3]
+"""
+
+import os
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+# La conexión principal debe ser Firestore aunque el .env apunte a SQLite
+os.environ["STORAGE_BACKEND"] = "firestore"
+
+from config.catalog_views import CATALOG_COLLECTIONS
+from config.firebase import db
+from config.storage import create_client, resolve_sqlite_path
+from models.template_storage import CHUNKS_COLLECTION
+
+# Firestore permite máximo 500 operaciones por batch; se usa el mismo tamaño
+BATCH_SIZE = 500
+
+
+def export_collection(target, name):
+    """Reemplaza la colección local por la de Firestore; devuelve (copiados, eliminados)."""
+    batch = target.batch()
+    pending = 0
+    seen = set()
+
+    def queue(write, *args):
+        nonlocal batch, pending
+        write(batch, *args)
+        pending += 1
+        if pending >= BATCH_SIZE:
+            batch.commit()
+            batch = target.batch()
+            pending = 0
+
+    for doc in db.collection(name).stream():
+        seen.add(doc.id)
+        queue(type(batch).set, target.collection(name).document(doc.id), doc.to_dict() or {})
+
+    stale = [doc.reference for doc in target.collection(name).select([]).stream() if doc.id not in seen]
+    for reference in stale:
+        queue(type(batch).delete, reference)
+    if pending:
+        batch.commit()
+    return len(seen), len(stale)
+
+
+def main():
+    path = resolve_sqlite_path(sys.argv[1] if len(sys.argv) > 1 else None)
+    target = create_client("sqlite", path)
+    print(f"Exportando catálogo a {path}")
+    for name in CATALOG_COLLECTIONS:
+        copied, removed = export_collection(target, name)
+        print(f"  • {name}: {copied} copiados, {removed} eliminados")
+
+    # Fragmentos de las plantillas grandes (models/template_storage.py)
+    chunks = 0
+    for doc in db.collection("templates").select(["graphStorage"]).stream():
+        if (doc.to_dict() or {}).get("graphStorage"):
+            copied, _ = export_collection(target, f"templates/{doc.id}/{CHUNKS_COLLECTION}")
+            chunks += copied
+    print(f"  • fragmentos de plantillas: {chunks} copiados")
+    target.close()
+
+
+if __name__ == "__main__":
+    main()
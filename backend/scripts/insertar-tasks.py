@@ -1,11 +1,27 @@
 """
-Script para poblar la colección 'tasks' en Firestore.
-- Elimina todos los documentos existentes
-- Inserta tasks desde backend/scripts/airflow.json y backend/scripts/argo.json
+Script para poblar la colección 'tasks' en Firestore desde
+backend/scripts/airflow.json y backend/scripts/argo.json.
+
+Modo por defecto (sincronización incremental):
+- Calcula un hash del contenido de cada task y lo compara con el campo
+  `contentHash` guardado; solo escribe (en batches) las tasks nuevas o
+  modificadas. Las escrituras de la API borran `contentHash`, así que una
+  task editada desde la API se restaura en la siguiente sincronización.
+- Desactiva (soft delete) las tasks que ya no están en los JSON.
+- El palette nunca queda vacío y el costo es proporcional a los cambios.
+
+Uso:
+  python scripts/insertar-tasks.py             # sincroniza (pide confirmación)
+  python scripts/insertar-tasks.py --dry-run   # solo muestra el plan
+  python scripts/insertar-tasks.py --no-prune  # no desactiva tasks ausentes
+  python scripts/insertar-tasks.py --reset     # modo anterior: borra todo y reinserta
 """
 
+import argparse
+import hashlib
 import sys
 import json
+from datetime import datetime
 from pathlib import Path
 
 # Añadir backend al path para importar config
@@ -16,6 +32,8 @@ from config.firebase import db
 
 COLLECTION = "tasks"  # Usa "tasks" (plural) según el esquema actual
 SCRIPTS_DIR = Path(__file__).resolve().parent
+# Firestore permite máximo 500 operaciones por batch
+BATCH_SIZE = 500
 
 
 def load_json(path: Path):
@@ -28,7 +46,7 @@ def load_json(path: Path):
         return {}
     try:
         parsed = json.loads(raw)
-        return parsed if isinstance(parsed, dict) else {}
+        return parsed if isinstance(parsed, (dict, list)) else {}
     except json.JSONDecodeError as e:
         print(f"⚠️  JSON inválido en {path.name}: {e}")
         return {}
@@ -41,6 +59,7 @@ def load_tasks_from_sources():
     Formatos soportados:
     - {"tasks": [...]}
     - [...] (array directo)
+    - {...} (una sola task)
     """
     airflow_path = SCRIPTS_DIR / "airflow.json"
     argo_path = SCRIPTS_DIR / "argo.json"
@@ -48,24 +67,18 @@ def load_tasks_from_sources():
     airflow_doc = load_json(airflow_path)
     argo_doc = load_json(argo_path)
 
-    airflow_tasks = airflow_doc.get("tasks", [])
-    argo_tasks = argo_doc.get("tasks", [])
+    return tasks_from_document(airflow_doc) + tasks_from_document(argo_doc)
 
-    if isinstance(airflow_tasks, list) and isinstance(argo_tasks, list):
-        return airflow_tasks + argo_tasks
 
-    # Compatibilidad con array directo
-    if isinstance(airflow_doc, list):
-        airflow_tasks = airflow_doc
-    else:
-        airflow_tasks = []
-
-    if isinstance(argo_doc, list):
-        argo_tasks = argo_doc
-    else:
-        argo_tasks = []
-
-    return airflow_tasks + argo_tasks
+def tasks_from_document(doc):
+    """Lista de tasks de un JSON: {"tasks": [...]}, [...] o una task suelta."""
+    if isinstance(doc, list):
+        return doc
+    if isinstance(doc.get("tasks"), list):
+        return doc["tasks"]
+    if doc.get("id") or doc.get("type"):
+        return [doc]
+    return []
 
 
 def delete_collection(collection_name):
@@ -135,9 +148,123 @@ def insert_tasks(tasks):
     return created_count, error_count
 
 
-def main():
-    tasks = load_tasks_from_sources()
+def content_hash(task_data):
+    """Hash estable del contenido de una task (JSON canónico)."""
+    canonical = json.dumps(task_data, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def desired_documents(tasks):
+    """{doc_id: documento a guardar} a partir de las tasks de los JSON."""
+    documents = {}
+    for task in tasks:
+        doc_id = task.get("id", task.get("type"))
+        if not doc_id:
+            raise ValueError(f"La task no contiene 'id' ni 'type': {task.get('name', 'Unknown')}")
+        if doc_id in documents:
+            raise ValueError(f"ID duplicado en los JSON: {doc_id}")
+
+        # Firestore no acepta el campo 'id' dentro del documento
+        task_data = {k: v for k, v in task.items() if k != "id"}
+        task_data.setdefault("isActive", True)
+        documents[doc_id] = {**task_data, "contentHash": content_hash(task_data)}
+    return documents
+
+
+def plan_sync(documents, prune=True):
+    """
+    Compara los hashes con lo guardado (leyendo solo contentHash e isActive).
+    Devuelve {"create": [...], "update": [...], "deactivate": [...], "unchanged": [...]}.
+    """
+    stored = {
+        doc.id: doc.to_dict() or {}
+        for doc in db.collection(COLLECTION).select(["contentHash", "isActive"]).stream()
+    }
+
+    plan = {"create": [], "update": [], "deactivate": [], "unchanged": []}
+    for doc_id, document in sorted(documents.items()):
+        current = stored.get(doc_id)
+        if current is None:
+            plan["create"].append(doc_id)
+        elif current.get("contentHash") != document["contentHash"] or current.get("isActive") is not document["isActive"]:
+            plan["update"].append(doc_id)
+        else:
+            plan["unchanged"].append(doc_id)
+
+    if prune:
+        plan["deactivate"] = sorted(
+            doc_id
+            for doc_id, current in stored.items()
+            if doc_id not in documents and current.get("isActive") is not False
+        )
+    return plan
+
+
+def apply_sync(plan, documents):
+    """Aplica el plan en batches de hasta BATCH_SIZE operaciones."""
+    collection_ref = db.collection(COLLECTION)
+    now = datetime.utcnow().isoformat()
+    operations = [
+        ("set", doc_id) for doc_id in plan["create"] + plan["update"]
+    ] + [("deactivate", doc_id) for doc_id in plan["deactivate"]]
+
+    for start in range(0, len(operations), BATCH_SIZE):
+        batch = db.batch()
+        for kind, doc_id in operations[start:start + BATCH_SIZE]:
+            doc_ref = collection_ref.document(doc_id)
+            if kind == "set":
+                batch.set(doc_ref, documents[doc_id])
+            else:
+                batch.update(doc_ref, {"isActive": False, "metadata.updatedAt": now})
+        batch.commit()
+    return len(operations)
+
+
+def print_plan(plan, documents):
+    labels = {
+        "create": "➕ Nuevas",
+        "update": "✏️  Modificadas",
+        "deactivate": "🗑️  A desactivar",
+    }
+    for key, label in labels.items():
+        print(f"\n{label} ({len(plan[key])}):")
+        for doc_id in plan[key]:
+            name = documents.get(doc_id, {}).get("name", doc_id)
+            print(f"   • {name} ({doc_id})")
+    print(f"\n= Sin cambios: {len(plan['unchanged'])}")
 
+
+def sync(tasks, dry_run=False, prune=True, assume_yes=False):
+    documents = desired_documents(tasks)
+
+    print("=" * 60)
+    print("🔄 SINCRONIZACIÓN INCREMENTAL - COLECCIÓN 'TASKS'")
+    print("=" * 60)
+
+    plan = plan_sync(documents, prune=prune)
+    print_plan(plan, documents)
+
+    pending = len(plan["create"]) + len(plan["update"]) + len(plan["deactivate"])
+    if dry_run:
+        print(f"\n🧪 Dry run: {pending} operaciones planificadas, no se escribió nada.")
+        return plan
+    if pending == 0:
+        print("\n✅ El catálogo ya está sincronizado.")
+        return plan
+
+    if not assume_yes:
+        confirmation = input(f"\n¿Aplicar {pending} operaciones? (escribe 'SI' para confirmar): ")
+        if confirmation.strip().upper() != "SI":
+            print("\n❌ Operación cancelada.")
+            return plan
+
+    written = apply_sync(plan, documents)
+    print(f"\n✅ {written} operaciones aplicadas en {(written + BATCH_SIZE - 1) // BATCH_SIZE} batches.")
+    return plan
+
+
+def reset(tasks):
+    """Modo anterior: elimina la colección completa y reinserta todas las tasks."""
     print("=" * 60)
     print("🔥 POBLACIÓN DE FIRESTORE - COLECCIÓN 'TASKS'")
     print("=" * 60)
@@ -166,6 +293,22 @@ def main():
     print(f"  • Documentos creados: {created}")
     print(f"  • Errores: {errors}")
 
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="Solo mostrar las operaciones planificadas")
+    parser.add_argument("--no-prune", action="store_true", help="No desactivar tasks ausentes de los JSON")
+    parser.add_argument("--yes", action="store_true", help="No pedir confirmación")
+    parser.add_argument("--reset", action="store_true", help="Borrar la colección y reinsertar todo (modo anterior)")
+    args = parser.parse_args()
+
+    tasks = load_tasks_from_sources()
+
+    if args.reset:
+        reset(tasks)
+    else:
+        sync(tasks, dry_run=args.dry_run, prune=not args.no_prune, assume_yes=args.yes)
+
     airflow_count = sum(1 for t in tasks if t.get("framework") == "airflow")
     argo_count = sum(1 for t in tasks if t.get("framework") == "argo")
     print("\nDistribución por framework:")
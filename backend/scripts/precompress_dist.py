@@ -0,0 +1,78 @@
+"""
+Genera variantes precomprimidas (.br / .gz) de los archivos del build en
+backend/dist para que el servidor las envíe sin comprimir por request.
+
+Ejecutar tras cada build del frontend (el Dockerfile lo hace al construir):
+  python -m scripts.precompress_dist [--dist ruta/a/dist]
+"""
+
+import argparse
+import mimetypes
+import sys
+from pathlib import Path
+
+# Añadir backend al path para importar middleware
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from middleware.compression import (
+    COMPRESSIBLE_MIMETYPES,
+    COMPRESSION_MIN_SIZE,
+    STATIC_SUFFIXES,
+    compress,
+    supported_encodings,
+)
+
+DEFAULT_DIST_DIR = backend_dir / "dist"
+
+
+def precompress_file(path: Path, dist_dir: Path):
+    """Escribe los hermanos comprimidos de `path`; devuelve (escritos, omitidos)."""
+    data = path.read_bytes()
+    written, skipped = 0, 0
+    for encoding in supported_encodings():
+        target = path.with_name(path.name + STATIC_SUFFIXES[encoding])
+        if target.exists() and target.stat().st_mtime >= path.stat().st_mtime:
+            skipped += 1
+            continue
+        compressed = compress(data, encoding, static=True)
+        # Solo vale la pena si realmente reduce el tamaño
+        if len(compressed) >= len(data):
+            target.unlink(missing_ok=True)
+            continue
+        target.write_bytes(compressed)
+        written += 1
+        print(f"   ✓ {target.relative_to(dist_dir)} ({len(data)} → {len(compressed)} bytes)")
+    return written, skipped
+
+
+def precompress_dist(dist_dir: Path):
+    if not dist_dir.exists():
+        print(f"⚠️  No existe: {dist_dir}")
+        return 0
+
+    suffixes = tuple(STATIC_SUFFIXES.values())
+    written = skipped = 0
+    for path in sorted(dist_dir.rglob("*")):
+        if not path.is_file() or path.name.endswith(suffixes):
+            continue
+        mimetype = mimetypes.guess_type(path.name)[0]
+        if mimetype not in COMPRESSIBLE_MIMETYPES or path.stat().st_size < COMPRESSION_MIN_SIZE:
+            continue
+        file_written, file_skipped = precompress_file(path, dist_dir)
+        written += file_written
+        skipped += file_skipped
+
+    print(f"\n📊 Variantes escritas: {written} | al día: {skipped} | codificaciones: {', '.join(supported_encodings())}")
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dist", type=Path, default=DEFAULT_DIST_DIR, help="Directorio del build")
+    args = parser.parse_args()
+    precompress_dist(args.dist.resolve())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from flask import Flask, redirect, send_from_directory
+from flask import Flask, redirect
 from flask_cors import CORS
 from dotenv import load_dotenv
 from routes.auth import auth_bp
@@ -9,17 +9,44 @@ from routes.templates import templates_bp
 from routes.categories import categories_bp
 from routes.styles import styles_bp
 from routes.user_preferences import user_preferences_bp
+from routes.palette import palette_bp
+from routes.dags import dags_bp
+from config.catalog_cache import catalog_cache_stats
+from config.catalog_views import catalog_views_stats
+from config.firebase import last_login_queue, start_admin_role_listener, start_catalog_listeners
+from config.role_cache import admin_role_cache
+from config.storage import STORAGE_BACKEND
+from middleware.auth import require_admin
+from middleware.compression import init_compression, send_precompressed
+from middleware.metrics import init_metrics
+from models.airflow_codegen import compiled_dag_cache
+from models.repository import repository_stats
+from models.template_storage import template_storage_stats
 
 load_dotenv()
 
 BASE_DIR = Path(__file__).resolve().parent
 DIST_DIR = BASE_DIR / "dist"
 
-app = Flask(__name__, static_folder=str(DIST_DIR), static_url_path="")
+# Los archivos de dist se sirven desde serve_react (con variantes precomprimidas)
+app = Flask(__name__, static_folder=None)
+# Métricas antes que la compresión: su after_request corre después y mide el tamaño comprimido
+init_metrics(app)
+init_compression(app)
 allowed_origins_raw = os.getenv("CORS_ALLOWED_ORIGINS", "*")
 allowed_origins = [o.strip() for o in allowed_origins_raw.split(",") if o.strip()]
 CORS(app, origins=allowed_origins if allowed_origins else "*")
 
+def start_background_listeners():
+    """Vistas en memoria del catálogo mantenidas por listeners de Firestore."""
+    if os.getenv("CATALOG_LISTENERS_ENABLED", "true").lower() in ("1", "true", "yes", "on"):
+        start_catalog_listeners()
+        start_admin_role_listener()
+
+# Con gunicorn los listeners se arrancan en cada worker tras el fork (gunicorn.conf.py)
+if not os.getenv("SERVER_DEFER_LISTENERS"):
+    start_background_listeners()
+
 # Registrar blueprints
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
 app.register_blueprint(tasks_bp, url_prefix='/api')
@@ -27,6 +54,8 @@ app.register_blueprint(templates_bp, url_prefix='/api')
 app.register_blueprint(categories_bp, url_prefix='/api')
 app.register_blueprint(styles_bp, url_prefix='/api')
 app.register_blueprint(user_preferences_bp, url_prefix='/api')
+app.register_blueprint(palette_bp, url_prefix='/api')
+app.register_blueprint(dags_bp, url_prefix='/api')
 
 @app.route('/', methods=['GET'])
 def main():
@@ -36,6 +65,22 @@ def main():
 def health_check():
     return {'status': 'ok'}, 200
 
+@app.route('/api/admin/cache/stats', methods=['GET'])
+@require_admin
+def cache_stats():
+    """Contadores de cachés, vistas y lecturas/escrituras del repositorio (por proceso)."""
+    return {
+        'pid': os.getpid(),
+        'storage': STORAGE_BACKEND,
+        'caches': catalog_cache_stats(),
+        'views': catalog_views_stats(),
+        'adminRoles': admin_role_cache.stats(),
+        'repository': repository_stats(),
+        'dagCodegen': compiled_dag_cache.stats(),
+        'templateStorage': template_storage_stats(),
+        'writeBehind': {'lastLogin': last_login_queue.stats()},
+    }, 200
+
 # Alias legacy/cortos para auth bajo /api/*
 @app.route('/api/login', methods=['GET', 'POST', 'OPTIONS'])
 def api_login_alias():
@@ -59,7 +104,7 @@ def api_logout_alias():
 
 def serve_spa_index():
     if DIST_DIR.exists():
-        return send_from_directory(app.static_folder, "index.html")
+        return send_precompressed(DIST_DIR, "index.html")
     return {'error': 'Frontend dist no disponible'}, 404
 
 @app.route('/splash', methods=['GET'])
@@ -82,7 +127,7 @@ def serve_react(path):
 
     requested = DIST_DIR / path
     if requested.exists() and requested.is_file():
-        return send_from_directory(app.static_folder, path)
+        return send_precompressed(DIST_DIR, path)
 
     return serve_spa_index()
 
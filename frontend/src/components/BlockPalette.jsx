@@ -20,8 +20,10 @@ import {
 } from "../services/categoriesService";
 import {
   fetchUserPreferences,
+  patchUserFavorites,
   saveUserFavorites,
 } from "../services/userPreferencesService";
+import { ensurePaletteBootstrap } from "../services/paletteService";
 
 const defaultExpandedCategories = { common: true };
 
@@ -47,7 +49,8 @@ export default function BlockPalette() {
     let cancelled = false;
     setLoading(true);
     setError(null);
-    fetchTaskBlocks()
+    ensurePaletteBootstrap()
+      .then(() => fetchTaskBlocks())
       .then(async (blocks) => {
         if (!cancelled) setAllBlocks(blocks);
         const categories = await fetchCategories();
@@ -110,7 +113,8 @@ export default function BlockPalette() {
       return;
     }
 
-    fetchUserPreferences(uid)
+    ensurePaletteBootstrap(uid)
+      .then(() => fetchUserPreferences(uid))
       .then((prefs) => {
         if (cancelled) return;
         setUserFavoriteTaskIds(Array.isArray(prefs?.favoriteTaskIds) ? prefs.favoriteTaskIds : []);
@@ -147,7 +151,12 @@ export default function BlockPalette() {
     setHasCustomFavorites(true);
 
     try {
-      await saveUserFavorites(currentUser?.uid, nextIds);
+      if (prevCustomFavorites) {
+        await patchUserFavorites(currentUser?.uid, [{ op: exists ? "remove" : "add", taskId }], nextIds);
+      } else {
+        // Primera personalización: se guarda la lista completa (incluye los favoritos por defecto)
+        await saveUserFavorites(currentUser?.uid, nextIds);
+      }
     } catch {
       setUserFavoriteTaskIds(prevIds);
       setHasCustomFavorites(prevCustomFavorites);
@@ -12,6 +12,7 @@ export default function TemplatePickerModal({
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
   const [searchTerm, setSearchTerm] = useState("");
+  const [selectingId, setSelectingId] = useState(null);
 
   const fetchTemplates = useCallback(async () => {
     if (!selectedFramework) return;
@@ -19,7 +20,7 @@ export default function TemplatePickerModal({
     setError(null);
     try {
       const { data } = await templateAPI.getAll({
-        params: { framework: selectedFramework },
+        params: { framework: selectedFramework, view: "summary" },
       });
       setTemplates(Array.isArray(data) ? data : []);
     } catch (err) {
@@ -41,6 +42,23 @@ export default function TemplatePickerModal({
     fetchTemplates();
   }, [fetchTemplates, isOpen, selectedFramework]);
 
+  // El listado solo trae metadatos; el grafo completo se pide al elegir la plantilla
+  const handleSelect = useCallback(
+    async (template) => {
+      setSelectingId(template.id);
+      setError(null);
+      try {
+        const { data } = await templateAPI.getById(template.id);
+        onSelect?.(data);
+      } catch (err) {
+        setError(err.response?.data?.error || err.message || "No se pudo cargar la plantilla");
+      } finally {
+        setSelectingId(null);
+      }
+    },
+    [onSelect],
+  );
+
   const filteredTemplates = useMemo(() => {
     const query = searchTerm.trim().toLowerCase();
     return templates.filter((template) => {
@@ -139,7 +157,8 @@ export default function TemplatePickerModal({
                         <button
                           key={template.id}
                           type="button"
-                          onClick={() => onSelect?.(template)}
+                          onClick={() => handleSelect(template)}
+                          disabled={!!selectingId}
                           className="w-full rounded-2xl border border-slate-200 bg-white p-4 text-left hover:border-blue-300 hover:bg-blue-50 transition"
                         >
                           <div className="flex items-start justify-between gap-3">
@@ -157,7 +176,9 @@ export default function TemplatePickerModal({
                             <p className="mt-2 text-sm text-slate-600">{template.description}</p>
                           )}
                           <p className="mt-3 text-xs text-slate-500">
-                            {template.nodes?.length || 0} nodos · {template.edges?.length || 0} conexiones
+                            {template.nodeCount ?? template.nodes?.length ?? 0} nodos ·{" "}
+                            {template.edgeCount ?? template.edges?.length ?? 0} conexiones
+                            {selectingId === template.id && " · Cargando..."}
                           </p>
                         </button>
                       ))}
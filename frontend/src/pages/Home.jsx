@@ -140,7 +140,7 @@ export default function Home() {
 
         case "exportDag":
           const pythonFilename = `dag_${Date.now()}.py`;
-          dagService.exportToPython(nodes, edges, pythonFilename);
+          await dagService.exportToPythonFromBackend(nodes, edges, pythonFilename);
           showNotif(`🐍 Exportado: ${pythonFilename}`);
           dagLogger.log('exportDag', 'success', { 
             filename: pythonFilename,
@@ -68,6 +68,8 @@ export const taskAPI = {
   getAll: (config = {}) => apiClient.get('/tasks', config),
   getAllAdmin: (config = {}) => apiClient.get('/admin/tasks', config),
   getById: (id) => apiClient.get(`/tasks/${id}`),
+  getByIds: (ids, config = {}) =>
+    apiClient.get('/tasks:batchGet', { ...config, params: { ...config.params, ids: ids.join(',') } }),
   create: (data) => apiClient.post('/tasks', data),
   update: (id, data) => apiClient.put(`/tasks/${id}`, data),
   delete: (id) => apiClient.delete(`/tasks/${id}`)
@@ -79,6 +81,10 @@ export const templateAPI = {
   getById: (id) => apiClient.get(`/templates/${id}`),
   create: (data) => apiClient.post('/templates', data),
   update: (id, data) => apiClient.put(`/templates/${id}`, data),
+  patch: (id, baseVersion, operations) =>
+    apiClient.patch(`/templates/${id}`, { baseVersion, operations }),
+  getSince: (id, sinceVersion) =>
+    apiClient.get(`/templates/${id}`, { params: { sinceVersion } }),
   delete: (id) => apiClient.delete(`/templates/${id}`)
 };
 
@@ -101,6 +107,16 @@ export const styleAPI = {
 export const userPreferencesAPI = {
   get: (config = {}) => apiClient.get('/user/preferences', config),
   update: (data) => apiClient.put('/user/preferences', data),
+  patch: (operations) => apiClient.patch('/user/preferences', { operations }),
+};
+
+export const paletteAPI = {
+  bootstrap: (config = {}) => apiClient.get('/palette/bootstrap', config),
+};
+
+export const dagAPI = {
+  compile: (data, config = {}) => apiClient.post('/dags:compile', data, config),
+  compileBatch: (dags, config = {}) => apiClient.post('/dags:compile-batch', { dags }, config),
 };
 
 export default apiClient;
@@ -288,6 +288,21 @@ export async function fetchStyles(options = {}) {
   }
 }
 
+export function primeCatalogCaches({ categories, styles } = {}) {
+  const expiresAt = Date.now() + CATEGORY_CACHE_TTL_MS;
+  if (Array.isArray(styles)) {
+    const nextStyles = { data: styles, palette: normalizeStylePalette(styles), expiresAt };
+    stylesCache = nextStyles;
+    applyStylePalette(nextStyles.palette);
+    writeLocalCache(LS_KEYS.styles, nextStyles);
+  }
+  if (Array.isArray(categories)) {
+    const nextCategories = { data: categories.length > 0 ? categories : defaultCategories, expiresAt };
+    categoriesCache = nextCategories;
+    writeLocalCache(LS_KEYS.categories, nextCategories);
+  }
+}
+
 export function invalidateStylesCache() {
   stylesCache = null;
   clearLocalCache(LS_KEYS.styles);
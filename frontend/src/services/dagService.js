@@ -4,6 +4,7 @@
 // ============================================
 
 import axios from "axios";
+import { dagAPI } from "./api";
 
 const API_BASE_URL =
   import.meta.env.VITE_API_BASE_URL || "http://localhost:5000/api";
@@ -774,6 +775,36 @@ export const dagService = {
     );
   },
 
+  // 🐍 Exportar a Python generado en el backend (con fallback local)
+  exportToPythonFromBackend: async (
+    nodes,
+    edges,
+    filename = "dag.py",
+    fallbackDagId = "generated_dag",
+  ) => {
+    if (detectWorkflowRootFramework(nodes) !== "airflow") {
+      return dagService.exportToPython(nodes, edges, filename, fallbackDagId);
+    }
+    try {
+      const { data } = await dagAPI.compile({
+        nodes,
+        edges,
+        filename,
+        fallbackDagId,
+      });
+      downloadTextFile(data.code, data.filename || filename, "text/x-python");
+      console.log("✅ Python Airflow exportado (backend):", data.filename);
+      return { success: true, filename: data.filename, framework: "airflow" };
+    } catch (error) {
+      // Errores de validación del grafo: mismo mensaje que el generador local
+      if (error.response?.status === 400) {
+        throw new Error(error.response.data?.error || error.message);
+      }
+      console.warn("⚠️ Backend no disponible, exportando localmente:", error.message);
+      return exportAirflowToPython(nodes, edges, filename, fallbackDagId);
+    }
+  },
+
   // 📥 Importar desde JSON
   importFromFile: (file) => {
     return new Promise((resolve, reject) => {
@@ -0,0 +1,46 @@
+/**
+ * Carga inicial del palette en una sola petición (/palette/bootstrap).
+ * Precarga las cachés de tasks, categorías, estilos y preferencias para que
+ * fetchTaskBlocks / fetchCategories / fetchUserPreferences se resuelvan en memoria.
+ */
+
+import { paletteAPI } from "./api";
+import { primeTaskBlocksCache } from "./tasksFromFirestore";
+import { primeCatalogCaches } from "./categoriesService";
+import { primeUserPreferencesCache } from "./userPreferencesService";
+
+const bootstrapRequests = new Map();
+
+function readStoredUid() {
+  try {
+    return JSON.parse(localStorage.getItem("user") || "null")?.uid || null;
+  } catch {
+    return null;
+  }
+}
+
+async function loadPaletteBootstrap(uid) {
+  const { data } = await paletteAPI.bootstrap();
+  primeTaskBlocksCache(data?.tasks);
+  primeCatalogCaches({ categories: data?.categories, styles: data?.styles });
+  if (uid) primeUserPreferencesCache(uid, data?.preferences);
+  return data;
+}
+
+/**
+ * Ejecuta el bootstrap una vez por usuario y carga de página; las llamadas
+ * concurrentes comparten la misma petición. Los errores se ignoran: cada
+ * servicio vuelve a su endpoint individual.
+ * @param {string|null} [uid] - por defecto, el usuario guardado en sesión
+ * @returns {Promise<Object|null>}
+ */
+export function ensurePaletteBootstrap(uid = readStoredUid()) {
+  const key = uid || "anonymous";
+  if (!bootstrapRequests.has(key)) {
+    bootstrapRequests.set(
+      key,
+      loadPaletteBootstrap(uid).catch(() => null),
+    );
+  }
+  return bootstrapRequests.get(key);
+}
@@ -102,6 +102,19 @@ export async function fetchTaskBlocks(framework = null, options = {}) {
   return mapped;
 }
 
+/**
+ * Precarga la caché de bloques con tasks ya obtenidas (p. ej. desde /palette/bootstrap).
+ * @param {Object[]} docs - tasks en formato API
+ * @param {string} [framework] - 'airflow' | 'argo' si la lista viene filtrada
+ */
+export function primeTaskBlocksCache(docs, framework = null) {
+  if (!Array.isArray(docs)) return;
+  const cacheKey = framework && FRAMEWORKS.includes(framework) ? framework : 'all';
+  const nextCache = { data: docs.map(taskDocToBlock), expiresAt: Date.now() + TASKS_CACHE_TTL_MS };
+  tasksCache.set(cacheKey, nextCache);
+  writeTasksLocalCache(cacheKey, nextCache);
+}
+
 export function invalidateTaskBlocksCache() {
   tasksCache.clear();
   clearTasksLocalCache();
@@ -62,6 +62,16 @@ export function invalidateUserPreferencesCache(uid = null) {
   }
 }
 
+export function primeUserPreferencesCache(uid, data) {
+  if (!uid || !data) return;
+  writeCache(uid, {
+    favoriteTaskIds: Array.isArray(data?.favoriteTaskIds) ? data.favoriteTaskIds : [],
+    hasCustomFavorites: !!data?.hasCustomFavorites,
+    source: data?.source || "server-default",
+    updatedAt: data?.updatedAt,
+  });
+}
+
 export async function fetchUserPreferences(uid, options = {}) {
   const { forceRefresh = false } = options;
 
@@ -110,3 +120,18 @@ export async function saveUserFavorites(uid, favoriteTaskIds = []) {
   return normalized;
 }
 
+/**
+ * Envía cambios incrementales de favoritos (add/remove/move); el servidor los
+ * confirma antes de responder. `favoriteTaskIds` es la lista resultante que ya
+ * muestra la UI y se guarda en caché.
+ */
+export async function patchUserFavorites(uid, operations = [], favoriteTaskIds = []) {
+  await userPreferencesAPI.patch(operations);
+  const normalized = {
+    favoriteTaskIds: Array.isArray(favoriteTaskIds) ? favoriteTaskIds : [],
+    hasCustomFavorites: true,
+    source: "user-preferences",
+  };
+  if (uid) writeCache(uid, normalized);
+  return normalized;
+}